@@ -0,0 +1,193 @@
+# analysis_jobs.py
+"""
+검사 종료 후 분석(analyze_and_save + DB 저장 + result.json)을 백그라운드 job 으로 실행.
+
+- /api/test/stop 은 submit_job() 으로 job 만 등록하고 바로 job_id 반환 (gunicorn worker 를 CNN 추론 동안 붙잡지 않음)
+- 실행: 프로세스 로컬 스레드 풀 (ANALYSIS_WORKERS, 기본 2)
+- 상태: data/analysis_jobs/<job_id>.json  (tmp + os.replace)
+    → job 을 실행하지 않는 다른 gunicorn worker 도 파일로 상태 조회 가능
+    status: queued → running → done | error
+- wait_job(): 상태가 바뀔 때까지 대기 (같은 프로세스 job 은 Condition, 아니면 파일 mtime polling) → SSE 용
+- job 파일에 실행 프로세스 pid + heartbeat_at (HEARTBEAT_SEC 마다 갱신)
+    worker 프로세스가 죽어서 heartbeat 가 STALE_SEC 넘게 멈춘 queued/running job 은 get_job() 이 error 로 기록
+"""
+import json
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from session_segments import DATA_DIR
+
+JOBS_DIR = DATA_DIR / "analysis_jobs"
+JOBS_DIR.mkdir(parents=True, exist_ok=True)
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+POLL_INTERVAL = 0.5   # 다른 프로세스 job 상태 파일 확인 주기(초)
+HEARTBEAT_SEC = float(os.getenv("ANALYSIS_HEARTBEAT_SEC", "5"))
+STALE_SEC = float(os.getenv("ANALYSIS_STALE_SEC", "60"))   # heartbeat 가 이만큼 멈추면 죽은 job
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+FINISHED = (STATUS_DONE, STATUS_ERROR)
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_changed = threading.Condition()
+
+# 이 프로세스가 실행(대기) 중인 job → heartbeat 대상. job dict 수정 + 파일 쓰기는 _active_lock 안에서
+_active: Dict[str, Dict] = {}
+_active_lock = threading.Lock()
+_heartbeat_thread: Optional[threading.Thread] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(ANALYSIS_WORKERS, 1), thread_name_prefix="analysis")
+        return _executor
+
+
+def _job_path(job_id: str):
+    if not _JOB_ID_RE.match(job_id or ""):
+        raise ValueError(f"[analysis_jobs] 잘못된 job_id: {job_id!r}")
+    return JOBS_DIR / f"{job_id}.json"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _write(job: Dict):
+    path = _job_path(job["job_id"])
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+    with _changed:
+        _changed.notify_all()
+
+
+def _update(job: Dict, **fields):
+    with _active_lock:
+        job.update(fields, heartbeat_at=_now())
+        _write(job)
+
+
+def _is_stale(job: Dict) -> bool:
+    if job.get("status") in FINISHED or job.get("job_id") in _active:
+        return False
+    beat = job.get("heartbeat_at") or job.get("started_at") or job.get("created_at")
+    try:
+        age = (datetime.utcnow() - datetime.fromisoformat(beat)).total_seconds()
+    except (TypeError, ValueError):
+        return True
+    return age > STALE_SEC
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """
+    job 상태 dict. 없거나 잘못된 id 면 None.
+    실행하던 프로세스가 죽은 job (heartbeat 멈춤) 은 여기서 error 로 기록 → 클라이언트가 무한 대기하지 않음
+    """
+    try:
+        path = _job_path(job_id)
+        with path.open("r", encoding="utf-8") as f:
+            job = json.load(f)
+    except (ValueError, FileNotFoundError):
+        return None
+    if _is_stale(job):
+        job.update(
+            status=STATUS_ERROR,
+            error=f"분석 프로세스(pid {job.get('pid')})가 응답하지 않아 중단되었습니다.",
+            finished_at=_now(),
+        )
+        _write(job)
+        print(f"[analysis_jobs] {job_id} stale → error (pid {job.get('pid')})")
+    return job
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_SEC)
+        with _active_lock:
+            for job in list(_active.values()):
+                job["heartbeat_at"] = _now()
+                try:
+                    _write(job)
+                except OSError as e:
+                    print("[analysis_jobs] heartbeat 기록 실패:", e)
+
+
+def _ensure_heartbeat():
+    global _heartbeat_thread
+    with _executor_lock:
+        if _heartbeat_thread is None or not _heartbeat_thread.is_alive():
+            _heartbeat_thread = threading.Thread(target=_heartbeat_loop, name="analysis-heartbeat", daemon=True)
+            _heartbeat_thread.start()
+
+
+def _run(job: Dict, fn: Callable[[], Dict]):
+    _update(job, status=STATUS_RUNNING, started_at=_now())
+    t0 = time.perf_counter()
+    try:
+        result = fn()
+        fields = {"status": STATUS_DONE, "result": result}
+    except Exception as e:
+        traceback.print_exc()
+        fields = {"status": STATUS_ERROR, "error": str(e)}
+    with _active_lock:
+        _active.pop(job["job_id"], None)
+    _update(job, finished_at=_now(), elapsed_ms=round((time.perf_counter() - t0) * 1000.0, 1), **fields)
+    print(f"[analysis_jobs] {job['job_id']} {job['status']} ({job['elapsed_ms']}ms)")
+
+
+def submit_job(fn: Callable[[], Dict], meta: Optional[Dict] = None) -> str:
+    """fn() 을 백그라운드에서 실행. 반환값(dict)이 job 의 result 가 됨."""
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "status": STATUS_QUEUED,
+        "created_at": _now(),
+        "pid": os.getpid(),
+        "heartbeat_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "meta": meta or {},
+        "result": None,
+        "error": None,
+    }
+    with _active_lock:
+        _active[job_id] = job
+        _write(job)
+    _ensure_heartbeat()
+    _pool().submit(_run, job, fn)
+    return job_id
+
+
+def wait_job(job_id: str, last_status: Optional[str] = None, timeout: float = 15.0) -> Optional[Dict]:
+    """
+    job 상태가 last_status 와 달라질 때까지(또는 timeout) 대기 후 현재 상태 반환.
+    - 같은 프로세스 job: _changed 알림으로 바로 깨어남
+    - 다른 프로세스 job: POLL_INTERVAL 마다 파일 확인
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] != last_status:
+            return job
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return job
+        with _changed:
+            _changed.wait(min(left, POLL_INTERVAL))
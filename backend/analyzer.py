@@ -1,16 +1,24 @@
 # analyzer.py
 import os
 import json
-import csv
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import load_img, img_to_array
 
 from fuzzy_system import apply_fuzzy_rules
+from title_labels import apply_keyword_priority, label_from_title
+from session_segments import read_segment_rows
+from input_binlog import count_events, read_input_events, ts_iso
+from mouse_motion import add_buckets, empty_motion_totals, motion_features
+from process_delta import read_process_timeline
+from session_catalog import record_session
+from log_archive import read_history_rows
+from session_aggregate import load_aggregate
+from screen_manifest import list_session_screens
+from cnn_worker import get_inference_client
+from screen_pred_cache import predict_frames
 
 
 # =======================================================
@@ -33,6 +41,7 @@ SESSION_LOG_DIR.mkdir(parents=True, exist_ok=True)
 SCREENS_DIR = DATA_DIR / "screens"
 SCREENS_DIR.mkdir(parents=True, exist_ok=True)
 
+# 전역 로그 CSV (세션 세그먼트가 없는 예전 세션용 fallback)
 WINDOW_CSV = DATA_DIR / "window_log.csv"
 INPUT_CSV = DATA_DIR / "input_log.csv"
 PROCESS_CSV = DATA_DIR / "process_log.csv"
@@ -44,71 +53,6 @@ ANALYZER_SESSION_LOG_DIR = ANALYZER_DATA_DIR / "session_logs"
 ANALYZER_SESSION_LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 
-# -------------------------------------------------------
-# 🔥 1. TITLE KEYWORDS (모든 라벨 키워드) — 절대 삭제/수정 안 함
-# -------------------------------------------------------
-TITLE_KEYWORDS = {
-    "game": ["game", "steam", "league of legends", "lol", "valorant", "overwatch", "maplestory", "lostark", "테트리스", "게임", "칼"],
-    "study": ["ppt", "pdf", "study", "homework", "report", "notion", "stackoverflow", "postech", "lecture", "visual studio code", "vscode", "code.exe",
-        "pycharm", "intellij", "android studio",
-        "jupyter", "colab", "terminal", "cmd", "powershell","inflearn", "인프런", "강의", "학습 페이지", "lecture video", "중부대학교", "lms", "강좌"],
-    "webtoon": ["webtoon", "naver webtoon", "kakao webtoon", "toon","만화", "웹툰", "뉴토끼"],
-    "sns": ["instagram", "insta", "facebook", "twitter", "tiktok", "reels", "shorts", "인스타", "카카오톡"],
-    "youtube-ent": ["youtube", "yt", "tv", "netflix", "tving", "watching", "drama"],
-    "youtube-music": ["music", "song", "lyrics", "audio", "mv", "playlist", "melody", "뮤직", "가사"]
-}
-
-# -------------------------------------------------------
-# 🔥 2. MUSIC KEYWORDS — 절대 줄이지 않음
-# -------------------------------------------------------
-MUSIC_KEYWORDS = [
-    "music", "song", "lyrics", "lyric", "audio", "mv", "playlist", "melody",
-    "가사", "노래", "뮤직", "audio only", "official audio"
-]
-
-# -------------------------------------------------------
-# 🔥 음악 제목 판별 함수
-# -------------------------------------------------------
-def is_music_title(title: str) -> bool:
-    if not title:
-        return False
-    title_lower = title.lower()
-    for kw in MUSIC_KEYWORDS:
-        if kw.lower() in title_lower:
-            return True
-    return False
-
-# -------------------------------------------------------
-# 🔥 TITLE 기반 라벨
-# -------------------------------------------------------
-def apply_keyword_priority(window_titles: list) -> str | None:
-    if not window_titles:
-        return None
-
-    title_str = " ".join(t.lower() for t in window_titles if isinstance(t, str))
-
-    for label, keywords in TITLE_KEYWORDS.items():
-        for kw in keywords:
-            if kw.lower() in title_str:
-                return label
-
-    return None
-
-
-# -------------------------------------------------------
-# 🔥 단일 제목 -> 키워드 라벨 추정 (fallback용)
-# -------------------------------------------------------
-def label_from_title(title: str) -> str:
-    if not title:
-        return "other"
-    tl = title.lower()
-    for label, keywords in TITLE_KEYWORDS.items():
-        for kw in keywords:
-            if kw.lower() in tl:
-                return label
-    return "other"
-
-
 # -------------------------------------------------------
 # 🔥 Sequence-based 비율 계산
 # -------------------------------------------------------
@@ -125,7 +69,8 @@ def compute_sequence_distribution(window_labels: list, session_sec: float):
 
 
 # =======================================================
-# ✅ CNN 모델 로드 (경로 여러 개 시도)
+# ✅ CNN 모델 경로 (경로 여러 개 시도)
+# - 모델 로드/추론은 cnn_worker 프로세스가 담당 (import 시점에 텐서플로 로드 X)
 # =======================================================
 LABELS = ["game", "other", "sns", "study", "webtoon", "youtube-ent", "youtube-music"]
 
@@ -141,15 +86,7 @@ def _resolve_cnn_model_path() -> Optional[str]:
     return None
 
 CNN_MODEL_PATH = _resolve_cnn_model_path()
-cnn_model = None
-if CNN_MODEL_PATH:
-    try:
-        cnn_model = load_model(CNN_MODEL_PATH)
-        print(f"[Analyzer] CNN 모델 로드 성공: {CNN_MODEL_PATH}")
-    except Exception as e:
-        print("[Analyzer] CNN 모델 로드 실패:", e)
-        cnn_model = None
-else:
+if not CNN_MODEL_PATH:
     print("⚠ CNN 모델을 찾지 못했습니다.")
 
 
@@ -159,42 +96,27 @@ else:
 def analyze_screen_images(session_id: str): # -> Tuple[Dict[str, float], Optional[str]]:
     """
     해당 session_id에 해당하는 스샷들만 모아서 CNN 예측.
-    - screen_capture.py 파일명에 session_id 포함됨.
+    - 세션 manifest(screen.csv)로 최근 8장만 찾음 (screens 폴더 전체 listdir X)
+    - 추론은 cnn_worker 프로세스에서 (동시 요청과 한 배치로 묶일 수 있음)
+    - 이미 점수를 매긴 프레임은 screen_pred_cache 에서 꺼내고 새 프레임만 추론
     """
-    if cnn_model is None:
-        return ({label: 0.0 for label in LABELS}, None)
-
-    folder = str(SCREENS_DIR)
-    if not os.path.isdir(folder):
-        return ({label: 0.0 for label in LABELS}, None)
+    client = get_inference_client(CNN_MODEL_PATH)
+    if client is None:
+        return ({label: 0.0 for label in LABELS}, None, 0)
 
-    # 세션 id 포함된 스크린샷만
-    files = [
-        f for f in os.listdir(folder)
-        if session_id in f and f.lower().endswith((".png", ".jpg", ".jpeg"))
-    ]
-    if not files:
+    recent_files = list_session_screens(session_id, last=8)
+    if not recent_files:
      return ({label: 0.0 for label in LABELS}, None, 0)
 
-    files.sort()
-    recent_files = files[-8:]
- 
-    xs = []
-    for fn in recent_files:
-        p = os.path.join(folder, fn)
-        try:
-            img = load_img(p, target_size=(128, 128))
-            arr = img_to_array(img)
-            arr = np.expand_dims(arr, axis=0) / 255.0
-            xs.append(arr)
-        except Exception:
-            continue
+    try:
+        logits = predict_frames(recent_files, client.predict, CNN_MODEL_PATH, session_id=session_id)
+    except Exception as e:
+        print("[Analyzer] CNN 추론 실패:", e)
+        return ({label: 0.0 for label in LABELS}, None, len(recent_files))
 
-    if not xs:
+    if len(logits) == 0:
         return ({label: 0.0 for label in LABELS}, None, len(recent_files))
 
-    X = np.vstack(xs)
-    logits = cnn_model.predict(X, verbose=0)
     probs = logits.mean(axis=0)
     probs = probs / (probs.sum() + 1e-8)
 
@@ -207,15 +129,20 @@ def analyze_screen_images(session_id: str): # -> Tuple[Dict[str, float], Optiona
 # =======================================================
 # ✅ CSV 로부터 세션 로그 재구성 (json 없을 때 fallback)
 # =======================================================
-def _read_csv_rows(path: Path) -> List[Dict[str, str]]:
-    if not path.exists():
-        return []
-    with path.open("r", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
-
 def _filter_by_session(rows: List[Dict[str, str]], session_id: str) -> List[Dict[str, str]]:
     return [r for r in rows if str(r.get("session_id")) == str(session_id)]
 
+def _session_rows(session_id: str, kind: str, legacy_csv: Path) -> List[Dict[str, str]]:
+    """
+    ✅ data/sessions/<sid>/<kind>.csv 세그먼트만 읽음 (O(이번 세션))
+    - 세그먼트가 없는 예전 세션은 전역 CSV의 .idx 인덱스로 해당 byte 구간만 읽음
+      (rotation 된 날짜는 log_archive 의 일자별 npz 에서 session 범위에 드는 날만)
+    """
+    rows = read_segment_rows(session_id, kind)
+    if rows is not None:
+        return rows
+    return _filter_by_session(read_history_rows(legacy_csv, session_id), session_id)
+
 def _parse_datetime_safe(s: str) -> Optional[datetime]:
     if not s:
         return None
@@ -226,8 +153,8 @@ def _parse_datetime_safe(s: str) -> Optional[datetime]:
 
 def build_logs_from_csv(session_id: str) -> Dict:
     """
-    window_log.csv / input_log.csv / process_log.csv / screen_log.csv에서
-    해당 session_id만 골라 logs 구조 생성.
+    세션 세그먼트(window/input/process/screen)에서 logs 구조 생성.
+    - 세그먼트가 없으면 window_log.csv 등 전역 CSV에서 해당 session_id만 골라 사용.
     """
     logs = {
         "session_id": session_id,
@@ -241,7 +168,7 @@ def build_logs_from_csv(session_id: str) -> Dict:
     }
 
     # window
-    w_rows = _filter_by_session(_read_csv_rows(WINDOW_CSV), session_id)
+    w_rows = _session_rows(session_id, "window", WINDOW_CSV)
     for r in w_rows:
         logs["window"].append({
             "timestamp": r.get("timestamp"),
@@ -252,22 +179,41 @@ def build_logs_from_csv(session_id: str) -> Dict:
         })
 
     # input
-    i_rows = _filter_by_session(_read_csv_rows(INPUT_CSV), session_id)
-    for r in i_rows:
-        logs["input"].append({
-            "timestamp": r.get("timestamp"),
-            "event_type": r.get("event_type"),
-            "key": r.get("key"),
-            "button": r.get("button"),
-        })
+    # - 새 세션: session.seg / input.bin → structured array 그대로 (카운트는 _summarize_logs 에서 벡터 연산)
+    # - 예전 세션: input.csv 세그먼트 / 전역 CSV
+    events = read_input_events(session_id)
+    if events is not None:
+        logs["input_events"] = events
+        # session start/end 추정에는 첫/마지막 이벤트 시각만 있으면 됨
+        ts_range = (events["ts_us"].min(), events["ts_us"].max()) if len(events) else ()
+        i_rows = [{"timestamp": ts_iso(t)} for t in ts_range]
+    else:
+        i_rows = _session_rows(session_id, "input", INPUT_CSV)
+        for r in i_rows:
+            logs["input"].append({
+                "timestamp": r.get("timestamp"),
+                "event_type": r.get("event_type"),
+                "key": r.get("key"),
+                "button": r.get("button"),
+            })
+
+    # mouse motion (1초 버킷, 전역 CSV 없음)
+    logs["motion"] = read_segment_rows(session_id, "motion") or []
 
     # process
-    p_rows = _filter_by_session(_read_csv_rows(PROCESS_CSV), session_id)
-    for r in p_rows:
-        logs["process"].append(r)
+    # - 새 세션: process_delta 스트림 (keyframe + 변경분) → tick 별 프로세스 수만 필요
+    # - 예전 세션: process.csv 세그먼트 / 전역 CSV (스냅샷마다 전체 목록)
+    timeline = read_process_timeline(session_id)
+    if timeline is not None:
+        logs["process_count"] = timeline.process_count()
+        p_rows = [{"timestamp": t} for t in timeline.ticks[:1] + timeline.ticks[-1:]]
+    else:
+        p_rows = _session_rows(session_id, "process", PROCESS_CSV)
+        for r in p_rows:
+            logs["process"].append(r)
 
     # screen
-    s_rows = _filter_by_session(_read_csv_rows(SCREEN_CSV), session_id)
+    s_rows = _session_rows(session_id, "screen", SCREEN_CSV)
     for r in s_rows:
         logs["screen"].append(r)
 
@@ -285,6 +231,88 @@ def build_logs_from_csv(session_id: str) -> Dict:
     return logs
 
 
+# =======================================================
+# ✅ 세션 요약값 (시간 / window titles·labels / 입력 카운트)
+# =======================================================
+def _session_seconds(session_start: Optional[str], session_end: Optional[str]) -> float:
+    start_dt = _parse_datetime_safe(session_start or "")
+    end_dt = _parse_datetime_safe(session_end or "")
+
+    if start_dt and end_dt:
+        return max((end_dt - start_dt).total_seconds(), 1.0)
+    # 로그가 거의 없을 때 최소값
+    return 1.0
+
+
+def _summarize_logs(logs: Dict) -> Dict:
+    """raw logs(json / csv 재구성)를 훑어서 요약값 계산."""
+    session_sec = _session_seconds(logs.get("session_start"), logs.get("session_end"))
+
+    # window titles/labels
+    window_logs = logs.get("window", [])
+
+    filtered_logs = []
+    for w in window_logs:
+        title = (w.get("title") or "").strip()
+        tl = title.lower()
+        if title == "":
+            continue
+
+        if "작업 전환" in title or "task switching" in tl:
+            continue
+        if "monitor sketcher" in tl:
+            continue
+        filtered_logs.append(w)
+
+        window_logs = filtered_logs
+    window_titles = [w.get("title", "") for w in window_logs]
+    window_labels = [w.get("label", "other") for w in window_logs]
+
+    # input count
+    events = logs.get("input_events")
+    if events is not None:
+        key_count, mouse_count = count_events(events)
+    else:
+        input_logs = logs.get("input", [])
+        key_count = 0
+        mouse_count = 0
+        for r in input_logs:
+            et = (r.get("event_type") or "").lower()
+            if et == "key_press":
+                key_count += 1
+            elif et in ("mouse_down", "mouse_up", "mouse_scroll"):
+                mouse_count += 1
+
+    return {
+        "session_start": logs.get("session_start"),
+        "session_end": logs.get("session_end"),
+        "session_sec": session_sec,
+        "window_titles": window_titles,
+        "window_labels": window_labels,
+        "key_count": key_count,
+        "mouse_count": mouse_count,
+        "idle_sec": logs.get("idle_sec", 0) or 0,
+        "process_count": logs.get("process_count", len(logs.get("process", []))),
+        "motion": add_buckets(empty_motion_totals(), logs.get("motion", [])),
+    }
+
+
+def _summarize_aggregate(agg: Dict) -> Dict:
+    """로거가 실시간으로 갱신해 둔 세션 집계값(session_aggregate) → 재집계 없이 그대로 사용."""
+    return {
+        "session_start": agg.get("session_start"),
+        "session_end": agg.get("session_end"),
+        "session_sec": _session_seconds(agg.get("session_start"), agg.get("session_end")),
+        "window_titles": agg.get("window_titles") or [],
+        "window_labels": agg.get("window_labels") or [],
+        "key_count": int(agg.get("key_count") or 0),
+        "mouse_count": int(agg.get("mouse_count") or 0),
+        "idle_sec": agg.get("idle_sec", 0) or 0,
+        "process_count": int(agg.get("process_count") or 0),
+        "motion": agg.get("motion") or empty_motion_totals(),
+    }
+
+
 # =======================================================
 # ✅ 메인 분석 함수
 # =======================================================
@@ -305,7 +333,9 @@ def analyze_and_save(
     """
 
     # ---------------------------------------------------
-    # 1) 세션 로그 json 로드 시도 (없으면 csv fallback)
+    # 1) 세션 로그 json 로드 시도
+    #    → 없으면 로거가 실시간으로 쌓아둔 세션 집계값(aggregate.json)
+    #    → 그것도 없으면 csv fallback
     # ---------------------------------------------------
     json_path = SESSION_LOG_DIR / f"{session_id}.json"
     logs = None
@@ -316,60 +346,27 @@ def analyze_and_save(
         except Exception:
             logs = None
 
-    if logs is None:
-        logs = build_logs_from_csv(session_id)
-
-    # ---------------------------------------------------
-    # 2) 세션 시간 계산
-    # ---------------------------------------------------
-    start_dt = _parse_datetime_safe(logs.get("session_start") or "")
-    end_dt = _parse_datetime_safe(logs.get("session_end") or "")
-
-    if start_dt and end_dt:
-        session_sec = max((end_dt - start_dt).total_seconds(), 1.0)
+    agg = load_aggregate(session_id) if logs is None else None
+    if agg is not None:
+        summary = _summarize_aggregate(agg)
     else:
-        # 로그가 거의 없을 때 최소값
-        session_sec = 1.0
+        if logs is None:
+            logs = build_logs_from_csv(session_id)
+        summary = _summarize_logs(logs)
 
     # ---------------------------------------------------
-    # 3) window titles/labels
+    # 2) 세션 시간 / 3) window titles·labels / 4) input count
     # ---------------------------------------------------
-    
-    window_logs = logs.get("window", [])
-    
-    filtered_logs = []
-    for w in window_logs:
-        title = (w.get("title") or "").strip()
-        tl = title.lower()
-        if title == "":
-            continue
-        
-        if "작업 전환" in title or "task switching" in tl:
-            continue
-        if "monitor sketcher" in tl:
-            continue
-        filtered_logs.append(w)  
-        
-        window_logs = filtered_logs
-    window_titles = [w.get("title", "") for w in window_logs]
-    window_labels = [w.get("label", "other") for w in window_logs]
+    session_sec = summary["session_sec"]
+    window_titles = summary["window_titles"]
+    window_labels = summary["window_labels"]
+    key_count = summary["key_count"]
+    mouse_count = summary["mouse_count"]
+    motion = motion_features(summary["motion"], session_sec)
 
     # keyword 기반 우선 라벨
     keyword_label = apply_keyword_priority(window_titles)
 
-    # ---------------------------------------------------
-    # 4) input count
-    # ---------------------------------------------------
-    input_logs = logs.get("input", [])
-    key_count = 0
-    mouse_count = 0
-    for r in input_logs:
-        et = (r.get("event_type") or "").lower()
-        if et == "key_press":
-            key_count += 1
-        elif et in ("mouse_down", "mouse_up", "mouse_scroll"):
-            mouse_count += 1
-
     # ✅ (기존에 쓰던 input_ratio 누락 버그 수정)
     total_input = key_count + mouse_count
     input_ratio = key_count / total_input if total_input > 0 else 0.0
@@ -395,7 +392,8 @@ def analyze_and_save(
         "input": {
             "key_count": key_count,
             "mouse_count": mouse_count,
-            "session_duration_sec": session_sec
+            "session_duration_sec": session_sec,
+            "motion": motion,
         },
         "window": {
             # fuzzy_system은 top_label, title을 봄
@@ -416,7 +414,7 @@ def analyze_and_save(
     # ---------------------------------------------------
     # 8) idle / focus 계산
     # ---------------------------------------------------
-    idle_sec = logs.get("idle_sec", 0) or 0
+    idle_sec = summary["idle_sec"]
     idle_ratio = idle_sec / session_sec if session_sec > 0 else 0.0
 
     focus_ratio = seq_ratio.get(selected_task, 0.0)
@@ -430,8 +428,8 @@ def analyze_and_save(
         "user_id": user_id,
         "usage_index": usage_index,
         "selected_task": selected_task,
-        "session_start": logs.get("session_start"),
-        "session_end": logs.get("session_end"),
+        "session_start": summary["session_start"],
+        "session_end": summary["session_end"],
 
         "final_label": final_label,   # ✅ test.html에서 필요
         "predicted": final_label,     # server.py에서 쓰던 이름 유지
@@ -466,6 +464,7 @@ def analyze_and_save(
         "input": {
             "key_count": key_count,
             "mouse_count": mouse_count,
+            "motion": motion,
         },
 
         "engagement": {
@@ -479,7 +478,7 @@ def analyze_and_save(
 
         # ✅ process count (있으면)
         "process": {
-            "process_count": len(logs.get("process", []))
+            "process_count": summary["process_count"]
         },
 
         # ✅ 화면/서버가 쓰던 필드 일부도 유지
@@ -498,5 +497,11 @@ def analyze_and_save(
     except Exception as e:
         print("[Analyzer] 분석 결과 저장 실패:", e)
 
+    # 세션 카탈로그 (목록/요약 API 가 분석 파일 전부 스캔하지 않도록)
+    try:
+        record_session(result)
+    except Exception as e:
+        print("[Analyzer] 세션 카탈로그 기록 실패:", e)
+
     return result
 
@@ -0,0 +1,133 @@
+# bench_title_matcher.py
+"""
+제목 키워드 매칭 벤치마크: 예전 이중 for 루프 vs keyword_matcher 컴파일 매처.
+
+사용:
+    python bench_title_matcher.py                 # backend/data, ../data 의 window_log.csv 제목 사용
+    python bench_title_matcher.py --repeat 200
+
+- 같은 제목에 대해 결과가 완전히 같은지 먼저 확인한 뒤 제목 1개당 평균 시간(µs) 출력
+"""
+import argparse
+import csv
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import fuzzy_system
+import title_labels
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_LOGS = [
+    BASE_DIR / "data" / "window_log.csv",
+    BASE_DIR / ".." / "data" / "window_log.csv",
+]
+
+
+# -------------------------------------------------------
+# 예전 구현 (비교 기준)
+# -------------------------------------------------------
+def legacy_label_from_title(title: str) -> str:
+    if not title:
+        return "other"
+    tl = title.lower()
+    for label, keywords in title_labels.TITLE_KEYWORDS.items():
+        for kw in keywords:
+            if kw.lower() in tl:
+                return label
+    return "other"
+
+
+def legacy_is_music_title(title: str) -> bool:
+    if not title:
+        return False
+    title_lower = title.lower()
+    for kw in title_labels.MUSIC_KEYWORDS:
+        if kw.lower() in title_lower:
+            return True
+    return False
+
+
+def legacy_apply_keyword_priority(window_titles: list):
+    if not window_titles:
+        return None
+    title_str = " ".join(t.lower() for t in window_titles if isinstance(t, str))
+    for label, keywords in title_labels.TITLE_KEYWORDS.items():
+        for kw in keywords:
+            if kw.lower() in title_str:
+                return label
+    return None
+
+
+def _legacy_match_keywords(title: str, keywords: list) -> bool:
+    if not title:
+        return False
+    title_lower = title.lower()
+    return any(kw.lower() in title_lower for kw in keywords)
+
+
+def legacy_get_label_from_title(title: str):
+    if _legacy_match_keywords(title, fuzzy_system.MUSIC_KEYWORDS): return "youtube-music"
+    if _legacy_match_keywords(title, fuzzy_system.OTT_KEYWORDS): return "ott"
+    if _legacy_match_keywords(title, fuzzy_system.WEBTOON_KEYWORDS): return "webtoon"
+    if _legacy_match_keywords(title, fuzzy_system.SNS_KEYWORDS): return "sns"
+    if _legacy_match_keywords(title, fuzzy_system.GAME_KEYWORDS): return "game"
+    if _legacy_match_keywords(title, fuzzy_system.STUDY_KEYWORDS): return "study"
+    return None
+
+
+# -------------------------------------------------------
+# 벤치마크
+# -------------------------------------------------------
+def load_titles(paths: List[Path]) -> List[str]:
+    titles = []
+    for p in paths:
+        if not p.exists():
+            continue
+        with p.open("r", newline="", encoding="utf-8") as f:
+            titles.extend(r.get("window_title") or "" for r in csv.DictReader(f))
+    return titles
+
+
+def _time_per_item(fn: Callable, items: list, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for x in items:
+            fn(x)
+    return (time.perf_counter() - t0) / (repeat * max(len(items), 1)) * 1e6
+
+
+def run(titles: List[str], repeat: int):
+    # apply_keyword_priority 는 제목 리스트 단위 → 20개씩 묶어서 측정
+    windows = [titles[i:i + 20] for i in range(0, len(titles), 20)]
+
+    cases = [
+        ("analyzer.label_from_title", legacy_label_from_title, title_labels.label_from_title, titles),
+        ("analyzer.is_music_title", legacy_is_music_title, title_labels.is_music_title, titles),
+        ("analyzer.apply_keyword_priority", legacy_apply_keyword_priority, title_labels.apply_keyword_priority, windows),
+        ("fuzzy_system.get_label_from_title", legacy_get_label_from_title, fuzzy_system.get_label_from_title, titles),
+    ]
+
+    print(f"titles: {len(titles)}, repeat: {repeat}")
+    print(f"{'call site':36s} {'legacy(us)':>11s} {'compiled(us)':>13s} {'speedup':>8s}")
+    for name, old_fn, new_fn, items in cases:
+        mismatch = [x for x in items if old_fn(x) != new_fn(x)]
+        if mismatch:
+            print(f"[bench] ❌ {name}: 결과 불일치 {len(mismatch)}건 (예: {mismatch[0]!r})")
+            continue
+        t_old = _time_per_item(old_fn, items, repeat)
+        t_new = _time_per_item(new_fn, items, repeat)
+        print(f"{name:36s} {t_old:11.2f} {t_new:13.2f} {t_old / max(t_new, 1e-9):7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="title keyword matcher benchmark")
+    parser.add_argument("--log", action="append", type=Path, help="window_log.csv 경로 (여러 번 지정 가능)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    titles = load_titles(args.log or DEFAULT_LOGS)
+    if not titles:
+        print("[bench] window_log.csv 제목이 없습니다.")
+    else:
+        run(titles, args.repeat)
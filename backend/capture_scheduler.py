@@ -0,0 +1,198 @@
+# capture_scheduler.py
+"""
+활동량에 따라 스크린샷 간격을 조절하는 세션별 캡쳐 스케줄러.
+
+- window_logger: 활성 창이 바뀌면 on_window_change() → SWITCH_DELAY 뒤 바로 캡쳐
+- input_logger : 입력 이벤트 배치마다 on_input(n) → BURST_WINDOW 안에 BURST_EVENTS 개 이상이면
+                 간격을 기본값으로 되돌림 (활발히 작업 중)
+- screen_capture: 캡쳐 결과를 on_frame(changed) 로 알려줌
+    변화 없음(unchanged) → 간격을 BACKOFF 배씩 늘림 (최대 MAX_INTERVAL)
+    변화 있음           → 기본 간격으로 복귀
+- 세션당 저장 프레임 수 목표(FRAME_BUDGET, 0=무제한): 예산을 세션 전체에 나눠 씀
+    남은 예산 / 남은 시간(EXPECTED_SESSION_SEC, 넘기면 지금까지 길이만큼 더 간다고 가정) 으로 최소 간격을 늘림
+    다 쓴 뒤에도 캡쳐를 멈추지 않고 "경과 시간 / 예산" 간격으로 계속 (긴 세션 뒷부분도 화면 분류)
+- 캡쳐 도중 창 전환 / 입력 burst 로 간격이 리셋되면 그 캡쳐 결과로 backoff 하지 않고, 당겨 둔 다음 캡쳐 시각 유지
+- 로거들은 session_id 만 알면 됨 (session_aggregate 와 같은 레지스트리 구조)
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+BASE_INTERVAL = float(os.getenv("SCREEN_BASE_INTERVAL", "2.0"))     # 기본 캡쳐 간격
+MAX_INTERVAL = float(os.getenv("SCREEN_MAX_INTERVAL", "30.0"))      # 화면 변화 없을 때 최대 간격
+MIN_GAP = float(os.getenv("SCREEN_MIN_GAP", "0.5"))                 # 창 전환이 몰려도 캡쳐 사이 최소 간격
+BACKOFF = float(os.getenv("SCREEN_BACKOFF", "1.5"))
+SWITCH_DELAY = float(os.getenv("SCREEN_SWITCH_DELAY", "0.3"))       # 창 전환 후 화면이 그려질 시간
+BURST_EVENTS = int(os.getenv("SCREEN_BURST_EVENTS", "8"))
+BURST_WINDOW = float(os.getenv("SCREEN_BURST_WINDOW", "2.0"))
+FRAME_BUDGET = int(os.getenv("SCREEN_FRAME_BUDGET", "0"))
+EXPECTED_SESSION_SEC = float(os.getenv("SCREEN_EXPECTED_SESSION_SEC", "1800"))   # 예산 분배 기준 세션 길이
+
+
+class CaptureScheduler:
+    def __init__(self, session_id: str, base_interval: float = BASE_INTERVAL, frame_budget: int = FRAME_BUDGET):
+        self.session_id = str(session_id)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self.base_interval = base_interval
+        self.interval = base_interval
+        self.frame_budget = frame_budget
+        self.frames_kept = 0
+
+        now = time.monotonic()
+        self._started = now
+        self._last_at: Optional[float] = None
+        self._next_at = now
+        self._burst_start = now
+        self._burst_count = 0
+        # 간격 리셋(창 전환 / 입력 burst) 번호 — 캡쳐 시작 때 값과 다르면 캡쳐 도중 리셋된 것
+        self._reset_seq = 0
+        self._capture_seq = 0
+
+        # 통계 (로그/디버깅용)
+        self.switch_captures = 0
+        self.unchanged = 0
+
+    def set_base_interval(self, interval: float):
+        with self._lock:
+            self.base_interval = interval
+            self.interval = interval
+
+    # ---------------------------------------------------
+    # 신호 (다른 로거 스레드에서 호출)
+    # ---------------------------------------------------
+    def on_window_change(self):
+        with self._lock:
+            self.interval = self.base_interval
+            self._reset_seq += 1
+            now = time.monotonic()
+            at = now + SWITCH_DELAY
+            if self._last_at is not None:
+                at = max(at, self._last_at + MIN_GAP)
+                if self.frame_budget > 0 and self.frames_kept >= self.frame_budget:
+                    # 예산을 다 쓴 뒤에는 창 전환 캡쳐도 분배 간격을 지킴
+                    at = max(at, self._last_at + self._pace_interval(now))
+            if at < self._next_at:
+                self._next_at = at
+                self.switch_captures += 1
+                self._wake.set()
+
+    def on_input(self, n: int = 1):
+        """입력 이벤트 n개 (input_logger writer 가 배치로 전달). 카운터만 갱신."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._burst_start > BURST_WINDOW:
+                self._burst_start = now
+                self._burst_count = 0
+            before = self._burst_count
+            self._burst_count += n
+            if before < BURST_EVENTS <= self._burst_count and self.interval > self.base_interval:
+                self.interval = self.base_interval
+                self._reset_seq += 1
+                if self._last_at is not None:
+                    at = max(self._last_at + self.base_interval, now)
+                    if at < self._next_at:
+                        self._next_at = at
+                        self._wake.set()
+
+    def on_frame(self, changed: bool, kept: bool = True):
+        """screen_capture: 캡쳐 1장 처리 결과. kept=실제로 저장한 프레임(예산 차감)."""
+        with self._lock:
+            # 캡쳐 도중 간격이 리셋됨 → 이 프레임은 리셋 전 화면이므로 backoff 근거가 아님
+            reset_during = self._reset_seq != self._capture_seq
+            if changed:
+                self.interval = self.base_interval
+            else:
+                self.unchanged += 1
+                if not reset_during:
+                    self.interval = min(self.interval * BACKOFF, MAX_INTERVAL)
+            if kept:
+                self.frames_kept += 1
+            now = time.monotonic()
+            at = (self._last_at or now) + self._effective_interval(now)
+            # 리셋이 당겨 둔 캡쳐(창 전환 직후) 는 그대로 유지
+            self._next_at = min(self._next_at, at) if reset_during else at
+
+    # ---------------------------------------------------
+    # 캡쳐 루프 (screen_capture)
+    # ---------------------------------------------------
+    @property
+    def budget_left(self) -> bool:
+        return self.frame_budget <= 0 or self.frames_kept < self.frame_budget
+
+    def _pace_interval(self, now: float) -> float:
+        """예산을 세션 전체에 나눠 쓰기 위한 최소 간격 (예산 없으면 0)."""
+        if self.frame_budget <= 0:
+            return 0.0
+        elapsed = max(now - self._started, 0.0)
+        left = self.frame_budget - self.frames_kept
+        if left <= 0:
+            # 예산 초과 후: 세션 길이 대비 예산 밀도로 계속 (길어질수록 천천히)
+            return elapsed / self.frame_budget
+        # 예상 길이를 넘기면 지금까지만큼 더 간다고 보고 남은 예산을 나눔
+        horizon = max(EXPECTED_SESSION_SEC - elapsed, elapsed)
+        return horizon / left
+
+    def _effective_interval(self, now: float) -> float:
+        return max(self.interval, self._pace_interval(now))
+
+    def wait_next(self, stop_event: threading.Event) -> bool:
+        """다음 캡쳐 시각까지 대기. 캡쳐해야 하면 True, 종료면 False (예산은 간격만 늘림)."""
+        while True:
+            if stop_event.is_set() or self._closed:
+                return False
+            with self._lock:
+                now = time.monotonic()
+                remaining = self._next_at - now
+                if remaining <= 0:
+                    self._last_at = now
+                    self._next_at = now + self._effective_interval(now)
+                    self._capture_seq = self._reset_seq
+                    return True
+                self._wake.clear()
+            self._wake.wait(remaining)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "frames_kept": self.frames_kept,
+                "frame_budget": self.frame_budget,
+                "pace_interval": round(self._pace_interval(time.monotonic()), 2),
+                "switch_captures": self.switch_captures,
+                "unchanged": self.unchanged,
+            }
+
+
+# =======================================================
+# 세션별 스케줄러 레지스트리
+# =======================================================
+_registry: Dict[str, CaptureScheduler] = {}
+_registry_lock = threading.Lock()
+
+
+def get_scheduler(session_id: str) -> CaptureScheduler:
+    sid = str(session_id)
+    with _registry_lock:
+        sched = _registry.get(sid)
+        if sched is None:
+            sched = CaptureScheduler(sid)
+            _registry[sid] = sched
+        return sched
+
+
+def close_scheduler(session_id: str) -> Optional[Dict]:
+    """세션 종료: 대기 중인 캡쳐 루프를 깨우고 레지스트리에서 제거."""
+    with _registry_lock:
+        sched = _registry.pop(str(session_id), None)
+    if sched is None:
+        return None
+    sched.close()
+    return sched.stats()
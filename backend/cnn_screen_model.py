@@ -3,8 +3,10 @@ import os
 from typing import Dict, List, Optional
 
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
+
+from cnn_worker import get_inference_client
+from screen_manifest import IMAGE_EXTS, list_session_screens
+from screen_pred_cache import predict_frames
 
 # ✅ train_cnn.py / monitor_model.h5에서 학습한 라벨 순서 그대로 유지 (절대 줄이지 않음)
 LABELS = ["game", "other", "sns", "study", "webtoon", "youtube-ent", "youtube-music"]
@@ -17,20 +19,14 @@ MODEL_PATH = os.path.join(BASE_DIR, "monitor_model.h5")
 # ✅ screen_capture.py가 저장하는 경로와 동일
 SCREEN_DIR = os.path.join(BASE_DIR, ".", "data", "screens")
 
-_model = None
-
-
 def _get_model():
-    """싱글톤 방식으로 CNN 모델 로드."""
-    global _model
-    if _model is None:
-        if not os.path.exists(MODEL_PATH):
-            raise FileNotFoundError(
-                f"[cnn_screen_model] CNN 모델 파일을 찾을 수 없습니다: {MODEL_PATH}"
-            )
-        _model = load_model(MODEL_PATH)
-        print(f"[cnn_screen_model] CNN 모델 로드 성공: {MODEL_PATH}")
-    return _model
+    """CNN 추론 워커(cnn_worker) 클라이언트 반환. 모델 로드는 워커 프로세스에서."""
+    client = get_inference_client(MODEL_PATH)
+    if client is None:
+        raise FileNotFoundError(
+            f"[cnn_screen_model] CNN 모델 파일을 찾을 수 없습니다: {MODEL_PATH}"
+        )
+    return client
 
 
 def _list_screen_files() -> List[str]:
@@ -39,7 +35,7 @@ def _list_screen_files() -> List[str]:
 
     files = [
         f for f in os.listdir(SCREEN_DIR)
-        if f.lower().endswith((".png", ".jpg", ".jpeg"))
+        if f.lower().endswith(IMAGE_EXTS)
     ]
     files.sort()  # timestamp 기반 파일명이라면 시간순 정렬됨
     return files
@@ -48,20 +44,18 @@ def _list_screen_files() -> List[str]:
 def _load_recent_screens(n: int = 5, session_id: Optional[str] = None) -> List[str]:
     """
     data/screens 폴더에서 최근 스크린샷 경로 n개 반환.
-    - session_id가 주어지면 해당 세션 스크린만 필터링.
-    - 필터링 결과가 없으면 전체 최근 n개로 fallback.
+    - session_id가 주어지면 세션 manifest로 해당 세션 스크린만 조회 (폴더 전체 스캔 X).
+    - 세션 스크린이 없으면 전체 최근 n개로 fallback.
     """
+    if session_id:
+        sess_paths = list_session_screens(session_id, last=n)
+        if sess_paths:
+            return [str(p) for p in sess_paths]
+
     files = _list_screen_files()
     if not files:
         return []
 
-    if session_id:
-        # screen_capture.py 파일명: user{uid}_sess{session_id}_run{usage}_...png
-        sess_key = f"_sess{session_id}_"
-        sess_files = [f for f in files if sess_key in f]
-        if sess_files:
-            files = sess_files  # 세션 파일이 있으면 그걸로만 사용
-
     recent = files[-n:]
     return [os.path.join(SCREEN_DIR, f) for f in recent]
 
@@ -87,28 +81,15 @@ def predict_screen_probs(n_images: int = 5, session_id: Optional[str] = None) ->
             "top_label": None,
         }
 
-    xs = []
-    for p in paths:
-        try:
-            # ✅ 모델 학습 input 크기 유지 (128x128)
-            img = image.load_img(p, target_size=(128, 128))
-            arr = image.img_to_array(img)
-            arr = np.expand_dims(arr, axis=0)
-            arr = arr / 255.0
-            xs.append(arr)
-        except Exception as e:
-            print(f"[cnn_screen_model] 이미지 로드 실패: {p} ({e})")
-
-    if not xs:
+    # (N, num_labels) — 캐시에 없는 프레임만 워커에서 추론 (정규화 /255 도 워커에서)
+    logits = predict_frames(paths, model.predict, MODEL_PATH, session_id=session_id)
+
+    if len(logits) == 0:
         return {
             "probs": {label: 0.0 for label in LABELS},
             "top_label": None,
         }
 
-    X = np.vstack(xs)
-
-    # (N, num_labels)
-    logits = model.predict(X, verbose=0)
     probs = logits.mean(axis=0)
 
     # 안정화
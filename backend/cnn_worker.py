@@ -0,0 +1,185 @@
+# cnn_worker.py
+"""
+CNN 추론 전용 워커 프로세스 + micro-batching.
+
+- 모델(monitor_model.h5)은 워커 프로세스만 로드 (Flask 요청 스레드/서버 프로세스는 텐서플로 로드 X)
+- 요청 큐에서 첫 요청을 받은 뒤 최대 CNN_MAX_WAIT_MS 동안 다른 요청을 더 모아서
+  프레임 합계 CNN_MAX_BATCH 까지 한 번의 predict 로 처리
+  → 동시에 들어온 /api/test/stop 들은 forward pass 한 번 비용
+- 입력은 uint8 (N, 128, 128, 3) 그대로 전달 (큐 전송량 1/4), 정규화(/255)는 워커에서
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+CNN_MAX_BATCH = int(os.getenv("CNN_MAX_BATCH", "64"))         # 한 번에 predict 할 최대 프레임 수
+CNN_MAX_WAIT_MS = float(os.getenv("CNN_MAX_WAIT_MS", "25"))   # 첫 요청 이후 추가 요청을 기다리는 시간
+CNN_PREDICT_TIMEOUT = float(os.getenv("CNN_PREDICT_TIMEOUT", "120"))
+CNN_WORKER_START_METHOD = os.getenv("CNN_WORKER_START_METHOD") or None  # fork / spawn / forkserver
+
+_READY = "__ready__"
+_FAILED = "__failed__"
+
+
+# =======================================================
+# 워커 프로세스
+# =======================================================
+def _worker_main(model_path: str, req_q, resp_q, max_batch: int, max_wait_sec: float):
+    try:
+        from tensorflow.keras.models import load_model
+        model = load_model(model_path)
+        print(f"[cnn_worker] CNN 모델 로드 성공: {model_path}")
+    except Exception as e:
+        resp_q.put((_FAILED, None, repr(e)))
+        return
+    resp_q.put((_READY, None, None))
+
+    stopping = False
+    while not stopping:
+        item = req_q.get()
+        if item is None:
+            break
+
+        batch = [item]
+        n_frames = len(item[1])
+        deadline = time.monotonic() + max_wait_sec
+        while n_frames < max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                nxt = req_q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if nxt is None:
+                stopping = True
+                break
+            batch.append(nxt)
+            n_frames += len(nxt[1])
+
+        try:
+            X = np.concatenate([x for _, x in batch]).astype(np.float32) / 255.0
+            out = model.predict(X, verbose=0)
+            offset = 0
+            for req_id, x in batch:
+                resp_q.put((req_id, out[offset:offset + len(x)], None))
+                offset += len(x)
+        except Exception as e:
+            for req_id, _ in batch:
+                resp_q.put((req_id, None, repr(e)))
+
+
+# =======================================================
+# 서버 프로세스 쪽 클라이언트
+# =======================================================
+class InferenceClient:
+    def __init__(self, model_path: str, max_batch: int = CNN_MAX_BATCH, max_wait_ms: float = CNN_MAX_WAIT_MS):
+        ctx = mp.get_context(CNN_WORKER_START_METHOD)
+        self.model_path = model_path
+        self._req_q = ctx.Queue()
+        self._resp_q = ctx.Queue()
+        self._proc = ctx.Process(
+            target=_worker_main,
+            args=(model_path, self._req_q, self._resp_q, max_batch, max_wait_ms / 1000.0),
+            daemon=True,
+        )
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending: Dict[int, list] = {}   # req_id → [Event, 결과, 에러]
+        self.error: Optional[str] = None
+        self.load_failed = False
+
+        self._proc.start()
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.error is None and self._proc.is_alive()
+
+    def _fail_all(self, message: str):
+        self.error = self.error or message
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for slot in pending:
+            slot[2] = message
+            slot[0].set()
+
+    def _read_responses(self):
+        while True:
+            try:
+                req_id, probs, err = self._resp_q.get(timeout=1.0)
+            except queue.Empty:
+                if not self._proc.is_alive():
+                    self._fail_all("cnn worker 프로세스 종료됨")
+                    return
+                continue
+            except (EOFError, OSError):
+                self._fail_all("cnn worker 연결 끊김")
+                return
+
+            if req_id == _READY:
+                continue
+            if req_id == _FAILED:
+                self.load_failed = True
+                self._fail_all(f"모델 로드 실패: {err}")
+                return
+
+            with self._lock:
+                slot = self._pending.pop(req_id, None)
+            if slot is not None:
+                slot[1], slot[2] = probs, err
+                slot[0].set()
+
+    def predict(self, X: np.ndarray, timeout: float = CNN_PREDICT_TIMEOUT) -> np.ndarray:
+        """X: uint8 (N, H, W, 3) → (N, num_labels) 확률."""
+        if not self.alive:
+            raise RuntimeError(f"[cnn_worker] 사용 불가: {self.error}")
+
+        req_id = next(self._ids)
+        slot = [threading.Event(), None, None]
+        with self._lock:
+            self._pending[req_id] = slot
+        self._req_q.put((req_id, np.ascontiguousarray(X, dtype=np.uint8)))
+
+        if not slot[0].wait(timeout):
+            with self._lock:
+                self._pending.pop(req_id, None)
+            raise TimeoutError("[cnn_worker] 추론 응답 시간 초과")
+        if slot[2] is not None:
+            raise RuntimeError(f"[cnn_worker] 추론 실패: {slot[2]}")
+        return slot[1]
+
+    def close(self, timeout: float = 5.0):
+        try:
+            self._req_q.put(None)
+            self._proc.join(timeout)
+        finally:
+            if self._proc.is_alive():
+                self._proc.terminate()
+
+
+_clients: Dict[str, InferenceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_inference_client(model_path: Optional[str]) -> Optional[InferenceClient]:
+    """
+    모델 경로별 워커 1개 (죽었으면 다시 띄움). 모델 파일이 없으면 None.
+    - 모델 로드 자체가 실패한 경우는 재시도하지 않음 (predict 시 RuntimeError)
+    """
+    if not model_path or not os.path.exists(model_path):
+        return None
+    with _clients_lock:
+        client = _clients.get(model_path)
+        if client is None or (not client.alive and not client.load_failed):
+            client = InferenceClient(model_path)
+            _clients[model_path] = client
+        return client
@@ -0,0 +1,193 @@
+# csv_index.py
+"""
+전역 로그 CSV(window_log.csv 등)용 세션 byte-offset 인덱스 (sidecar: <csv>.idx)
+
+- {session_id: [[start, end], ...]} 형태로 세션별 byte 구간을 저장
+- 같은 세션의 연속된 행은 한 구간으로 합쳐짐 → 세션당 보통 구간 1~몇 개
+- 인덱스가 기록한 끝 위치(indexed_size) 이후에 append된 꼬리만 추가로 스캔
+  (파일이 줄었거나 헤더가 바뀌었으면 = 교체/로테이션 → 전체 재색인)
+- 조회 시에는 해당 구간만 seek 해서 읽으므로, 히스토리가 길어져도 세션 조회 비용은 거의 일정
+"""
+import csv
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+INDEX_VERSION = 1
+
+_lock = threading.Lock()
+# { csv경로: (idx파일 mtime_ns, index dict) } — 프로세스 내 캐시
+_cache: Dict[str, Tuple[int, Dict]] = {}
+
+
+def index_path(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + ".idx")
+
+
+def _iter_records(f, start: int):
+    """
+    binary 파일에서 CSV 레코드 단위로 (시작 offset, 끝 offset, bytes) 생성.
+    - 따옴표 안의 줄바꿈(창 제목 등)도 한 레코드로 묶기 위해 따옴표 개수 짝수 여부로 판단
+    """
+    f.seek(start)
+    pos = start
+    buf = b""
+    rec_start = pos
+    for line in iter(f.readline, b""):
+        if not buf:
+            rec_start = pos
+        buf += line
+        pos += len(line)
+        if buf.count(b'"') % 2 == 0:
+            yield rec_start, pos, buf
+            buf = b""
+    # 마지막 줄이 아직 다 안 써진(따옴표 미완성) 경우는 다음 색인 때 다시 처리
+
+
+def _parse_record(raw: bytes) -> List[str]:
+    try:
+        return next(csv.reader(io.StringIO(raw.decode("utf-8"))), [])
+    except Exception:
+        return []
+
+
+def _new_index() -> Dict:
+    return {"version": INDEX_VERSION, "header": None, "header_end": 0, "indexed_size": 0, "sessions": {}}
+
+
+def _scan(csv_path: Path, index: Dict) -> Dict:
+    """indexed_size 이후 꼬리 부분만 색인해서 index를 갱신."""
+    with csv_path.open("rb") as f:
+        if index["header"] is None:
+            header_raw = f.readline()
+            index["header"] = _parse_record(header_raw)
+            index["header_end"] = len(header_raw)
+            index["indexed_size"] = len(header_raw)
+
+        header = index["header"] or []
+        if "session_id" not in header:
+            return index
+        sid_idx = header.index("session_id")
+
+        sessions = index["sessions"]
+        for start, end, raw in _iter_records(f, index["indexed_size"]):
+            if not raw.endswith(b"\n"):
+                break  # 쓰는 중인 마지막 줄
+            row = _parse_record(raw)
+            index["indexed_size"] = end
+            if len(row) <= sid_idx:
+                continue
+            sid = row[sid_idx]
+            ranges = sessions.setdefault(sid, [])
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end          # 연속된 행이면 구간 확장
+            else:
+                ranges.append([start, end])
+    return index
+
+
+def _load_index_file(p: Path) -> Optional[Dict]:
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        return data
+    except Exception:
+        return None
+
+
+def _save_index_file(p: Path, index: Dict):
+    tmp = p.with_name(p.name + ".tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, p)
+    except Exception as e:
+        print("[csv_index] 인덱스 저장 실패:", e)
+
+
+def _header_matches(csv_path: Path, index: Dict) -> bool:
+    with csv_path.open("rb") as f:
+        return _parse_record(f.readline()) == index.get("header")
+
+
+def ensure_index(csv_path: Path) -> Optional[Dict]:
+    """
+    인덱스를 최신 상태로 맞춰서 반환.
+    - 새로 append된 꼬리만 증분 색인
+    - 파일이 줄었거나 헤더가 바뀌면 전체 재색인
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        return None
+
+    key = str(csv_path)
+    idx_path = index_path(csv_path)
+
+    with _lock:
+        index = None
+        try:
+            idx_mtime = idx_path.stat().st_mtime_ns
+        except OSError:
+            idx_mtime = None
+
+        cached = _cache.get(key)
+        if cached and idx_mtime is not None and cached[0] == idx_mtime:
+            index = cached[1]
+        elif idx_mtime is not None:
+            index = _load_index_file(idx_path)
+
+        size = csv_path.stat().st_size
+        if index is not None and (size < index["indexed_size"] or not _header_matches(csv_path, index)):
+            index = None
+
+        if index is None:
+            index = _new_index()
+
+        if index["indexed_size"] < size or index["header"] is None:
+            index = _scan(csv_path, index)
+            _save_index_file(idx_path, index)
+            try:
+                idx_mtime = idx_path.stat().st_mtime_ns
+            except OSError:
+                idx_mtime = None
+
+        if idx_mtime is not None:
+            _cache[key] = (idx_mtime, index)
+        return index
+
+
+def read_session_rows(csv_path: Path, session_id: str) -> List[Dict[str, str]]:
+    """
+    인덱스의 byte 구간만 seek 해서 해당 세션 행들만 list[dict]로 반환.
+    """
+    index = ensure_index(csv_path)
+    if not index or not index.get("header"):
+        return []
+
+    ranges = index["sessions"].get(str(session_id))
+    if not ranges:
+        return []
+
+    header = index["header"]
+    rows: List[Dict[str, str]] = []
+    with Path(csv_path).open("rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            chunk = f.read(end - start).decode("utf-8")
+            rows.extend(csv.DictReader(io.StringIO(chunk, newline=""), fieldnames=header))
+    return rows
+
+
+if __name__ == "__main__":
+    # 전역 CSV 인덱스 미리 생성/갱신
+    import sys
+
+    for p in sys.argv[1:]:
+        idx = ensure_index(Path(p))
+        n = len(idx["sessions"]) if idx else 0
+        print(f"[csv_index] {p}: 세션 {n}개 색인")
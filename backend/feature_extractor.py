@@ -3,23 +3,6 @@ import pandas as pd
 import numpy as np
 
 
-#############################################
-#   🔥 세션 ID 불러오기
-#############################################
-
-def load_session_id():
-    """
-    서버에서 검사 종료 시 기록되는
-    data/current_session_id.txt 에서 session_id 읽기
-    """
-    path = "data/current_session_id.txt"
-    if not os.path.exists(path):
-        raise FileNotFoundError("[FeatureExtractor] current_session_id.txt 없음")
-
-    with open(path, "r") as f:
-        return f.read().strip()
-
-
 #############################################
 #   🔥 세션별 raw 파일 경로 세팅
 #############################################
@@ -118,12 +101,12 @@ def extract_process_features(csv_path: str):
 #   🔥 세션 기반 전체 feature 추출
 #############################################
 
-def extract_session_features():
+def extract_session_features(session_id: str):
     """
     🔥 server.py → analyzer.py 로 넘어가는 중간 단계
     - session_id 기반으로 raw 파일 가져옴
+      (예전 전역 data/current_session_id.txt 는 동시 검사에서 다른 유저 세션을 읽게 되어 제거 → 직접 전달)
     """
-    session_id = load_session_id()
     paths = get_session_paths(session_id)
 
     input_f = extract_input_features(paths["input"])
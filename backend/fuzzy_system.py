@@ -1,6 +1,8 @@
 import re
 from typing import Dict, Any
 
+from keyword_matcher import KeywordMatcher, matcher_for
+
 LABELS = [
     "game", "other", "sns", "study", "webtoon",
     "youtube-ent", "youtube-music", "ott"
@@ -40,21 +42,24 @@ STUDY_KEYWORDS = [
     "edu", "study", "research", "document", "code"
 ]
 
+# ---- 타이틀 판별용 컴파일된 매처 (우선순위: music > ott > webtoon > sns > game > study) ---- #
+_TITLE_MATCHER = KeywordMatcher([
+    ("youtube-music", MUSIC_KEYWORDS),
+    ("ott", OTT_KEYWORDS),
+    ("webtoon", WEBTOON_KEYWORDS),
+    ("sns", SNS_KEYWORDS),
+    ("game", GAME_KEYWORDS),
+    ("study", STUDY_KEYWORDS),
+])
+
 # ---- 타이틀 기반 판별 ---- #
 def match_keywords(title: str, keywords: list) -> bool:
     if not title:
         return False
-    title_lower = title.lower()
-    return any(kw.lower() in title_lower for kw in keywords)
+    return matcher_for(keywords).contains_any(title)
 
 def get_label_from_title(title: str) -> str:
-    if match_keywords(title, MUSIC_KEYWORDS): return "youtube-music"
-    if match_keywords(title, OTT_KEYWORDS): return "ott"
-    if match_keywords(title, WEBTOON_KEYWORDS): return "webtoon"
-    if match_keywords(title, SNS_KEYWORDS): return "sns"
-    if match_keywords(title, GAME_KEYWORDS): return "game"
-    if match_keywords(title, STUDY_KEYWORDS): return "study"
-    return None
+    return _TITLE_MATCHER.match(title)
 
 # ---- 퍼지 로직 메인 ---- #
 def apply_fuzzy_rules(result: Dict[str, Any]) -> str:
@@ -117,6 +122,15 @@ def apply_fuzzy_rules(result: Dict[str, Any]) -> str:
                 scores["sns"] += 0.15
 
 
+    # ✅ 마우스 이동 강도 (mouse_motion 1초 버킷)
+    # 에임/시점 조작처럼 자주 움직이고 방향이 계속 꺾이는 패턴이면 게임 가산
+    motion = input_res.get("motion") or {}
+    if motion.get("active_ratio", 0) > 0.3 and motion.get("turns_per_active_sec", 0) > 2.0:
+        scores["game"] += 0.1
+        if motion.get("peak_velocity", 0) > 3000:
+            scores["game"] += 0.05
+
+
     # ----- 3. 사용자가 선택한 라벨 보정 ----- #
     if selected_task and selected_task in scores:
         scores[selected_task] += 0.25
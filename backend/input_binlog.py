@@ -0,0 +1,205 @@
+# input_binlog.py
+"""
+입력 이벤트 바이너리 로그 (data/sessions/<sid>/input.bin)
+
+input.csv 는 행마다 ISO 시간 문자열 + user_id/session_id/usage_index/task_label 을 반복 →
+고정 길이 레코드 + 파일 헤더 1번으로 교체.
+
+파일 구조:
+    MAGIC(4) | version uint16 | header_len uint32 | header JSON (user_id, session_id, usage_index, task_label, ...)
+    레코드 * N   ("<qBHhh" = 15 bytes)
+        ts_us  int64   UTC epoch µs
+        event  uint8   EVENT_CODES
+        key    uint16  키: 문자=유니코드 code point, 특수키=0xE000+index(SPECIAL_KEYS) / 마우스: 버튼 코드
+        x, y   int16   마우스 좌표 (키 이벤트는 0)
+- 읽기: read_input_events() → NumPy structured array (np.fromfile 한 번)
+- 마지막 레코드가 덜 써졌으면(프로세스 강제 종료) 그 레코드만 무시
+"""
+import json
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from session_segments import session_dir
+
+MAGIC = b"MSIN"
+VERSION = 1
+BIN_FILENAME = "input.bin"
+
+_PREFIX = struct.Struct("<4sHI")
+RECORD = struct.Struct("<qBHhh")
+RECORD_DTYPE = np.dtype([("ts_us", "<i8"), ("event", "u1"), ("key", "<u2"), ("x", "<i2"), ("y", "<i2")])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+EVENT_CODES = {"key_press": 1, "mouse_down": 2, "mouse_up": 3, "mouse_scroll": 4}
+EVENT_NAMES = {v: k for k, v in EVENT_CODES.items()}
+KEY_EVENT_CODES = (EVENT_CODES["key_press"],)
+MOUSE_EVENT_CODES = (EVENT_CODES["mouse_down"], EVENT_CODES["mouse_up"], EVENT_CODES["mouse_scroll"])
+
+# pynput Key 이름 (Key.space → "space") — 순서 바꾸지 말 것 (코드 = 0xE000 + index)
+SPECIAL_KEYS = [
+    "alt", "alt_l", "alt_r", "alt_gr", "backspace", "caps_lock", "cmd", "cmd_l", "cmd_r",
+    "ctrl", "ctrl_l", "ctrl_r", "delete", "down", "end", "enter", "esc",
+    "f1", "f2", "f3", "f4", "f5", "f6", "f7", "f8", "f9", "f10", "f11", "f12",
+    "home", "left", "page_down", "page_up", "right", "shift", "shift_l", "shift_r",
+    "space", "tab", "up", "insert", "menu", "num_lock", "pause", "print_screen", "scroll_lock",
+    "media_play_pause", "media_volume_mute", "media_volume_down", "media_volume_up",
+    "media_previous", "media_next",
+]
+SPECIAL_BASE = 0xE000
+UNKNOWN_KEY = 0xFFFF
+_SPECIAL_INDEX = {name: SPECIAL_BASE + i for i, name in enumerate(SPECIAL_KEYS)}
+
+BUTTON_CODES = {"left": 1, "right": 2, "middle": 3, "x1": 4, "x2": 5}
+
+
+def key_code(key) -> int:
+    """pynput key / 문자 → uint16 코드."""
+    ch = getattr(key, "char", None)
+    if ch is None and isinstance(key, str) and len(key) == 1:
+        ch = key
+    if ch:
+        cp = ord(ch[0])
+        return cp if cp < SPECIAL_BASE else UNKNOWN_KEY
+    name = getattr(key, "name", None) or str(key).replace("Key.", "")
+    return _SPECIAL_INDEX.get(name, UNKNOWN_KEY)
+
+
+def key_name(code: int) -> str:
+    if code == UNKNOWN_KEY or code == 0:
+        return ""
+    if code >= SPECIAL_BASE:
+        i = code - SPECIAL_BASE
+        return f"Key.{SPECIAL_KEYS[i]}" if i < len(SPECIAL_KEYS) else ""
+    return chr(code)
+
+
+def button_code(button) -> int:
+    name = getattr(button, "name", None) or str(button).replace("Button.", "")
+    return BUTTON_CODES.get(name, 0)
+
+
+def _clip16(v) -> int:
+    try:
+        return max(-32768, min(32767, int(v)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def bin_path(session_id) -> Path:
+    return session_dir(session_id) / BIN_FILENAME
+
+
+def has_input_bin(session_id) -> bool:
+    try:
+        return bin_path(session_id).exists()
+    except ValueError:
+        return False
+
+
+# =======================================================
+# 쓰기
+# =======================================================
+class InputBinLog:
+    """
+    세션 input.bin append writer (input_logger 의 writer 스레드 1개만 사용).
+    - stream 을 주면 (session_writer.open_stream) 파일 대신 세션 세그먼트에 레코드 bytes 만 기록
+    """
+
+    def __init__(self, session_id, header: Dict, stream=None):
+        if stream is not None:
+            self.path = None
+            self._f = stream
+            return
+        session_dir(session_id, create=True)
+        self.path = bin_path(session_id)
+        self._f = self.path.open("ab")
+        if self._f.tell() == 0:
+            payload = json.dumps(dict(header, record=RECORD.format), ensure_ascii=False).encode("utf-8")
+            self._f.write(_PREFIX.pack(MAGIC, VERSION, len(payload)) + payload)
+            self._f.flush()
+
+    @staticmethod
+    def record(ts_us: int, event_type: str, key: int = 0, x=0, y=0) -> Tuple:
+        return (ts_us, EVENT_CODES[event_type], key, _clip16(x), _clip16(y))
+
+    def append(self, records: Iterable[Tuple]) -> np.ndarray:
+        """레코드 튜플들을 한 번에 기록. 기록한 structured array 반환."""
+        arr = np.array(list(records), dtype=RECORD_DTYPE)
+        if len(arr):
+            self._f.write(arr.tobytes())
+            self._f.flush()
+        return arr
+
+    def close(self):
+        self._f.close()
+
+
+# =======================================================
+# 읽기
+# =======================================================
+def read_header(path: Path) -> Tuple[Dict, int]:
+    """(header dict, 레코드 시작 offset). 헤더가 잘렸거나 깨졌으면 ValueError."""
+    with path.open("rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"[input_binlog] 헤더가 잘린 파일: {path}")
+        magic, version, n = _PREFIX.unpack(prefix)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"[input_binlog] 지원하지 않는 파일: {path}")
+        payload = f.read(n)
+        if len(payload) < n:
+            raise ValueError(f"[input_binlog] 헤더가 잘린 파일: {path}")
+        # UnicodeDecodeError / JSONDecodeError 둘 다 ValueError
+        return json.loads(payload.decode("utf-8")), _PREFIX.size + n
+
+
+def read_input_events(session_id) -> Optional[np.ndarray]:
+    """
+    세션 input.bin → structured array (ts_us, event, key, x, y). 파일이 없으면 None.
+    - input.bin 이 없으면 session.seg (session_writer) 의 input 레코드
+    - 헤더가 잘렸거나 깨진 파일도 None (경고만 출력 → analyzer 는 CSV fallback)
+    """
+    try:
+        path = bin_path(session_id)
+    except ValueError:
+        return None
+    if not path.exists():
+        from session_writer import read_session_file
+
+        try:
+            sf = read_session_file(session_id)
+        except ValueError as e:
+            print("[input_binlog] session.seg 읽기 실패:", e)
+            return None
+        if sf is None or "input" not in sf.schemas:
+            return None
+        raw = sf.raw("input")
+        return np.frombuffer(raw, dtype=RECORD_DTYPE, count=len(raw) // RECORD_DTYPE.itemsize)
+    try:
+        _, offset = read_header(path)
+    except (ValueError, struct.error) as e:
+        print("[input_binlog] input.bin 헤더 손상, 무시:", e)
+        return None
+    count = (path.stat().st_size - offset) // RECORD_DTYPE.itemsize
+    return np.fromfile(path, dtype=RECORD_DTYPE, count=count, offset=offset)
+
+
+def count_events(events: np.ndarray) -> Tuple[int, int]:
+    """(key_count, mouse_count) — analyzer / session_aggregate 와 같은 기준."""
+    ev = events["event"]
+    return (
+        int(np.count_nonzero(np.isin(ev, KEY_EVENT_CODES))),
+        int(np.count_nonzero(np.isin(ev, MOUSE_EVENT_CODES))),
+    )
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def ts_iso(ts_us: int) -> str:
+    """µs → datetime.utcnow().isoformat() 와 같은 형식 문자열."""
+    return (_EPOCH + timedelta(microseconds=int(ts_us))).isoformat()
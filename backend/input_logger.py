@@ -1,83 +1,185 @@
 # input_logger.py
-import csv
+import os
 import time
-from datetime import datetime
+from collections import deque
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from pynput import keyboard, mouse
 import threading
 
+from input_binlog import InputBinLog, button_code, count_events, key_code, ts_iso
+from mouse_motion import MOTION_HEADER, MotionAggregator
+from session_stop import stop_remaining
+from session_writer import open_stream
+from session_aggregate import get_aggregator
+from capture_scheduler import get_scheduler
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # ✅ (중요) backend/data 로 통일
 DATA_DIR = (BASE_DIR / "data").resolve()
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# 전역 로그(마이그레이션 전 히스토리).
+# 새 세션은 세션 세그먼트(session_writer)에 input_binlog 고정 길이 레코드로 기록
 INPUT_CSV = DATA_DIR / "input_log.csv"
 
-CSV_HEADER = [
-    "timestamp",
-    "user_id",
-    "session_id",
-    "usage_index",
-    "task_label",
-    "event_type",
-    "key",
-    "button",
-    "x",
-    "y",
-]
 
+# ✅ 후킹 콜백은 큐에 넣기만 하고, 디스크 기록은 writer 스레드가 묶어서
+INPUT_QUEUE_MAX = int(os.getenv("INPUT_QUEUE_MAX", "20000"))          # 넘으면 새 이벤트는 버림(dropped)
+INPUT_BATCH_SIZE = int(os.getenv("INPUT_BATCH_SIZE", "256"))          # 이만큼 쌓이면 바로 기록
+INPUT_FLUSH_INTERVAL = float(os.getenv("INPUT_FLUSH_INTERVAL", "0.2"))  # 최대 기록 지연(초)
+
+
+class InputWriter:
+    """
+    입력 이벤트 bounded 큐 + 배치 writer 스레드.
+    - put(): deque.append 만 (GIL 하에서 원자적) → pynput 후킹 스레드가 I/O로 막히지 않음
+    - writer 스레드: INPUT_BATCH_SIZE 개 쌓이거나 INPUT_FLUSH_INTERVAL 지나면 writerows + flush 1번
+    - 집계(session_aggregate) / 캡쳐 스케줄러 신호도 writer 스레드에서 배치로 전달
+    - 큐 원소 = input_binlog 레코드 튜플 (ts_us, event, key, x, y)
+    - 마우스 이동은 MotionAggregator 가 만든 1초 버킷만 motion 스트림에 기록
+    """
 
-def _ensure_header(path: Path):
-    """CSV가 없거나 비어있으면 헤더를 써준다."""
-    if not path.exists() or path.stat().st_size == 0:
-        with path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(CSV_HEADER)
+    def __init__(self, log: InputBinLog, agg, sched,
+                 motion: Optional[MotionAggregator] = None, motion_out=None,
+                 max_queue: int = INPUT_QUEUE_MAX,
+                 batch_size: int = INPUT_BATCH_SIZE,
+                 flush_interval: float = INPUT_FLUSH_INTERVAL):
+        self._log = log
+        self._agg = agg
+        self._sched = sched
+        self._motion = motion
+        self._motion_out = motion_out   # (file, csv.writer)
+        self._q: deque = deque()
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+
+        self._wake = threading.Event()
+        self._stopping = False
+        self._drop_lock = threading.Lock()
+
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.motion_buckets = 0
+
+        self._thread = threading.Thread(target=self._run, name="input-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row: tuple):
+        q = self._q
+        if len(q) >= self._max_queue:
+            with self._drop_lock:   # 드문 경로라 lock 비용 무시 가능
+                self.dropped += 1
+            return
+        q.append(row)
+        if len(q) == self._batch_size:
+            self._wake.set()
+
+    def _drain(self):
+        q = self._q
+        depth = len(q)
+        if depth == 0:
+            return
+        self.max_depth = max(self.max_depth, depth)
+        rows = [q.popleft() for _ in range(depth)]
+
+        arr = self._log.append(rows)
+        key_count, mouse_count = count_events(arr)
+        self._agg.on_input_batch(key_count, mouse_count, ts_iso(arr["ts_us"].min()), ts_iso(arr["ts_us"].max()))
+        self._sched.on_input(len(rows))
+        self.written += len(rows)
+        self.batches += 1
+
+    def _drain_motion(self, flush_all: bool = False):
+        if self._motion is None:
+            return
+        buckets = self._motion.collect(flush_all=flush_all)
+        if not buckets:
+            return
+        if self._motion_out is not None:
+            f, writer = self._motion_out
+            writer.writerows(buckets)
+            f.flush()
+        self._agg.on_motion(buckets)
+        self.motion_buckets += len(buckets)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            try:
+                self._drain()
+                self._drain_motion()
+            except Exception as e:
+                print("[input_logger] writer error:", e)
+        # 종료 시 남은 이벤트 / 진행 중인 이동 버킷까지 기록
+        self._drain()
+        self._drain_motion(flush_all=True)
+
+    def close(self, timeout: Optional[float] = None):
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "queued": len(self._q),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "max_depth": self.max_depth,
+            "motion_buckets": self.motion_buckets,
+        }
+
+
+# 세션별 writer (진행 중 세션의 큐 상태 조회용)
+_writers: Dict[str, InputWriter] = {}
+
+
+def input_writer_stats(session_id: str) -> Optional[Dict]:
+    w = _writers.get(str(session_id))
+    return w.stats() if w is not None else None
 
 
 def start_input_logging(session_meta: Dict, stop_event: threading.Event):
     """
-    키보드/마우스 이벤트를 CSV로 기록.
+    키보드/마우스 이벤트를 세션 세그먼트(session_writer)의 input 스트림에 고정 길이 레코드로 기록.
+    - 콜백은 InputWriter 큐에 넣기만 하고 기록은 writer 스레드에서 배치로
+    - 마우스 이동은 raw 이벤트 대신 1초 버킷(mouse_motion)만 motion 스트림에 기록
     - session_meta: {user_id, session_id, usage_index, task, ...}
     - stop_event: session_logger에서 들어오는 Event
     """
-    _ensure_header(INPUT_CSV)
-
     user_id = session_meta.get("user_id")
     session_id = session_meta.get("session_id")
     usage_index = session_meta.get("usage_index", 0)
     task_label = session_meta.get("task", "")
 
-    f = INPUT_CSV.open("a", newline="", encoding="utf-8")
-    writer = csv.writer(f)
-
-    def log_row(event_type: str, key="", button="", x="", y=""):
-        ts = datetime.utcnow().isoformat()
-        writer.writerow(
-            [
-                ts,
-                user_id,
-                session_id,
-                usage_index,
-                task_label,
-                event_type,
-                str(key),
-                str(button),
-                x,
-                y,
-            ]
-        )
-        f.flush()
+    # 세션 공통 값은 schema 프레임(헤더)에 1번만
+    header = {
+        "user_id": user_id,
+        "session_id": session_id,
+        "usage_index": usage_index,
+        "task_label": task_label,
+    }
+    log = InputBinLog(session_id, header, stream=open_stream(session_id, "input", header)[0])
+    motion = MotionAggregator()
+    motion_out = open_stream(session_id, "motion", MOTION_HEADER)
+    out = InputWriter(log, get_aggregator(session_id), get_scheduler(session_id),
+                      motion=motion, motion_out=motion_out)
+    _writers[str(session_id)] = out
+
+    def log_row(event_type: str, key=0, x=0, y=0):
+        # 후킹 스레드: 레코드 튜플을 만들어 큐에 넣기만 함 (파일 I/O X)
+        out.put(InputBinLog.record(time.time_ns() // 1000, event_type, key, x, y))
 
     def on_press(key):
         try:
-            k = getattr(key, "char", None)
-            if k is None:
-                k = str(key)
-            log_row("key_press", key=k)
+            log_row("key_press", key=key_code(key))
         except Exception as e:
             print("[input_logger] on_press error:", e)
 
@@ -87,7 +189,7 @@ def start_input_logging(session_meta: Dict, stop_event: threading.Event):
     def on_click(x, y, button, pressed):
         try:
             etype = "mouse_down" if pressed else "mouse_up"
-            log_row(etype, button=str(button), x=x, y=y)
+            log_row(etype, key=button_code(button), x=x, y=y)
         except Exception as e:
             print("[input_logger] on_click error:", e)
 
@@ -99,16 +201,31 @@ def start_input_logging(session_meta: Dict, stop_event: threading.Event):
 
     print("[input_logger] start:", session_meta)
 
+    listeners = []
     try:
-        with keyboard.Listener(on_press=on_press, on_release=on_release) as kl, \
-                mouse.Listener(on_click=on_click, on_scroll=on_scroll) as ml:
+        listeners = [
+            keyboard.Listener(on_press=on_press, on_release=on_release),
+            mouse.Listener(on_click=on_click, on_scroll=on_scroll, on_move=motion.on_move),
+        ]
+        for l in listeners:
+            l.start()
 
-            while not stop_event.is_set():
-                time.sleep(0.05)
+        stop_event.wait()
 
     except Exception as e:
         # ✅ 권한/후킹 문제 시 로그만 남기고 종료
         print("[input_logger] listener error:", e)
 
-    f.close()
-    print("[input_logger] stop")
+    # 리스너가 바로 안 끝나도 마감 시각까지만 기다림 (with 문 __exit__ 의 join() 은 제한 없음)
+    for l in listeners:
+        try:
+            l.stop()
+            l.join(stop_remaining(stop_event))
+        except Exception as e:
+            print("[input_logger] listener stop error:", e)
+
+    out.close(stop_remaining(stop_event))
+    _writers.pop(str(session_id), None)
+    log.close()
+    motion_out[0].close()
+    print("[input_logger] stop:", out.stats())
@@ -0,0 +1,161 @@
+# keyword_matcher.py
+"""
+창 제목 키워드 매칭용 컴파일된 멀티 패턴 매처.
+
+- 라벨별 키워드 목록(우선순위 순)을 정규식 alternation 하나로 컴파일
+  (키워드 lower()는 컴파일할 때 한 번만)
+- 매칭 결과는 기존 이중 for 루프와 동일:
+  "우선순위가 가장 높은 라벨 중 키워드 하나라도 제목에 포함되면 그 라벨"
+- 제목을 왼쪽부터 한 번 훑으면서, 이미 찾은 라벨보다 우선순위가 높은 키워드만 계속 찾음
+  (가장 높은 우선순위를 찾으면 바로 종료)
+- 여러 제목을 이어붙인 긴 문자열은 정규식보다 str 포함검사(C 구현)가 빨라서
+  LONG_TEXT_CHARS 이상이면 미리 소문자로 바꿔둔 키워드로 `in` 검사 (결과는 동일)
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# bench_title_matcher.py 기준: 이 길이부터는 `in` 루프가 정규식 스캔보다 빠름
+LONG_TEXT_CHARS = 96
+
+
+class KeywordMatcher:
+    def __init__(self, groups: Iterable[Tuple[str, Iterable[str]]]):
+        self.labels: List[str] = []
+        self._priority = {}  # 소문자 키워드 → 가장 높은 우선순위(index)
+        self._lowered: List[Tuple[str, Tuple[str, ...]]] = []
+        for label, keywords in groups:
+            prio = len(self.labels)
+            self.labels.append(label)
+            lowered = tuple(k for k in (str(kw).lower() for kw in keywords) if k)
+            self._lowered.append((label, lowered))
+            for k in lowered:
+                if k not in self._priority:
+                    self._priority[k] = prio
+
+        # 같은 위치에서 여러 키워드가 시작하면 우선순위 높은(→ 긴) 키워드가 먼저 잡히도록 정렬
+        ordered = sorted(self._priority, key=lambda k: (self._priority[k], -len(k)))
+
+        # _patterns[p] = 우선순위 p보다 높은(index 작은) 키워드들만 담은 정규식
+        self._patterns: List[Optional["re.Pattern"]] = [None]
+        for p in range(1, len(self.labels) + 1):
+            kws = [re.escape(k) for k in ordered if self._priority[k] < p]
+            self._patterns.append(re.compile("|".join(kws)) if kws else None)
+
+    def match_lower(self, text_lower: str) -> Optional[str]:
+        """이미 소문자로 바꾼 문자열에서 가장 우선순위 높은 라벨 반환 (없으면 None)."""
+        if len(text_lower) >= LONG_TEXT_CHARS:
+            for label, keywords in self._lowered:
+                for kw in keywords:
+                    if kw in text_lower:
+                        return label
+            return None
+
+        best = len(self.labels)
+        pos = 0
+        while best:
+            pattern = self._patterns[best]
+            if pattern is None:
+                break
+            m = pattern.search(text_lower, pos)
+            if m is None:
+                break
+            best = self._priority[m.group()]
+            pos = m.start() + 1
+        return None if best == len(self.labels) else self.labels[best]
+
+    def match(self, text: str) -> Optional[str]:
+        if not text:
+            return None
+        return self.match_lower(text.lower())
+
+    def contains_any(self, text: str) -> bool:
+        return self.match(text) is not None
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher([("match", keywords)])
+
+
+def matcher_for(keywords: Sequence[str]) -> KeywordMatcher:
+    """키워드 목록 하나짜리 매처 (같은 목록이면 컴파일 결과 재사용)."""
+    return _compile_cached(tuple(keywords))
+
+
+# =======================================================
+# 내용이 바뀌면 version 이 올라가는 키워드 테이블
+# - TITLE_KEYWORDS 처럼 런타임에 키워드를 추가/수정해도
+#   컴파일된 매처 / 라벨 캐시가 자동으로 다시 만들어지도록 하기 위함
+# =======================================================
+class KeywordTable(dict):
+    """라벨 → 키워드 list. dict/내부 list 어느 쪽을 수정해도 version 증가."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.version = 0
+        for k, v in dict(*args, **kwargs).items():
+            super().__setitem__(k, _KeywordList(self, v))
+
+    def _bump(self):
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, _KeywordList(self, value))
+        self._bump()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._bump()
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            super().__setitem__(k, _KeywordList(self, v))
+        self._bump()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default if default is not None else []
+        return self[key]
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._bump()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self._bump()
+        return result
+
+    def clear(self):
+        super().clear()
+        self._bump()
+
+
+class _KeywordList(list):
+    def __init__(self, table: KeywordTable, items=()):
+        super().__init__(items)
+        self._table = table
+
+
+def _bumping(name: str):
+    base = getattr(list, name)
+
+    def method(self, *args, **kwargs):
+        result = base(self, *args, **kwargs)
+        self._table._bump()
+        return result
+
+    method.__name__ = name
+    return method
+
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(_KeywordList, _name, _bumping(_name))
+del _name
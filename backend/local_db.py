@@ -0,0 +1,78 @@
+# local_db.py
+"""
+백엔드 로컬 SQLite 헬퍼 (db.py 의 MySQL get_conn / execute 와 같은 사용법).
+
+- 파일별로 스키마 등록 → 처음 연결할 때 CREATE TABLE IF NOT EXISTS 실행
+- journal_mode=WAL : 읽기(분석/마이페이지)와 쓰기(로거)가 서로 막지 않음
+- busy_timeout     : 다른 스레드/프로세스가 쓰는 중이면 바로 실패하지 않고 대기
+- 연결은 스레드별로 재사용 (매 호출마다 connect 비용 X)
+- 결과 row 는 dict (pymysql DictCursor 와 동일)
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+BUSY_TIMEOUT_MS = 5000
+
+_schemas: Dict[str, str] = {}
+_local = threading.local()
+
+
+def _dict_factory(cursor, row):
+    return {col[0]: row[i] for i, col in enumerate(cursor.description)}
+
+
+def register_schema(path: Path, schema_sql: str):
+    """DB 파일에 필요한 테이블/인덱스 정의 (여러 모듈이 같은 파일을 써도 됨)."""
+    key = str(Path(path).resolve())
+    _schemas[key] = _schemas.get(key, "") + schema_sql
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    key = str(Path(path).resolve())
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(key)
+    if conn is not None:
+        return conn
+
+    Path(key).parent.mkdir(parents=True, exist_ok=True)
+    # isolation_level=None: BEGIN/COMMIT 을 get_conn 에서 직접 관리
+    conn = sqlite3.connect(key, timeout=BUSY_TIMEOUT_MS / 1000.0, isolation_level=None)
+    conn.row_factory = _dict_factory
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if key in _schemas:
+        conn.executescript(_schemas[key])
+    conns[key] = conn
+    return conn
+
+
+@contextmanager
+def get_conn(path: Path, immediate: bool = False):
+    """
+    트랜잭션 하나. 정상 종료 시 commit, 예외 시 rollback.
+    - immediate=True: 시작부터 쓰기 lock (읽고 → 판단 → 쓰는 작업을 원자적으로)
+    """
+    conn = _connect(path)
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def execute(path: Path, query: str, params=None, fetchone=False, fetchall=False):
+    with get_conn(path) as conn:
+        cur = conn.execute(query, params or ())
+        if fetchone:
+            return cur.fetchone()
+        if fetchall:
+            return cur.fetchall()
+        return cur.rowcount
@@ -0,0 +1,395 @@
+# log_archive.py
+"""
+전역 로그 CSV(input_log.csv / window_log.csv / screen_log.csv) 일 단위 rotation + 컬럼 압축 보관.
+
+- rotate_csv(): 오늘(UTC) 이전 날짜 행을 data/archive/<csv 이름>/<YYYY-MM-DD>.<token>.csv 로 옮기고
+  원본에는 오늘 행만 남김 (tmp + os.replace → csv_index 는 파일이 줄어든 걸 보고 재색인)
+  중간에 죽으면 다음 실행에서 rollback / 확정 (_recover_rotation) → 행 유실·중복 없음
+- compact_day(): 닫힌 일자 CSV → <YYYY-MM-DD>.npz (컬럼별 배열, savez_compressed), 인덱스 저장 후 CSV 삭제
+- archive_csv() 는 프로세스 간 파일 lock (gunicorn worker 여러 개가 동시에 돌지 않도록)
+    np.load 는 컬럼(key)별로 읽으므로 session_id 컬럼 + 필요한 컬럼만 압축 해제
+- index.json: { day: {rows, session_min, session_max, ts_min, ts_max, columns} }
+    세션 조회 시 session_min <= sid <= session_max 인 날짜만 열어봄 (session_id 가 시각으로 시작)
+- read_history_rows(): 아카이브 + 원본 CSV(.idx) 를 합쳐서 세션 행 반환 (analyzer / screen_manifest fallback)
+- LOG_ARCHIVE_BACKGROUND=1 이면 start_background_compactor() 가 주기적으로 rotation + 압축
+
+사용:
+    python log_archive.py              # backend/data 전역 CSV rotation + 압축
+    python log_archive.py --stats      # 일자별 인덱스만 출력
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from csv_index import read_session_rows
+from session_segments import DATA_DIR
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+INDEX_FILENAME = "index.json"
+LOCK_FILENAME = ".lock"
+ROTATE_TMP_SUFFIX = ".rotate.tmp"   # rotation 중인 새 원본 (남아 있으면 원본 교체 전에 죽은 것)
+PARTIAL_SUFFIX = ".partial"         # rotation 중인 일자 CSV
+MERGED_KEY = "__merged_files__"     # npz 안: 이미 합친 일자 CSV 파일명
+
+GLOBAL_CSVS = [DATA_DIR / "input_log.csv", DATA_DIR / "window_log.csv", DATA_DIR / "screen_log.csv"]
+
+ARCHIVE_BACKGROUND = os.getenv("LOG_ARCHIVE_BACKGROUND", "0") == "1"
+ARCHIVE_INTERVAL = float(os.getenv("LOG_ARCHIVE_INTERVAL", "3600"))   # 초
+
+_lock = threading.Lock()
+_bg_thread: Optional[threading.Thread] = None
+
+
+def archive_dir(csv_path: Path) -> Path:
+    return ARCHIVE_DIR / Path(csv_path).stem
+
+
+def _row_day(row: Dict[str, str]) -> Optional[str]:
+    ts = row.get("timestamp") or ""
+    try:
+        return datetime.fromisoformat(ts).date().isoformat()
+    except ValueError:
+        return None
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    _write_synced(tmp, write)
+    os.replace(tmp, path)
+
+
+def _write_synced(path: Path, write):
+    with path.open("w", newline="", encoding="utf-8") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_index(csv_path: Path) -> Dict[str, Dict]:
+    p = archive_dir(csv_path) / INDEX_FILENAME
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_index(csv_path: Path, index: Dict[str, Dict]):
+    _write_atomic(
+        archive_dir(csv_path) / INDEX_FILENAME,
+        lambda f: json.dump(index, f, ensure_ascii=False, indent=1, sort_keys=True),
+    )
+
+
+@contextmanager
+def _process_lock(csv_path: Path):
+    """
+    프로세스 간 lock (gunicorn worker 마다 compactor 가 떠도 한 번에 하나만).
+    다른 프로세스가 잡고 있으면 기다리지 않고 False.
+    """
+    out_dir = archive_dir(csv_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    f = (out_dir / LOCK_FILENAME).open("a+b")
+    locked = False
+    try:
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            locked = True
+        except OSError:
+            pass
+        yield locked
+    finally:
+        if locked and os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+
+# =======================================================
+# rotation
+# =======================================================
+def _live_tmp(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + ROTATE_TMP_SUFFIX)
+
+
+def _recover_rotation(csv_path: Path) -> Optional[str]:
+    """
+    지난 rotation 이 중간에 죽었으면 정리. 순서가 (원본 tmp → 일자 .partial → 원본 교체 → .partial 확정) 이므로
+    - 원본 tmp 가 남아 있음: 교체 전 → 행은 아직 원본에 있으므로 .partial / tmp 삭제 (rollback)
+    - tmp 없음 + .partial 남음: 교체는 끝남 → .partial 을 일자 CSV 로 확정
+    """
+    partials = sorted(archive_dir(csv_path).glob("*.csv" + PARTIAL_SUFFIX))
+    tmp = _live_tmp(csv_path)
+    if tmp.exists():
+        for p in partials:
+            p.unlink()
+        tmp.unlink()
+        return "rollback"
+    for p in partials:
+        os.replace(p, p.with_name(p.name[:-len(PARTIAL_SUFFIX)]))
+    return "commit" if partials else None
+
+
+def rotate_csv(csv_path: Path, today: Optional[str] = None) -> List[str]:
+    """
+    오늘 이전 날짜 행을 일자별 CSV(<day>.<token>.csv, rotation 마다 새 파일)로 분리. 반환: 닫힌(옮긴) 날짜 목록.
+    중간에 죽어도 다음 실행에서 _recover_rotation → 행이 사라지거나 두 번 들어가지 않음.
+    """
+    csv_path = Path(csv_path)
+    _recover_rotation(csv_path)
+    if not csv_path.exists():
+        return []
+    today = today or datetime.utcnow().date().isoformat()
+
+    with csv_path.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "timestamp" not in header:
+            return []
+        ts_idx = header.index("timestamp")
+        keep: List[List[str]] = []
+        closed: Dict[str, List[List[str]]] = {}
+        for row in reader:
+            day = _row_day({"timestamp": row[ts_idx] if len(row) > ts_idx else ""})
+            if day is None or day >= today:
+                keep.append(row)
+            else:
+                closed.setdefault(day, []).append(row)
+    if not closed:
+        return []
+
+    def write_rows(rows):
+        def write(f):
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(rows)
+        return write
+
+    # 1) 새 원본(오늘 행) tmp → 2) 일자 .partial → 3) 원본 교체 → 4) .partial 확정
+    out_dir = archive_dir(csv_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = _live_tmp(csv_path)
+    _write_synced(tmp, write_rows(keep))
+
+    token = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}"
+    partials = []
+    for day, rows in closed.items():
+        p = out_dir / f"{day}.{token}.csv{PARTIAL_SUFFIX}"
+        _write_synced(p, write_rows(rows))
+        partials.append(p)
+
+    os.replace(tmp, csv_path)
+    for p in partials:
+        os.replace(p, p.with_name(p.name[:-len(PARTIAL_SUFFIX)]))
+    return sorted(closed)
+
+
+# =======================================================
+# 컬럼 압축
+# =======================================================
+def _entry_from_columns(columns: Dict[str, np.ndarray]) -> Dict:
+    sids = columns.get("session_id", np.array([], dtype=str)).tolist()
+    ts = columns.get("timestamp", np.array([], dtype=str)).tolist()
+    n = len(next(iter(columns.values()))) if columns else 0
+    return {
+        "rows": int(n),
+        "session_min": min(sids, default=""),
+        "session_max": max(sids, default=""),
+        "ts_min": min(ts, default=""),
+        "ts_max": max(ts, default=""),
+        "columns": sorted(columns),
+    }
+
+
+def _load_npz(path: Path) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """(컬럼 배열들, 이미 합쳐진 일자 CSV 파일명 목록)"""
+    if not path.exists():
+        return {}, []
+    with np.load(path) as z:
+        merged = z[MERGED_KEY].tolist() if MERGED_KEY in z.files else []
+        return {c: z[c] for c in z.files if c != MERGED_KEY}, merged
+
+
+def _day_sources(csv_path: Path, day: str) -> List[Path]:
+    # <day>.csv (이전 형식) + <day>.<token>.csv
+    return sorted(archive_dir(csv_path).glob(f"{day}*.csv"))
+
+
+def compact_day(csv_path: Path, day: str) -> Optional[Dict]:
+    """
+    일자 CSV 들 → <day>.npz (이미 npz 가 있으면 합침). 반환: 해당 일자 인덱스 항목.
+    - npz 안에 합친 CSV 파일명(MERGED_KEY) 을 같이 저장 → npz 교체 후 죽어도 다시 합치지 않음
+    - 인덱스를 저장한 다음에 CSV 삭제 → 인덱스에 없는(읽히지 않는) 압축 일자가 생기지 않음
+    """
+    out_dir = archive_dir(csv_path)
+    srcs = _day_sources(csv_path, day)
+    if not srcs:
+        return None
+    dst = out_dir / f"{day}.npz"
+    columns, merged = _load_npz(dst)
+    n_old = len(next(iter(columns.values()))) if columns else 0
+
+    chunks = []
+    for src in srcs:
+        if src.name in merged:
+            continue
+        with src.open("r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            rows = list(reader)
+        chunks.append((header, rows))
+        merged.append(src.name)
+
+    if chunks:
+        names = list(columns)
+        for header, _ in chunks:
+            names.extend(c for c in header if c not in names)
+        out: Dict[str, np.ndarray] = {}
+        for col in names:
+            parts = [columns[col] if col in columns else np.full(n_old, "", dtype=str)]
+            for header, rows in chunks:
+                if col in header:
+                    i = header.index(col)
+                    parts.append(np.array([r[i] if len(r) > i else "" for r in rows], dtype=str))
+                else:
+                    parts.append(np.full(len(rows), "", dtype=str))
+            out[col] = np.concatenate(parts)
+        columns = out
+
+        tmp = out_dir / f"{day}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp, **columns, **{MERGED_KEY: np.array(merged, dtype=str)})
+        os.replace(tmp, dst)
+
+    entry = _entry_from_columns(columns)
+    index = load_index(csv_path)
+    index[day] = entry
+    _save_index(csv_path, index)
+    for src in srcs:
+        src.unlink()
+    return entry
+
+
+def _reconcile_index(csv_path: Path) -> List[str]:
+    """npz 는 있는데 인덱스에 없는 일자 → npz 에서 항목 다시 계산 (예전 버전에서 중간에 죽은 경우)."""
+    index = load_index(csv_path)
+    fixed = []
+    for p in sorted(archive_dir(csv_path).glob("????-??-??.npz")):
+        if p.stem not in index:
+            columns, _ = _load_npz(p)
+            index[p.stem] = _entry_from_columns(columns)
+            fixed.append(p.stem)
+    if fixed:
+        _save_index(csv_path, index)
+    return fixed
+
+
+def archive_csv(csv_path: Path, today: Optional[str] = None) -> List[str]:
+    """rotation + 닫힌 일자 전부 압축 + 인덱스 갱신. 반환: 압축한 날짜 목록 (다른 프로세스가 작업 중이면 [])."""
+    if not Path(csv_path).exists() and not archive_dir(csv_path).exists():
+        return []
+    with _lock, _process_lock(csv_path) as locked:
+        if not locked:
+            return []
+        rotate_csv(csv_path, today)
+        _reconcile_index(csv_path)
+        out_dir = archive_dir(csv_path)
+        days = sorted({p.name[:10] for p in out_dir.glob("????-??-??*.csv")})
+        return [day for day in days if compact_day(csv_path, day) is not None]
+
+
+# =======================================================
+# 읽기
+# =======================================================
+def read_archived_rows(csv_path: Path, session_id: str,
+                       columns: Optional[Iterable[str]] = None) -> List[Dict[str, str]]:
+    """아카이브에서 세션 행만 (session_min/max 범위에 드는 날짜만 열어봄)."""
+    sid = str(session_id)
+    out_dir = archive_dir(csv_path)
+    rows: List[Dict[str, str]] = []
+    for day, entry in sorted(load_index(csv_path).items()):
+        if not (entry.get("session_min", "") <= sid <= entry.get("session_max", "")):
+            continue
+        p = out_dir / f"{day}.npz"
+        if not p.exists():
+            continue
+        with np.load(p) as z:
+            mask = z["session_id"] == sid
+            if not mask.any():
+                continue
+            cols = [c for c in (columns or entry.get("columns") or z.files) if c in z.files and c != MERGED_KEY]
+            data = {c: z[c][mask] for c in cols}
+        n = int(mask.sum())
+        rows.extend({c: str(data[c][i]) for c in cols} for i in range(n))
+    return rows
+
+
+def read_history_rows(csv_path: Path, session_id: str) -> List[Dict[str, str]]:
+    """전역 CSV 히스토리(아카이브 + 아직 rotation 안 된 원본)에서 세션 행."""
+    return read_archived_rows(csv_path, session_id) + read_session_rows(csv_path, str(session_id))
+
+
+# =======================================================
+# 백그라운드 compactor (LOG_ARCHIVE_BACKGROUND=1)
+# =======================================================
+def run_once(paths: Optional[Iterable[Path]] = None) -> Dict[str, List[str]]:
+    result = {}
+    for p in paths or GLOBAL_CSVS:
+        try:
+            result[Path(p).name] = archive_csv(Path(p))
+        except Exception as e:
+            print(f"[log_archive] {p} 압축 실패:", e)
+    return result
+
+
+def start_background_compactor(interval: float = ARCHIVE_INTERVAL, force: bool = False) -> bool:
+    """LOG_ARCHIVE_BACKGROUND=1 (또는 force) 일 때 daemon 스레드 1개 시작."""
+    global _bg_thread
+    if not (ARCHIVE_BACKGROUND or force):
+        return False
+    if _bg_thread is not None and _bg_thread.is_alive():
+        return True
+
+    def loop():
+        while True:
+            done = run_once()
+            if any(done.values()):
+                print("[log_archive] 압축 완료:", done)
+            time.sleep(interval)
+
+    _bg_thread = threading.Thread(target=loop, name="log-archive", daemon=True)
+    _bg_thread.start()
+    print(f"[log_archive] background compactor 시작 (interval={interval}s)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="전역 로그 CSV rotation + npz 압축")
+    parser.add_argument("csv", nargs="*", type=Path, help="대상 CSV (기본: backend/data 전역 CSV)")
+    parser.add_argument("--stats", action="store_true", help="압축하지 않고 일자별 인덱스만 출력")
+    args = parser.parse_args()
+
+    targets = args.csv or GLOBAL_CSVS
+    if not args.stats:
+        print("[log_archive]", run_once(targets))
+    for p in targets:
+        for day, entry in sorted(load_index(p).items()):
+            print(f"  {p.name} {day}: rows={entry['rows']} sessions={entry['session_min']}..{entry['session_max']}")
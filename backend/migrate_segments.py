@@ -0,0 +1,164 @@
+# migrate_segments.py
+"""
+전역 *_log.csv 를 세션별 세그먼트(data/sessions/<sid>/<kind>.csv)로 쪼개는 마이그레이션 도구.
+
+사용:
+    python migrate_segments.py              # backend/data + (예전) ../data 전역 로그 분할
+    python migrate_segments.py --dry-run    # 세션/행 수만 출력
+    python migrate_segments.py --shard-screens   # data/screens/*.png → data/screens/<sid>/ 이동도 수행
+
+- 원본 전역 CSV는 건드리지 않음 (읽기 전용)
+- 이미 세그먼트가 있던 (세션, 종류)는 건너뜀 → 새 로거가 쓴 세그먼트와 중복 방지
+"""
+import argparse
+import csv
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+
+from session_segments import DATA_DIR, segment_path, session_dir
+from screen_manifest import IMAGE_EXTS, SCREENS_DIR, session_id_from_filename, session_screens_dir
+
+BASE_DIR = Path(__file__).resolve().parent
+LEGACY_DATA_DIR = (BASE_DIR / ".." / "data").resolve()
+
+SOURCES = {
+    "window": ["window_log.csv"],
+    "input": ["input_log.csv"],
+    "process": ["process_log.csv"],
+    "screen": ["screen_log.csv"],
+}
+
+# 세션 수가 많아도 파일 핸들이 무한히 늘지 않도록 제한
+MAX_OPEN_SEGMENTS = 64
+
+
+class _SegmentWriters:
+    """(세션 → csv.writer) 핸들을 LRU로 관리."""
+
+    def __init__(self, kind: str, header: List[str], max_open: int = MAX_OPEN_SEGMENTS):
+        self.kind = kind
+        self.header = header
+        self.max_open = max_open
+        self._open: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, session_id: str):
+        if session_id in self._open:
+            self._open.move_to_end(session_id)
+            return self._open[session_id][1]
+
+        if len(self._open) >= self.max_open:
+            _, (old_f, _) = self._open.popitem(last=False)
+            old_f.close()
+
+        session_dir(session_id, create=True)
+        f = segment_path(session_id, self.kind).open("a", newline="", encoding="utf-8")
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(self.header)
+        self._open[session_id] = (f, writer)
+        return writer
+
+    def close(self):
+        for f, _ in self._open.values():
+            f.close()
+        self._open.clear()
+
+
+def migrate_file(src: Path, kind: str, decided: Dict[str, bool], dry_run: bool = False) -> Dict[str, int]:
+    """
+    전역 CSV 하나를 한 번만 스트리밍으로 읽으면서 세션별로 분배.
+    - decided: {session_id: 기록 여부} — 같은 종류의 여러 원본 파일 사이에서 공유
+    """
+    counts: Dict[str, int] = {}
+
+    with src.open("r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "session_id" not in header:
+            print(f"[migrate] session_id 컬럼 없음, 건너뜀: {src}")
+            return counts
+        sid_idx = header.index("session_id")
+
+        writers = _SegmentWriters(kind, header)
+        try:
+            for row in reader:
+                if len(row) <= sid_idx:
+                    continue
+                sid = row[sid_idx].strip()
+                if not sid:
+                    continue
+
+                if sid not in decided:
+                    try:
+                        decided[sid] = not segment_path(sid, kind).exists()
+                    except ValueError:
+                        decided[sid] = False
+                if not decided[sid]:
+                    continue
+
+                counts[sid] = counts.get(sid, 0) + 1
+                if not dry_run:
+                    writers.get(sid).writerow(row)
+        finally:
+            writers.close()
+
+    return counts
+
+
+def migrate(data_dirs: List[Path], dry_run: bool = False):
+    for kind, names in SOURCES.items():
+        decided: Dict[str, bool] = {}
+        for d in data_dirs:
+            for name in names:
+                src = d / name
+                if not src.exists():
+                    continue
+                counts = migrate_file(src, kind, decided, dry_run=dry_run)
+                print(
+                    f"[migrate] {src} → {kind}: 세션 {len(counts)}개, "
+                    f"행 {sum(counts.values())}개{' (dry-run)' if dry_run else ''}"
+                )
+
+        skipped = sum(1 for ok in decided.values() if not ok)
+        if skipped:
+            print(f"[migrate] {kind}: 이미 세그먼트가 있는 세션 {skipped}개 건너뜀")
+
+
+def shard_screens(dry_run: bool = False):
+    """예전 평면 구조 data/screens/<file> 을 data/screens/<session_id>/<file> 로 이동."""
+    moved = 0
+    unknown = 0
+    for entry in os.scandir(SCREENS_DIR):
+        if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTS):
+            continue
+        sid = session_id_from_filename(entry.name)
+        if not sid:
+            unknown += 1
+            continue
+        try:
+            dst_dir = session_screens_dir(sid, create=not dry_run)
+        except ValueError:
+            unknown += 1
+            continue
+        if not dry_run:
+            os.replace(entry.path, dst_dir / entry.name)
+        moved += 1
+
+    print(f"[migrate] screens: {moved}개 샤드 폴더로 이동, 세션 불명 {unknown}개{' (dry-run)' if dry_run else ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="전역 로그 CSV → 세션 세그먼트 분할")
+    parser.add_argument("--data-dir", action="append", type=Path,
+                        help="전역 CSV가 있는 폴더 (여러 번 지정 가능, 기본: backend/data, ../data)")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--shard-screens", action="store_true",
+                        help="평면 구조 스크린샷을 세션별 폴더(data/screens/<sid>/)로 이동")
+    args = parser.parse_args()
+
+    dirs = args.data_dir or [DATA_DIR, LEGACY_DATA_DIR]
+    migrate(dirs, dry_run=args.dry_run)
+    if args.shard_screens:
+        shard_screens(dry_run=args.dry_run)
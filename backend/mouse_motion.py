@@ -0,0 +1,127 @@
+# mouse_motion.py
+"""
+마우스 이동(on_move) 이벤트를 1초 단위 버킷으로 집계.
+
+- raw on_move 는 초당 수백 개라 그대로 기록하지 않음 (main_logger 에서 주석 처리했던 이유)
+- 후킹 스레드에서는 숫자 몇 개만 갱신, 1초가 지나면 버킷 1개로 닫음
+- 버킷: (second, distance, peak_velocity, direction_changes, samples)
+    second            UTC epoch 초
+    distance          이동 거리 합 (px)
+    peak_velocity     이벤트 간 최대 속도 (px/s)
+    direction_changes 진행 방향이 90도 넘게 꺾인 횟수 (게임 에임/드래그 흔들림)
+    samples           on_move 이벤트 수
+- 기록은 input_logger writer 스레드가 세션 세그먼트(session_writer)의 motion 스트림에
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MOTION_HEADER = ["second", "distance", "peak_velocity", "direction_changes", "samples"]
+
+MIN_STEP_PX = 2.0      # 이보다 작은 떨림은 한 걸음으로 치지 않음
+TURN_RESET_SEC = 0.5   # 이만큼 멈췄다 움직이면 방향 전환으로 세지 않음
+
+
+class MotionAggregator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._closed: deque = deque()
+
+        self._sec: Optional[int] = None
+        self._dist = 0.0
+        self._peak = 0.0
+        self._turns = 0
+        self._samples = 0
+
+        self._anchor: Optional[Tuple[float, float, float]] = None   # 마지막 걸음 위치 (x, y, monotonic)
+        self._last_vec: Optional[Tuple[float, float]] = None
+
+    def on_move(self, x, y):
+        """pynput mouse.Listener(on_move=...) 콜백."""
+        now = time.monotonic()
+        sec = int(time.time())
+        with self._lock:
+            if sec != self._sec:
+                self._close_locked()
+                self._sec = sec
+            self._samples += 1
+
+            anchor = self._anchor
+            if anchor is None:
+                self._anchor = (x, y, now)
+                return
+            dx = x - anchor[0]
+            dy = y - anchor[1]
+            d = math.hypot(dx, dy)
+            if d < MIN_STEP_PX:
+                return
+
+            dt = now - anchor[2]
+            self._dist += d
+            self._peak = max(self._peak, d / max(dt, 0.001))
+            lv = self._last_vec
+            if lv is not None and dt < TURN_RESET_SEC and dx * lv[0] + dy * lv[1] < 0:
+                self._turns += 1
+            self._last_vec = (dx, dy)
+            self._anchor = (x, y, now)
+
+    def _close_locked(self):
+        if self._sec is not None and self._samples:
+            self._closed.append(
+                (self._sec, round(self._dist, 1), round(self._peak, 1), self._turns, self._samples)
+            )
+        self._dist = 0.0
+        self._peak = 0.0
+        self._turns = 0
+        self._samples = 0
+
+    def collect(self, flush_all: bool = False) -> List[Tuple]:
+        """닫힌 버킷들 반환 (writer 스레드). 현재 초가 지난 버킷도 여기서 닫음."""
+        with self._lock:
+            if self._sec is not None and (flush_all or int(time.time()) > self._sec):
+                self._close_locked()
+                self._sec = None
+            out = list(self._closed)
+            self._closed.clear()
+        return out
+
+
+# =======================================================
+# 요약 (session_aggregate / analyzer 공통)
+# =======================================================
+def empty_motion_totals() -> Dict:
+    return {"distance": 0.0, "active_sec": 0, "peak_velocity": 0.0, "direction_changes": 0}
+
+
+def add_buckets(totals: Dict, buckets: Iterable) -> Dict:
+    """버킷(tuple 또는 motion.csv dict 행)을 누적 합계에 더함."""
+    for b in buckets:
+        if isinstance(b, dict):
+            dist = float(b.get("distance") or 0)
+            peak = float(b.get("peak_velocity") or 0)
+            turns = int(b.get("direction_changes") or 0)
+        else:
+            _, dist, peak, turns, _ = b
+        totals["distance"] += dist
+        if dist > 0:
+            totals["active_sec"] += 1
+        totals["peak_velocity"] = max(totals["peak_velocity"], peak)
+        totals["direction_changes"] += turns
+    return totals
+
+
+def motion_features(totals: Optional[Dict], session_sec: float) -> Dict:
+    """퍼지 규칙 / 결과 JSON 용 이동 강도 지표."""
+    t = totals or empty_motion_totals()
+    session_sec = max(float(session_sec or 0), 1.0)
+    active = int(t.get("active_sec") or 0)
+    return {
+        "distance_px": round(float(t.get("distance") or 0), 1),
+        "active_sec": active,
+        "active_ratio": min(active / session_sec, 1.0),
+        "px_per_sec": float(t.get("distance") or 0) / session_sec,
+        "peak_velocity": float(t.get("peak_velocity") or 0),
+        "turns_per_active_sec": int(t.get("direction_changes") or 0) / max(active, 1),
+    }
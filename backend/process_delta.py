@@ -0,0 +1,175 @@
+# process_delta.py
+"""
+프로세스 스냅샷 delta 인코딩 (data/sessions/<sid>/process_delta.csv)
+
+process.csv 는 2초마다 실행 중인 프로세스 전체(수백 행)를 다시 적음 →
+주기적인 keyframe + 그 사이에는 바뀐 프로세스만 기록.
+
+op 종류:
+    K  keyframe 항목 (그 시각의 전체 목록, 같은 timestamp 의 K 행들이 하나의 keyframe)
+    S  시작된 프로세스
+    X  종료된 프로세스 (pid 만)
+    C  cpu/memory 가 임계값 이상 바뀐 프로세스
+    T  스냅샷 1회 끝 표시 (pid 칸 = 그 시점 프로세스 수) → 변화 없는 tick 도 시각이 남음
+- 같은 pid 인데 이름이 바뀌면(pid 재사용) X + S
+- 읽기: ProcessTimeline(rows).at(ts) → 임의 시각의 프로세스 목록 (가장 가까운 keyframe 부터 재생)
+- process_count = tick 별 프로세스 수 합 (예전 process.csv 행 수와 같은 의미)
+"""
+import os
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from session_segments import read_segment_rows
+
+DELTA_KIND = "process_delta"
+DELTA_HEADER = ["timestamp", "op", "pid", "process_name", "cpu_percent", "memory_percent"]
+
+OP_KEY = "K"
+OP_START = "S"
+OP_EXIT = "X"
+OP_CHANGE = "C"
+OP_TICK = "T"
+
+KEYFRAME_EVERY = int(os.getenv("PROCESS_KEYFRAME_EVERY", "30"))         # tick 수 (기본 2초 * 30 = 1분)
+CPU_DELTA = float(os.getenv("PROCESS_CPU_DELTA", "1.0"))                # %p 이상 바뀌면 C
+MEM_DELTA = float(os.getenv("PROCESS_MEM_DELTA", "0.1"))
+
+# pid → (process_name, cpu_percent, memory_percent)
+ProcState = Dict[int, Tuple[str, float, float]]
+
+
+def _num(v) -> float:
+    try:
+        return round(float(v), 2)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# =======================================================
+# 쓰기
+# =======================================================
+class ProcessDeltaWriter:
+    """process_logger 의 tick 마다 write_tick() 1번."""
+
+    def __init__(self, writer, keyframe_every: int = KEYFRAME_EVERY,
+                 cpu_delta: float = CPU_DELTA, mem_delta: float = MEM_DELTA):
+        self._writer = writer
+        self._keyframe_every = max(int(keyframe_every), 1)
+        self._cpu_delta = cpu_delta
+        self._mem_delta = mem_delta
+        self._state: ProcState = {}
+        self._ticks = 0
+
+        self.keyframes = 0
+        self.rows = 0
+
+    def _changed(self, old: Tuple[str, float, float], new: Tuple[str, float, float]) -> bool:
+        return abs(new[1] - old[1]) >= self._cpu_delta or abs(new[2] - old[2]) >= self._mem_delta
+
+    def write_tick(self, ts: str, procs: ProcState) -> int:
+        """스냅샷 1회 기록. 반환: 이번 tick 의 프로세스 수."""
+        procs = {int(pid): (name or "", _num(cpu), _num(mem)) for pid, (name, cpu, mem) in procs.items()}
+        rows = []
+
+        if self._ticks % self._keyframe_every == 0:
+            rows = [[ts, OP_KEY, pid, *v] for pid, v in procs.items()]
+            self._state = procs
+            self.keyframes += 1
+        else:
+            state = self._state
+            for pid, (name, _, _) in list(state.items()):
+                new = procs.get(pid)
+                if new is None or new[0] != name:
+                    rows.append([ts, OP_EXIT, pid, "", "", ""])
+                    del state[pid]
+            for pid, v in procs.items():
+                old = state.get(pid)
+                if old is None:
+                    rows.append([ts, OP_START, pid, *v])
+                    state[pid] = v
+                elif self._changed(old, v):
+                    rows.append([ts, OP_CHANGE, pid, *v])
+                    state[pid] = v
+
+        rows.append([ts, OP_TICK, len(procs), "", "", ""])
+        self._writer.writerows(rows)
+        self._ticks += 1
+        self.rows += len(rows)
+        return len(procs)
+
+
+# =======================================================
+# 읽기
+# =======================================================
+def _apply(state: ProcState, row: Dict[str, str]):
+    op = row.get("op")
+    try:
+        pid = int(row.get("pid") or 0)
+    except ValueError:
+        return
+    if op == OP_EXIT:
+        state.pop(pid, None)
+    elif op in (OP_KEY, OP_START, OP_CHANGE):
+        state[pid] = (row.get("process_name") or "", _num(row.get("cpu_percent")), _num(row.get("memory_percent")))
+
+
+class ProcessTimeline:
+    """process_delta.csv 행들 → tick 시각 / 프로세스 수 / 임의 시각의 프로세스 목록."""
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.rows = rows
+        self.ticks: List[str] = []        # tick timestamp (기록 순서 = 시간 순서)
+        self.counts: List[int] = []       # tick 별 프로세스 수
+        self._tick_end: List[int] = []    # tick 의 T 행 index
+        self._kf_tick: List[int] = []     # keyframe 이 시작되는 tick 번호
+        self._kf_row: List[int] = []      # keyframe 첫 K 행 index
+
+        last_op = None
+        for i, r in enumerate(rows):
+            op = r.get("op")
+            if op == OP_KEY and last_op != OP_KEY:
+                self._kf_tick.append(len(self.ticks))
+                self._kf_row.append(i)
+            elif op == OP_TICK:
+                self.ticks.append(r.get("timestamp") or "")
+                self.counts.append(int(_num(r.get("pid"))))
+                self._tick_end.append(i)
+            last_op = op
+
+    def process_count(self) -> int:
+        return sum(self.counts)
+
+    def at(self, ts: str) -> ProcState:
+        """ts 시각(ISO 문자열) 이전 마지막 tick 의 프로세스 목록. 그 전이면 빈 dict."""
+        tick = bisect_right(self.ticks, ts) - 1
+        if tick < 0:
+            return {}
+        k = bisect_right(self._kf_tick, tick) - 1
+        if k < 0:
+            return {}
+        state: ProcState = {}
+        for r in self.rows[self._kf_row[k]:self._tick_end[tick] + 1]:
+            _apply(state, r)
+        return state
+
+    def snapshots(self) -> Iterator[Tuple[str, ProcState]]:
+        """(tick 시각, 프로세스 목록) 순회. 목록 dict 는 다음 tick 에서 갱신되므로 보관하려면 복사."""
+        state: ProcState = {}
+        last_op = None
+        for r in self.rows:
+            op = r.get("op")
+            if op == OP_TICK:
+                yield r.get("timestamp") or "", state
+            else:
+                if op == OP_KEY and last_op != OP_KEY:
+                    state.clear()
+                _apply(state, r)
+            last_op = op
+
+
+def read_process_timeline(session_id) -> Optional[ProcessTimeline]:
+    """세션 process_delta.csv → ProcessTimeline. 없으면 None (예전 process.csv 세션)."""
+    rows = read_segment_rows(session_id, DELTA_KIND)
+    if rows is None:
+        return None
+    return ProcessTimeline(rows)
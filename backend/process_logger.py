@@ -1,17 +1,25 @@
 import os
 import time
-import csv
 from datetime import datetime
+from typing import Dict, Tuple
 
 import psutil
 
-# backend 기준으로 ../data/process_log.csv 에 저장되도록 경로 설정
+from process_delta import DELTA_HEADER, DELTA_KIND, ProcessDeltaWriter
+from session_writer import open_stream
+from session_aggregate import get_aggregator
+
+# 예전 전역 로그 경로 (backend/../data/process_log.csv) — 마이그레이션 대상
+# ✅ 새 세션은 세션 세그먼트(session_writer)의 process_delta 스트림에 기록 (keyframe + 변경분, process_delta 참고)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 PROCESS_LOG_PATH = os.path.join(DATA_DIR, "process_log.csv")
 
+# 예전 process.csv 형식 (스냅샷마다 전체 목록)
+CSV_HEADER = ["timestamp", "session_id", "pid", "process_name", "cpu_percent", "memory_percent"]
+
 
 def get_active_processes():
     """
@@ -27,37 +35,83 @@ def get_active_processes():
     return processes
 
 
-def _append_process_log_row(session_id: str):
+class ProcessPool:
     """
-    현재 실행 중인 프로세스 목록을 한 번 스냅샷 찍어서
-    process_log.csv 에 (여러 줄로) 추가.
+    pid → psutil.Process 를 세션 동안 재사용.
+    - process_iter 는 매 tick 새 Process 객체 → cpu_percent 기준점이 없어서 대부분 0.0
+    - 처음 본 pid 는 cpu_percent(None) 으로 기준점만 잡고(이번 tick 0.0), 다음 tick 부터 실제 값
+    - 이름은 처음 한 번만 조회, 종료된 pid 는 pool 에서 제거
+    - pid 재사용(다른 프로세스가 같은 pid) 은 is_running() (create_time 비교) 으로 확인 → 새로 등록
+      (psutil 의 cpu/memory 조회는 재사용을 감지하지 않아서 예전 이름에 새 프로세스 값이 붙음)
     """
-    # 파일이 없으면 헤더 먼저 작성
-    file_exists = os.path.exists(PROCESS_LOG_PATH)
 
-    with open(PROCESS_LOG_PATH, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["timestamp", "session_id", "pid", "process_name", "cpu_percent", "memory_percent"])
-
-        now = datetime.utcnow().isoformat()
-
-        for proc in psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent"]):
+    def __init__(self):
+        self._procs: Dict[int, Tuple[psutil.Process, str]] = {}
+        self.created = 0
+        self.pruned = 0
+        self.reused = 0
+
+    def _add(self, pid: int):
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            name = proc.name()
+            proc.cpu_percent(None)   # 기준점 (priming)
+        self._procs[pid] = (proc, name)
+        self.created += 1
+
+    def sample(self) -> Dict[int, Tuple[str, float, float]]:
+        """현재 실행 중인 프로세스 → {pid: (name, cpu_percent, memory_percent)}"""
+        pids = set(psutil.pids())
+
+        for pid in list(self._procs):
+            if pid not in pids:
+                del self._procs[pid]
+                self.pruned += 1
+
+        procs = {}
+        for pid in pids:
             try:
-                info = proc.info
-                writer.writerow(
-                    [
-                        now,
-                        session_id,
-                        info.get("pid"),
-                        info.get("name"),
-                        info.get("cpu_percent"),
-                        info.get("memory_percent"),
-                    ]
-                )
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                cached = self._procs.get(pid)
+                if cached is not None and not cached[0].is_running():
+                    # 같은 pid, 다른 프로세스 → 이름/cpu 기준점 다시
+                    del self._procs[pid]
+                    self.reused += 1
+                    cached = None
+                if cached is None:
+                    self._add(pid)
+                proc, name = self._procs[pid]
+                with proc.oneshot():
+                    try:
+                        cpu = proc.cpu_percent(None)
+                    except psutil.AccessDenied:
+                        cpu = None
+                    try:
+                        mem = proc.memory_percent()
+                    except psutil.AccessDenied:
+                        mem = None
+                procs[pid] = (name, cpu, mem)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
                 # 중간에 죽은 프로세스는 무시
+                if self._procs.pop(pid, None) is not None:
+                    self.pruned += 1
+            except psutil.AccessDenied:
+                # 이름조차 못 읽는 프로세스 (다음 tick 에 다시 시도)
                 continue
+        return procs
+
+    def __len__(self):
+        return len(self._procs)
+
+
+def _append_process_log_row(pool: ProcessPool, delta: ProcessDeltaWriter):
+    """
+    현재 실행 중인 프로세스 목록을 한 번 스냅샷 찍어서
+    세션 세그먼트(process_delta 스트림)에 바뀐 부분만 추가.
+    - 반환: (스냅샷 timestamp, 이번 스냅샷의 프로세스 수)
+    """
+    now = datetime.utcnow().isoformat()
+    n_procs = delta.write_tick(now, pool.sample())
+    return now, n_procs
 
 
 def start_process_logging(session_id: str, stop_event, interval: float = 2.0):
@@ -70,12 +124,21 @@ def start_process_logging(session_id: str, stop_event, interval: float = 2.0):
     """
     print(f"[ProcessLogger] start_process_logging: session_id={session_id}, interval={interval}s")
 
+    f, writer = open_stream(session_id, DELTA_KIND, DELTA_HEADER)
+    delta = ProcessDeltaWriter(writer)
+    pool = ProcessPool()
+    agg = get_aggregator(session_id)
+
     while not stop_event.is_set():
-        _append_process_log_row(session_id)
+        ts, n_procs = _append_process_log_row(pool, delta)
+        f.flush()
+        agg.on_process(ts, n_procs)   # process_count 는 예전처럼 스냅샷별 프로세스 수 합
         # 너무 자주 찍지 않도록 interval 만큼 쉼
         stop_event.wait(interval)
 
-    print("[ProcessLogger] stop_event 감지, 종료합니다.")
+    f.close()
+    print(f"[ProcessLogger] stop_event 감지, 종료합니다. (rows={delta.rows}, keyframes={delta.keyframes}, "
+          f"pool created={pool.created} pruned={pool.pruned} reused={pool.reused})")
 
 
 if __name__ == "__main__":
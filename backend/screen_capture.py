@@ -1,13 +1,22 @@
 # screen_capture.py
-import csv
-import time
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 import pyautogui
 import threading
 
+from session_stop import stop_remaining
+from session_writer import open_stream
+from session_aggregate import get_aggregator
+from screen_manifest import session_screens_dir
+from screen_thumbs import ThumbRing, thumbnail_array
+from screen_encoder import STATUS_DROPPED, STATUS_SAVED, STATUS_UNCHANGED, EncodePool, EncoderConfig
+from motion_score import motion_score_between
+from capture_scheduler import get_scheduler
+from screen_store import STATUS_DEDUPED, put_image
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # ✅ (중요) backend/data 로 통일
@@ -17,8 +26,16 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 SCREENS_DIR = DATA_DIR / "screens"
 SCREENS_DIR.mkdir(parents=True, exist_ok=True)
 
+# 전역 로그(마이그레이션 전 히스토리). 새 세션은 data/sessions/<sid>/screen.csv 에 기록
 SCREEN_CSV = DATA_DIR / "screen_log.csv"
 
+# ✅ 변화 감지: 직전 "저장한" 프레임 대비 변화 비율(128x128 썸네일 기준)이 이 값 미만이면 저장 X
+# - 0 이면 변화 감지 끄고 모든 프레임 저장
+SCREEN_CHANGE_THRESHOLD = float(os.getenv("SCREEN_CHANGE_THRESHOLD", "0.005"))
+
+# ✅ content-addressed 저장소(screen_store) 사용 여부. 0 이면 예전처럼 screens/<sid>/ 에 파일 저장
+SCREEN_DEDUP = os.getenv("SCREEN_DEDUP", "1") == "1"
+
 CSV_HEADER = [
     "timestamp",
     "user_id",
@@ -26,27 +43,33 @@ CSV_HEADER = [
     "usage_index",
     "task_label",
     "filename",
+    "thumb_slot",   # screen_thumbs 링 버퍼 프레임 번호 (없으면 빈 값)
+    "encode_ms",    # 인코딩 시간 (dropped 면 빈 값)
+    "status",       # saved / deduped / dropped / error / unchanged
+    "blob_id",      # screen_store blob (파일명 = <blob_id><ext>), 샤드 폴더 저장이면 빈 값
 ]
 
 
-def _ensure_header(path: Path):
-    if not path.exists() or path.stat().st_size == 0:
-        with path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(CSV_HEADER)
-
-
 def start_screen_capture(
     session_meta: Dict,
     stop_event: threading.Event,
     interval: float = 2.0,
+    encoder: Optional[EncoderConfig] = None,
+    change_threshold: float = SCREEN_CHANGE_THRESHOLD,
 ):
     """
     일정 간격으로 전체 화면을 캡쳐해서 저장.
     - 파일명에 user_id, session_id, usage_index를 포함.
-    - 별도 screen_log.csv에 메타 기록.
+    - data/screens/<session_id>/ 샤드 폴더에 저장 (세션 manifest = screen.csv 세그먼트).
+    - 세션 세그먼트(data/sessions/<sid>/screen.csv)에 메타 기록.
+    - 모델 입력용 128x128 썸네일을 세션 링 버퍼(thumbs_*.npy)에 같이 기록 → 분석 시 PNG 디코딩 X
+    - 인코딩(PNG/JPEG/WebP)은 screen_encoder 풀에서 → 캡쳐 스레드는 screenshot + 썸네일만
+    - SCREEN_DEDUP=1(기본): screen_store 에 내용 해시로 저장 → 이미 있는 화면이면 인코딩/저장 X
+    - 캡쳐 시각은 capture_scheduler 가 결정 (monotonic 기준, 인코딩 시간만큼 밀리지 않음)
+      interval 은 기본 간격: 창 전환 시 바로 캡쳐, 화면 변화 없으면 간격을 점점 늘림, 프레임 예산
+    - 직전 저장 프레임과 거의 같은 화면(읽기/강의/음악)은 "unchanged" 행만 남기고
+      인코딩/저장/썸네일/CNN 모두 생략 (motion_score_between 을 썸네일에 적용)
     """
-    _ensure_header(SCREEN_CSV)
 
     user_id = session_meta.get("user_id")
     session_id = session_meta.get("session_id")
@@ -55,47 +78,109 @@ def start_screen_capture(
 
     base_prefix = f"user{user_id}_sess{session_id}_run{usage_index}"
 
-    f = SCREEN_CSV.open("a", newline="", encoding="utf-8")
-    writer = csv.writer(f)
+    f, writer = open_stream(session_id, "screen", CSV_HEADER)
+    write_lock = threading.Lock()   # 캡쳐 스레드(dropped) + 인코딩 스레드(saved)가 같이 기록
+    shard_dir = session_screens_dir(session_id, create=True)
+    agg = get_aggregator(session_id)
 
-    idx = 0
+    try:
+        ring = ThumbRing(session_id)
+    except Exception as e:
+        print("[screen_capture] thumbnail ring 생성 실패 (PNG만 저장):", e)
+        ring = None
 
-    # ✅ pyautogui 안전장치 해제(모서리 이동시 예외 방지)
-    pyautogui.FAILSAFE = False
-
-    print("[screen_capture] start:", session_meta)
-
-    while not stop_event.is_set():
-        ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        filename = f"{base_prefix}_{ts}_{idx:04d}.png"
-        save_path = SCREENS_DIR / filename
-
-        try:
-            img = pyautogui.screenshot()
-            img.save(save_path)
+    encoder = encoder or EncoderConfig.from_env()
 
+    def write_row(meta: Dict, status: str, encode_ms: Optional[float]):
+        with write_lock:
             writer.writerow(
                 [
-                    datetime.utcnow().isoformat(),
+                    meta["timestamp"],
                     user_id,
                     session_id,
                     usage_index,
                     task_label,
-                    filename,
+                    meta["filename"],
+                    meta["thumb_slot"],
+                    "" if encode_ms is None else f"{encode_ms:.1f}",
+                    status,
+                    meta.get("blob_id", ""),
                 ]
             )
             f.flush()
+        if status in (STATUS_SAVED, STATUS_DEDUPED):
+            agg.on_screen(meta["timestamp"])
+
+    def store_encode(img, path, meta: Dict):
+        blob_id, blob_name, ms, status = put_image(img, encoder)
+        meta["blob_id"] = blob_id
+        meta["filename"] = blob_name
+        return ms, status
+
+    pool = EncodePool(encoder, on_done=write_row, encode=store_encode if SCREEN_DEDUP else None)
+
+    sched = get_scheduler(session_id)
+    sched.set_base_interval(interval)
+
+    idx = 0
+    last_kept = None   # 마지막으로 저장(인코딩 큐에 넣은) 프레임의 썸네일
+
+    # ✅ pyautogui 안전장치 해제(모서리 이동시 예외 방지)
+    pyautogui.FAILSAFE = False
+
+    print("[screen_capture] start:", session_meta, encoder)
+
+    while sched.wait_next(stop_event):
+        ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        filename = f"{base_prefix}_{ts}_{idx:04d}{encoder.ext}"
+        save_path = shard_dir / filename
+
+        try:
+            img = pyautogui.screenshot()
+
+            thumb = thumbnail_array(img)
+            row_ts = datetime.utcnow().isoformat()
+
+            # motion_score_between 은 BGR 기준이지만 변화 비율만 보므로 RGB 썸네일 그대로 사용
+            if (
+                last_kept is not None
+                and change_threshold > 0
+                and motion_score_between(thumb, last_kept) < change_threshold
+            ):
+                write_row({"timestamp": row_ts, "filename": "", "thumb_slot": ""}, STATUS_UNCHANGED, None)
+                sched.on_frame(changed=False, kept=False)
+            else:
+                thumb_slot = ""
+                if ring is not None:
+                    try:
+                        thumb_slot = ring.append(thumb)
+                    except Exception as e:
+                        print("[screen_capture] thumbnail error:", e)
+
+                meta = {
+                    "timestamp": row_ts,
+                    "filename": filename,
+                    "thumb_slot": thumb_slot,
+                }
+                if pool.submit(img, save_path, meta):
+                    last_kept = thumb
+                    sched.on_frame(changed=True, kept=True)
+                else:
+                    write_row(meta, STATUS_DROPPED, None)
+                    sched.on_frame(changed=True, kept=False)
         except Exception as e:
             print("[screen_capture] capture error:", e)
 
         idx += 1
 
-        steps = int(interval / 0.1)
-        for _ in range(max(1, steps)):
-            if stop_event.is_set():
-                break
-            time.sleep(0.1)
+    if not sched.budget_left:
+        print(f"[screen_capture] 프레임 예산({sched.frame_budget}장) 초과 → 이후는 분배 간격으로 캡쳐함")
 
+    if not pool.close(timeout=stop_remaining(stop_event)):
+        print("[screen_capture] 종료 마감 시각까지 인코딩이 끝나지 않음")
+    if pool.expired:
+        print(f"[screen_capture] 마감 후 인코딩 생략(dropped): {pool.expired}장")
     f.close()
-    print("[screen_capture] stop")
-
+    if ring is not None:
+        ring.close()
+    print("[screen_capture] stop:", sched.stats())
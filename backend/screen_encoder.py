@@ -0,0 +1,198 @@
+# screen_encoder.py
+"""
+스크린샷 인코딩 설정 + 백그라운드 인코딩 풀.
+
+- 캡쳐 스레드는 pyautogui.screenshot() 만 하고, PNG/JPEG/WebP 인코딩은 풀 스레드에서
+  → 4K 화면 PNG 인코딩 시간 때문에 캡쳐 주기가 밀리지 않음
+- 큐 크기 제한: 인코딩이 못 따라가면 새 프레임은 버림(dropped) — 메모리에 프레임이 쌓이지 않음
+- 환경변수로 설정:
+    SCREEN_ENCODER        png | jpeg | webp   (기본 png)
+    SCREEN_PNG_LEVEL      0~9                 (기본 6, 낮을수록 빠르고 파일 큼)
+    SCREEN_QUALITY        JPEG/WebP 품질       (기본 85)
+    SCREEN_DOWNSCALE      정수 배율 축소, 1=원본 (기본 1, 2면 가로세로 1/2)
+    SCREEN_ENCODE_WORKERS 인코딩 스레드 수     (기본 2)
+    SCREEN_ENCODE_QUEUE   대기 프레임 최대 수   (기본 4)
+"""
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+# format → (확장자, PIL format 이름)
+ENCODER_FORMATS = {
+    "png": (".png", "PNG"),
+    "jpeg": (".jpg", "JPEG"),
+    "jpg": (".jpg", "JPEG"),
+    "webp": (".webp", "WEBP"),
+}
+
+STATUS_SAVED = "saved"
+STATUS_DROPPED = "dropped"
+STATUS_ERROR = "error"
+STATUS_UNCHANGED = "unchanged"   # 직전 저장 프레임과 거의 같아서 저장/인코딩 생략 (screen_capture)
+
+
+class EncoderConfig:
+    def __init__(self, fmt: str = "png", png_level: int = 6, quality: int = 85, downscale: int = 1):
+        fmt = (fmt or "png").lower()
+        if fmt not in ENCODER_FORMATS:
+            print(f"[screen_encoder] 알 수 없는 포맷 {fmt!r} → png 사용")
+            fmt = "png"
+        self.fmt = fmt
+        self.png_level = min(max(int(png_level), 0), 9)
+        self.quality = min(max(int(quality), 1), 100)
+        self.downscale = max(int(downscale), 1)
+
+    @classmethod
+    def from_env(cls) -> "EncoderConfig":
+        return cls(
+            fmt=os.getenv("SCREEN_ENCODER", "png"),
+            png_level=int(os.getenv("SCREEN_PNG_LEVEL", "6")),
+            quality=int(os.getenv("SCREEN_QUALITY", "85")),
+            downscale=int(os.getenv("SCREEN_DOWNSCALE", "1")),
+        )
+
+    @property
+    def ext(self) -> str:
+        return ENCODER_FORMATS[self.fmt][0]
+
+    def save_kwargs(self) -> Dict:
+        pil_format = ENCODER_FORMATS[self.fmt][1]
+        if pil_format == "PNG":
+            return {"format": pil_format, "compress_level": self.png_level}
+        return {"format": pil_format, "quality": self.quality}
+
+    def __repr__(self):
+        return (f"EncoderConfig(fmt={self.fmt!r}, png_level={self.png_level}, "
+                f"quality={self.quality}, downscale={self.downscale})")
+
+
+def prepare_image(img: Image.Image, config: EncoderConfig) -> Image.Image:
+    """저장 직전 이미지 (축소 + 포맷에 맞는 모드)."""
+    if config.downscale > 1:
+        img = img.reduce(config.downscale)
+    if config.fmt in ("jpeg", "jpg") and img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def encode_image(img: Image.Image, path: Path, config: EncoderConfig) -> float:
+    """설정대로 축소/인코딩해서 저장. 걸린 시간(ms) 반환."""
+    t0 = time.perf_counter()
+    prepare_image(img, config).save(path, **config.save_kwargs())
+    return (time.perf_counter() - t0) * 1000.0
+
+
+class EncodePool:
+    """
+    bounded queue + 인코딩 스레드 몇 개.
+    - submit() 은 절대 block 하지 않음 (큐가 꽉 차면 False → 호출한 쪽에서 dropped 기록)
+    - 인코딩이 끝나면 on_done(meta, status, encode_ms) 호출 (풀 스레드에서)
+    - encode(img, path, meta) -> (encode_ms, status) 로 저장 방식을 바꿀 수 있음
+      (기본: path 에 파일로 저장 / screen_store: blob 저장소, meta 에 blob_id·filename 기록)
+    """
+
+    def __init__(
+        self,
+        config: EncoderConfig,
+        on_done: Callable[[Dict, str, Optional[float]], None],
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        encode: Optional[Callable[[Image.Image, Path, Dict], Tuple[float, str]]] = None,
+    ):
+        self.config = config
+        self._on_done = on_done
+        self._encode = encode or self._encode_file
+        workers = workers or int(os.getenv("SCREEN_ENCODE_WORKERS", "2"))
+        queue_size = queue_size or int(os.getenv("SCREEN_ENCODE_QUEUE", "4"))
+        self._q: "queue.Queue" = queue.Queue(maxsize=max(queue_size, 1))
+        self._deadline: Optional[float] = None   # close(timeout) 마감 시각 (monotonic)
+        self.expired = 0                         # 마감 후라 인코딩하지 않고 dropped 처리한 프레임 수
+        self._threads = [
+            threading.Thread(target=self._run, name=f"screen-encode-{i}", daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, img: Image.Image, path: Path, meta: Dict) -> bool:
+        try:
+            self._q.put_nowait((img, path, meta))
+            return True
+        except queue.Full:
+            return False
+
+    def _encode_file(self, img: Image.Image, path: Path, meta: Dict) -> Tuple[float, str]:
+        return encode_image(img, path, self.config), STATUS_SAVED
+
+    def _run(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            img, path, meta = item
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                # 종료 마감 시각이 지남 → 인코딩 없이 행만 남김 (dropped)
+                self.expired += 1
+                ms, status = None, STATUS_DROPPED
+            else:
+                try:
+                    ms, status = self._encode(img, path, meta)
+                except Exception as e:
+                    print(f"[screen_encoder] encode error: {path} ({e})")
+                    ms, status = None, STATUS_ERROR
+            try:
+                self._on_done(meta, status, ms)
+            except Exception as e:
+                print("[screen_encoder] on_done error:", e)
+
+    def _drop_queued(self) -> int:
+        """큐에 남은 프레임을 인코딩 없이 dropped 로 on_done. 반환: 같이 빠진 종료 신호(None) 수."""
+        sentinels = 0
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                return sentinels
+            if item is None:
+                sentinels += 1
+                continue
+            self.expired += 1
+            try:
+                self._on_done(item[2], STATUS_DROPPED, None)
+            except Exception as e:
+                print("[screen_encoder] on_done error:", e)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        남은 프레임까지 인코딩한 뒤 스레드 종료.
+        - timeout: 이 시간이 지나면 아직 시작 못 한 프레임은 인코딩 없이 dropped 로 on_done
+          (이미 인코딩 중인 프레임만 기다림) → 모든 스레드가 끝났으면 True
+        """
+        if timeout is not None:
+            self._deadline = time.monotonic() + max(timeout, 0.0)
+        def left():
+            return None if self._deadline is None else max(self._deadline - time.monotonic(), 0.0)
+
+        sent = 0
+        try:
+            for _ in self._threads:
+                self._q.put(None, timeout=left())
+                sent += 1
+        except queue.Full:
+            # 마감까지 큐가 안 비었음 → 남은 프레임은 dropped 로 빼내고 스레드마다 종료 신호
+            #   (신호를 못 받은 스레드가 q.get() 에서 영원히 멈추지 않도록)
+            while sent < len(self._threads):
+                sent -= self._drop_queued()
+                try:
+                    self._q.put_nowait(None)
+                    sent += 1
+                except queue.Full:
+                    continue
+        for t in self._threads:
+            t.join(left())
+        return not any(t.is_alive() for t in self._threads)
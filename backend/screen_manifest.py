@@ -0,0 +1,99 @@
+# screen_manifest.py
+"""
+세션별 스크린샷 목록(manifest) 조회.
+
+- 저장 위치: data/screens/<session_id>/<filename>  (세션 단위 샤딩)
+- manifest: screen_capture가 기록하는 세션 세그먼트 data/sessions/<sid>/screen.csv
+  → 세션의 프레임을 찾을 때 screens 폴더 전체를 listdir 하지 않음
+- 예전(평면 구조) 스크린샷도 파일명으로 찾을 수 있도록 data/screens/<filename> 도 확인
+- blob_id 가 있는 행은 screen_store(content-addressed 저장소) 파일
+"""
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from log_archive import read_history_rows
+from screen_store import blob_path
+from session_segments import DATA_DIR, read_segment_rows
+
+SCREENS_DIR = DATA_DIR / "screens"
+SCREENS_DIR.mkdir(parents=True, exist_ok=True)
+
+# 세그먼트가 없는 예전 세션용 전역 manifest
+SCREEN_CSV = DATA_DIR / "screen_log.csv"
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")  # screen_encoder 포맷
+
+# screen_capture.py 파일명: user{uid}_sess{session_id}_run{usage}_...png
+_FILENAME_SESSION_RE = re.compile(r"_sess(.+?)_run\d+_")
+
+
+def session_screens_dir(session_id, create: bool = False) -> Path:
+    sid = str(session_id)
+    if not sid or sid in (".", "..") or "/" in sid or "\\" in sid:
+        raise ValueError(f"[screen_manifest] 잘못된 session_id: {session_id!r}")
+    d = SCREENS_DIR / sid
+    if create:
+        d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def session_id_from_filename(filename: str) -> Optional[str]:
+    m = _FILENAME_SESSION_RE.search(filename or "")
+    return m.group(1) if m else None
+
+
+def resolve_screen_path(session_id, filename: str, blob_id: str = "") -> Optional[Path]:
+    """blob 저장소 → 샤드 폴더 → 예전 평면 폴더 순서로 실제 파일 경로 확인."""
+    if not filename:
+        return None
+    name = Path(filename).name
+    if blob_id:
+        p = blob_path(name)
+        return p if p.exists() else None
+    for p in (session_screens_dir(session_id) / name, SCREENS_DIR / name):
+        if p.exists():
+            return p
+    return None
+
+
+def _manifest_entries(session_id) -> Optional[List[Tuple[str, str]]]:
+    """manifest 행 → [(filename, blob_id)]"""
+    rows = read_segment_rows(session_id, "screen")
+    if rows is None:
+        rows = read_history_rows(SCREEN_CSV, str(session_id))
+        if not rows:
+            return None
+    return [(r.get("filename") or "", r.get("blob_id") or "") for r in rows]
+
+
+def list_session_screens(session_id, last: Optional[int] = None) -> List[Path]:
+    """
+    세션 스크린샷 경로를 캡쳐 순서대로 반환.
+    - last 지정 시 최근 last장만 (뒤에서부터 존재하는 파일만 확인)
+    - manifest가 없으면 샤드 폴더(마이그레이션된 세션)만 확인
+    """
+    try:
+        shard = session_screens_dir(session_id)
+    except ValueError:
+        return []
+
+    entries = _manifest_entries(session_id)
+    if entries is None:
+        if not shard.is_dir():
+            return []
+        paths = sorted(p for p in shard.iterdir() if p.name.lower().endswith(IMAGE_EXTS))
+        return paths[-last:] if last else paths
+
+    found: List[Path] = []
+    for name, blob_id in reversed(entries):
+        if not name.lower().endswith(IMAGE_EXTS):
+            continue
+        p = resolve_screen_path(session_id, name, blob_id)
+        if p is None:
+            continue
+        found.append(p)
+        if last and len(found) >= last:
+            break
+    found.reverse()
+    return found
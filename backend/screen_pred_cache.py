@@ -0,0 +1,202 @@
+# screen_pred_cache.py
+"""
+스크린샷 1장당 CNN 확률 벡터 캐시 (세션 단위 영구 저장).
+
+- 저장 위치: data/sessions/<sid>/cnn_probs.npz
+    names  : 파일명 (N,)
+    hashes : 파일 내용 해시 blake2b-128 hex (N,)
+    probs  : float16 (N, num_labels)  → 프레임당 14 bytes
+    model  : 모델 파일 식별자 (파일명:크기:mtime) — 모델이 바뀌면 캐시 전체 무효
+- 키 = (파일명, 내용 해시): 같은 이름으로 다른 이미지가 저장돼도 다시 추론
+- 재분석 / predict_screen_probs / mypage fallback 모두 같은 캐시 사용
+  → 한 프레임은 평생 한 번만 CNN을 통과 (캐시 hit 는 이미지 디코딩도 생략)
+"""
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from screen_manifest import session_id_from_filename
+from screen_thumbs import session_thumbs, thumbnail_array
+from session_segments import session_dir
+
+CACHE_FILENAME = "cnn_probs.npz"
+
+# 파일명으로 세션을 알 수 없는 예전 스크린샷용 버킷
+UNSORTED_SESSION = "_unsorted"
+
+_lock = threading.Lock()
+# { session_id: (npz mtime_ns, model_key, {filename: (hash, probs row)}) } — 프로세스 내 캐시
+_loaded: Dict[str, Tuple[int, str, Dict[str, Tuple[str, np.ndarray]]]] = {}
+
+
+def load_screen_array(src) -> np.ndarray:
+    """PNG 디코딩 → 모델 입력 (캡쳐 시점 썸네일과 같은 변환)."""
+    with Image.open(src) as img:
+        return thumbnail_array(img)
+
+
+def model_key(model_path: Optional[str]) -> str:
+    if not model_path:
+        return ""
+    try:
+        st = os.stat(model_path)
+    except OSError:
+        return ""
+    return f"{os.path.basename(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _cache_path(session_id: str) -> Path:
+    return session_dir(session_id) / CACHE_FILENAME
+
+
+def _read_entries(path: Path, key: str) -> Dict[str, Tuple[str, np.ndarray]]:
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            if str(z["model"]) != key:
+                return {}
+            names, hashes, probs = z["names"], z["hashes"], z["probs"]
+    except Exception:
+        return {}
+    return {str(n): (str(h), probs[i]) for i, (n, h) in enumerate(zip(names, hashes))}
+
+
+def _entries(session_id: str, key: str) -> Dict[str, Tuple[str, np.ndarray]]:
+    """(lock 안에서 호출) 디스크 파일이 바뀌었을 때만 다시 읽음."""
+    path = _cache_path(session_id)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        mtime = -1
+
+    cached = _loaded.get(session_id)
+    if cached is not None and cached[0] == mtime and cached[1] == key:
+        return cached[2]
+
+    entries = _read_entries(path, key) if mtime >= 0 else {}
+    _loaded[session_id] = (mtime, key, entries)
+    return entries
+
+
+def _save(session_id: str, key: str, entries: Dict[str, Tuple[str, np.ndarray]]):
+    """(lock 안에서 호출) tmp 파일에 쓰고 os.replace 로 교체."""
+    d = session_dir(session_id, create=True)
+    path = d / CACHE_FILENAME
+    tmp = d / (CACHE_FILENAME + ".tmp")
+    names = list(entries)
+    try:
+        with tmp.open("wb") as f:
+            np.savez(
+                f,
+                names=np.array(names, dtype=str),
+                hashes=np.array([entries[n][0] for n in names], dtype=str),
+                probs=np.stack([entries[n][1] for n in names]).astype(np.float16),
+                model=np.array(key),
+            )
+        os.replace(tmp, path)
+        _loaded[session_id] = (path.stat().st_mtime_ns, key, entries)
+    except Exception as e:
+        print("[screen_pred_cache] 저장 실패:", e)
+
+
+def _session_of(path: Path, session_id: Optional[str]) -> str:
+    if session_id:
+        return str(session_id)
+    return session_id_from_filename(path.name) or UNSORTED_SESSION
+
+
+def _session_thumbs(session_id: str, paths: Sequence) -> Dict[str, np.ndarray]:
+    if session_id == UNSORTED_SESSION:
+        return {}
+    try:
+        return session_thumbs(session_id, (Path(p).name for p in paths))
+    except Exception as e:
+        print("[screen_pred_cache] 썸네일 읽기 실패:", e)
+        return {}
+
+
+def predict_frames(
+    paths: Sequence,
+    predict: Callable[[np.ndarray], np.ndarray],
+    model_path: Optional[str],
+    session_id: Optional[str] = None,
+) -> np.ndarray:
+    """
+    스크린샷 경로들의 프레임별 확률 (읽을 수 없는 파일은 제외, 순서 유지).
+    - 캐시에 있는 프레임은 그대로 사용, 나머지만 한 번의 predict 로 추론 후 캐시에 추가
+    - session_id 가 없으면 파일명(_sess<sid>_)으로 세션 캐시를 고름
+    - 캐시 miss 프레임은 캡쳐 시점 썸네일(screen_thumbs)이 있으면 그걸 쓰고, 없을 때만 PNG 디코딩
+    - predict 예외는 호출한 쪽으로 그대로 전달 (캐시는 건드리지 않음)
+    """
+    key = model_key(model_path)
+
+    rows: List[Optional[np.ndarray]] = []
+    miss_idx: List[int] = []
+    miss_x: List[np.ndarray] = []
+    miss_meta: List[Tuple[str, str, str]] = []   # (session_id, filename, hash)
+    thumbs: Dict[str, Dict[str, np.ndarray]] = {}  # session_id → {filename: 썸네일}
+
+    for p in paths:
+        p = Path(p)
+        try:
+            data = p.read_bytes()
+        except OSError as e:
+            print(f"[screen_pred_cache] 이미지 로드 실패: {p} ({e})")
+            continue
+        sid = _session_of(p, session_id)
+        h = _content_hash(data)
+
+        with _lock:
+            try:
+                hit = _entries(sid, key).get(p.name)
+            except ValueError:
+                hit = None
+        if hit is not None and hit[0] == h:
+            rows.append(hit[1].astype(np.float32))
+            continue
+
+        if sid not in thumbs:
+            thumbs[sid] = _session_thumbs(sid, paths)
+        x = thumbs[sid].get(p.name)
+        if x is None:
+            try:
+                x = load_screen_array(io.BytesIO(data))
+            except Exception as e:
+                print(f"[screen_pred_cache] 이미지 로드 실패: {p} ({e})")
+                continue
+        miss_idx.append(len(rows))
+        miss_x.append(x)
+        miss_meta.append((sid, p.name, h))
+        rows.append(None)
+
+    if miss_x:
+        out = np.asarray(predict(np.stack(miss_x)), dtype=np.float32)
+        touched = {}
+        for i, (sid, name, h), probs in zip(miss_idx, miss_meta, out):
+            probs16 = probs.astype(np.float16)
+            # 처음 분석과 재분석(캐시 hit) 결과가 같도록 float16 으로 맞춤
+            rows[i] = probs16.astype(np.float32)
+            touched.setdefault(sid, []).append((name, h, probs16))
+
+        with _lock:
+            for sid, new in touched.items():
+                try:
+                    entries = dict(_entries(sid, key))
+                except ValueError:
+                    continue
+                for name, h, probs in new:
+                    entries[name] = (h, probs)
+                _save(sid, key, entries)
+
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack(rows)
@@ -0,0 +1,190 @@
+# screen_store.py
+"""
+스크린샷 content-addressed 저장소 (중복 제거 + 참조 카운트).
+
+- blob_id = 저장할 이미지 픽셀(축소 후)의 blake2b-128 해시  → 같은 화면은 세션/유저가 달라도 파일 1개
+- dhash   = 64bit difference hash (9x8 그레이) → 지각적으로 같은 화면 조회용
+    SCREEN_DEDUP_PERCEPTUAL=1 이면 dhash 가 같은 기존 blob 을 재사용 (픽셀이 조금 달라도)
+- 파일: data/blobs/<blob_id 앞 2글자>/<blob_id><ext>
+- 메타/참조 카운트: data/screen_store.sqlite3 (local_db, WAL)
+    screen.csv 세그먼트 행 하나 = 참조 1개 → release_session() 으로 세션 삭제 시 감소, 0이면 파일 삭제
+- 이미 있는 blob 이면 인코딩 자체를 생략 (encode_ms 는 해시 계산 시간만)
+"""
+import argparse
+import hashlib
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from local_db import execute, get_conn, register_schema
+from screen_encoder import EncoderConfig, STATUS_SAVED, prepare_image
+from session_segments import DATA_DIR, read_segment_rows, session_dir
+
+BLOBS_DIR = DATA_DIR / "blobs"
+STORE_DB = DATA_DIR / "screen_store.sqlite3"
+
+STATUS_DEDUPED = "deduped"   # 기존 blob 재사용 (새 파일 X)
+
+# 세션 참조를 이미 해제했다는 표시 (두 번 해제해서 refcount 가 틀어지지 않도록)
+RELEASED_MARKER = "blobs_released"
+
+DEDUP_PERCEPTUAL = os.getenv("SCREEN_DEDUP_PERCEPTUAL", "0") == "1"
+
+register_schema(STORE_DB, """
+CREATE TABLE IF NOT EXISTS blobs (
+    blob_id    TEXT PRIMARY KEY,
+    dhash      INTEGER NOT NULL,
+    ext        TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    width      INTEGER NOT NULL,
+    height     INTEGER NOT NULL,
+    refcount   INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_dhash ON blobs(dhash);
+""")
+
+
+def blob_filename(blob_id: str, ext: str) -> str:
+    return f"{blob_id}{ext}"
+
+
+def blob_path(filename: str) -> Path:
+    """blob 파일명(<blob_id><ext>) → 실제 경로."""
+    name = Path(filename).name
+    return BLOBS_DIR / name[:2] / name
+
+
+def exact_hash(img: Image.Image) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def dhash(img: Image.Image) -> int:
+    """64bit difference hash (SQLite INTEGER 에 맞게 signed 로 변환)."""
+    g = img.convert("L").resize((9, 8), Image.BILINEAR)
+    px = list(g.getdata())
+    v = 0
+    for row in range(8):
+        for col in range(8):
+            v = (v << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return v - (1 << 64) if v >= (1 << 63) else v
+
+
+def _add_ref(conn, blob_id: str) -> Optional[Dict]:
+    row = conn.execute("SELECT blob_id, ext FROM blobs WHERE blob_id = ?", (blob_id,)).fetchone()
+    if row is None or not blob_path(blob_filename(row["blob_id"], row["ext"])).exists():
+        return None
+    conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE blob_id = ?", (blob_id,))
+    return row
+
+
+def put_image(img: Image.Image, config: EncoderConfig) -> Tuple[str, str, float, str]:
+    """
+    이미지를 저장소에 넣고 참조 1개 추가.
+    반환: (blob_id, blob 파일명, 걸린 시간 ms, status(saved/deduped))
+    """
+    t0 = time.perf_counter()
+    img = prepare_image(img, config)
+    blob_id = exact_hash(img)
+    dh = dhash(img)
+
+    with get_conn(STORE_DB, immediate=True) as conn:
+        row = _add_ref(conn, blob_id)
+        if row is None and DEDUP_PERCEPTUAL:
+            near = conn.execute("SELECT blob_id FROM blobs WHERE dhash = ? LIMIT 1", (dh,)).fetchone()
+            if near is not None:
+                row = _add_ref(conn, near["blob_id"])
+    if row is not None:
+        ms = (time.perf_counter() - t0) * 1000.0
+        return row["blob_id"], blob_filename(row["blob_id"], row["ext"]), ms, STATUS_DEDUPED
+
+    # 새 blob: tmp 에 쓰고 rename (같은 blob 을 동시에 쓰더라도 내용이 같으므로 안전)
+    # rename 은 INSERT 와 같은 IMMEDIATE 트랜잭션 안에서 → release() 의 DELETE+unlink 와 직렬화
+    #   (rename 직후 다른 세션 release 가 같은 파일을 지워서 refcount=1 인데 파일이 없는 상태 방지)
+    filename = blob_filename(blob_id, config.ext)
+    path = blob_path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+    img.save(tmp, **config.save_kwargs())
+    size = tmp.stat().st_size
+
+    with get_conn(STORE_DB, immediate=True) as conn:
+        os.replace(tmp, path)
+        conn.execute(
+            """
+            INSERT INTO blobs (blob_id, dhash, ext, size, width, height, refcount, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT(blob_id) DO UPDATE SET refcount = refcount + 1
+            """,
+            (blob_id, dh, config.ext, size, img.size[0], img.size[1], datetime.utcnow().isoformat()),
+        )
+    ms = (time.perf_counter() - t0) * 1000.0
+    return blob_id, filename, ms, STATUS_SAVED
+
+
+# =======================================================
+# 참조 해제 / 정리
+# =======================================================
+def release(blob_id: str, n: int = 1) -> bool:
+    """참조 n개 해제. refcount 가 0이 되면 파일과 행 삭제 → 삭제했으면 True."""
+    with get_conn(STORE_DB, immediate=True) as conn:
+        row = conn.execute("SELECT ext, refcount FROM blobs WHERE blob_id = ?", (blob_id,)).fetchone()
+        if row is None:
+            return False
+        left = row["refcount"] - n
+        if left > 0:
+            conn.execute("UPDATE blobs SET refcount = ? WHERE blob_id = ?", (left, blob_id))
+            return False
+        conn.execute("DELETE FROM blobs WHERE blob_id = ?", (blob_id,))
+        # commit 전에 파일 삭제 → 동시에 put_image 가 같은 blob 을 새로 쓰는 경우
+        #   그쪽 rename + INSERT 는 이 트랜잭션이 끝난 뒤에 실행되므로 새 파일을 지우지 않음
+        try:
+            blob_path(blob_filename(blob_id, row["ext"])).unlink()
+        except FileNotFoundError:
+            pass
+    return True
+
+
+def release_session(session_id: str) -> Tuple[int, int]:
+    """세션 screen.csv 의 blob 참조를 모두 해제. 반환: (해제한 참조 수, 삭제된 blob 수)"""
+    marker = session_dir(session_id) / RELEASED_MARKER
+    if marker.exists():
+        return 0, 0
+    counts: Dict[str, int] = {}
+    for r in read_segment_rows(session_id, "screen") or []:
+        blob_id = r.get("blob_id")
+        if blob_id:
+            counts[blob_id] = counts.get(blob_id, 0) + 1
+    deleted = sum(1 for blob_id, n in counts.items() if release(blob_id, n))
+    if counts:
+        marker.touch()
+    return sum(counts.values()), deleted
+
+
+def store_stats() -> Dict:
+    row = execute(
+        STORE_DB,
+        "SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS bytes, COALESCE(SUM(refcount), 0) AS refs FROM blobs",
+        fetchone=True,
+    )
+    return dict(row or {})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="screenshot blob store")
+    parser.add_argument("--release-session", action="append", default=[], help="세션의 blob 참조 해제 (여러 번 지정 가능)")
+    parser.add_argument("--stats", action="store_true")
+    args = parser.parse_args()
+
+    for sid in args.release_session:
+        refs, deleted = release_session(sid)
+        print(f"[screen_store] {sid}: 참조 {refs}개 해제, blob {deleted}개 삭제")
+    if args.stats or not args.release_session:
+        print("[screen_store]", store_stats())
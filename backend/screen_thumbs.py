@@ -0,0 +1,244 @@
+# screen_thumbs.py
+"""
+캡쳐 시점에 만드는 모델 입력용 썸네일 (uint8 128x128x3) 링 버퍼.
+
+- 저장 위치: data/sessions/<sid>/thumbs_seq.npy  (capacity,) int64  — 각 슬롯에 들어있는 프레임 번호
+             data/sessions/<sid>/thumbs_<k>.npy   (THUMB_CHUNK, 128, 128, 3) uint8 — np.memmap, 슬롯 묶음
+- 프레임 번호 n 은 슬롯 n % capacity 에 기록 (capacity 를 넘으면 가장 오래된 프레임부터 덮어씀)
+- chunk 파일은 그 슬롯을 처음 쓸 때 생성 → 짧은 세션은 chunk 1개(약 3MB)만 디스크 사용
+  (memmap w+ 는 NTFS 에서 파일 크기만큼 바로 할당되므로 capacity 전체를 미리 만들지 않음)
+- 예전 세션의 thumbs.npy (capacity 전체 한 파일) 도 그대로 읽음
+- screen.csv 세그먼트의 thumb_slot 컬럼 = 프레임 번호 n
+  → 읽을 때 thumbs_seq[n % capacity] == n 인 경우만 유효 (덮어써졌으면 PNG 디코딩으로 fallback)
+- analyzer / train_cnn 은 PNG 디코딩 없이 바로 모델 입력으로 사용
+"""
+import os
+import threading
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from session_segments import SEGMENTS_DIR, read_segment_rows, session_dir
+from title_labels import label_from_title
+
+THUMB_SIZE = (128, 128)
+THUMB_SHAPE = (THUMB_SIZE[1], THUMB_SIZE[0], 3)
+
+# 슬롯 수 (2초 간격 캡쳐 기준 1024장 ≈ 34분, 다 쓰면 48MB)
+THUMB_CAPACITY = int(os.getenv("SCREEN_THUMB_CAPACITY", "1024"))
+# chunk 파일 하나의 슬롯 수 (64장 ≈ 3MB)
+THUMB_CHUNK = int(os.getenv("SCREEN_THUMB_CHUNK", "64"))
+
+LEGACY_THUMBS_FILENAME = "thumbs.npy"
+SEQ_FILENAME = "thumbs_seq.npy"
+
+
+def chunk_filename(k: int) -> str:
+    return f"thumbs_{k:03d}.npy"
+
+
+def thumbnail_array(img: Image.Image) -> np.ndarray:
+    """keras load_img(target_size=(128,128)) 와 동일: RGB 변환 + nearest 리사이즈, uint8 유지."""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if img.size != THUMB_SIZE:
+        img = img.resize(THUMB_SIZE, Image.NEAREST)
+    return np.asarray(img, dtype=np.uint8)
+
+
+class ThumbRing:
+    """세션 하나의 썸네일 링 버퍼 (screen_capture 스레드 1개가 append)."""
+
+    def __init__(self, session_id: str, capacity: int = THUMB_CAPACITY, chunk: int = THUMB_CHUNK):
+        self._dir = session_dir(session_id, create=True)
+        seq_path = self._dir / SEQ_FILENAME
+        self._lock = threading.Lock()
+        self._chunks: Dict[int, np.ndarray] = {}
+
+        if seq_path.exists():
+            # 같은 세션을 이어서 캡쳐하는 경우: 기존 링 재사용
+            self.seq = np.lib.format.open_memmap(seq_path, mode="r+")
+        else:
+            chunk = max(chunk, 1)
+            capacity = max(-(-capacity // chunk) * chunk, chunk)   # chunk 배수로 올림
+            self.seq = np.lib.format.open_memmap(seq_path, mode="w+", dtype=np.int64, shape=(capacity,))
+            self.seq[:] = -1
+        self.capacity = len(self.seq)
+        self._legacy = (self._dir / LEGACY_THUMBS_FILENAME).exists()
+        # 예전 형식: thumbs.npy 한 파일 = chunk 1개 / 이어쓰는 링: 기존 chunk 크기 유지
+        first = self._dir / chunk_filename(0)
+        if self._legacy:
+            self.chunk = self.capacity
+        elif first.exists():
+            self.chunk = int(np.load(first, mmap_mode="r").shape[0])
+        else:
+            self.chunk = chunk
+        self.next_seq = int(self.seq.max()) + 1
+
+    def _chunk_array(self, k: int) -> np.ndarray:
+        arr = self._chunks.get(k)
+        if arr is None:
+            path = self._dir / (LEGACY_THUMBS_FILENAME if self._legacy else chunk_filename(k))
+            if path.exists():
+                arr = np.lib.format.open_memmap(path, mode="r+")
+            else:
+                arr = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(self.chunk,) + THUMB_SHAPE)
+            self._chunks[k] = arr
+        return arr
+
+    def append(self, thumb: np.ndarray) -> int:
+        """썸네일 기록 후 프레임 번호 반환."""
+        with self._lock:
+            n = self.next_seq
+            slot = n % self.capacity
+            self.seq[slot] = -1          # 쓰는 도중 죽어도 반쯤 쓴 슬롯을 읽지 않도록
+            self._chunk_array(slot // self.chunk)[slot % self.chunk] = thumb
+            self.seq[slot] = n
+            self.next_seq = n + 1
+            return n
+
+    def flush(self):
+        for arr in self._chunks.values():
+            arr.flush()
+        self.seq.flush()
+
+    def close(self):
+        self.flush()
+        self._chunks = {}
+        self.seq = None
+
+
+# =======================================================
+# 읽기 (analyzer / train_cnn)
+# =======================================================
+class _RingReader:
+    """읽기 전용 링 (chunk 파일은 필요할 때 mmap)."""
+
+    def __init__(self, d, seq: np.ndarray):
+        self._dir = d
+        self.seq = seq
+        self._legacy = (d / LEGACY_THUMBS_FILENAME).exists()
+        self._chunks: Dict[int, Optional[np.ndarray]] = {}
+        self.chunk = len(seq) if self._legacy else None
+
+    def _chunk_array(self, k: int) -> Optional[np.ndarray]:
+        if k not in self._chunks:
+            path = self._dir / (LEGACY_THUMBS_FILENAME if self._legacy else chunk_filename(k))
+            try:
+                self._chunks[k] = np.load(path, mmap_mode="r")
+            except (FileNotFoundError, ValueError):
+                self._chunks[k] = None
+        return self._chunks[k]
+
+    def get(self, n: int) -> Optional[np.ndarray]:
+        slot = n % len(self.seq)
+        if int(self.seq[slot]) != n:
+            return None
+        if self.chunk is None:
+            first = self._chunk_array(0)
+            if first is None:
+                return None
+            self.chunk = len(first)
+        arr = self._chunk_array(slot // self.chunk)
+        if arr is None or slot % self.chunk >= len(arr):
+            return None
+        return np.array(arr[slot % self.chunk])
+
+
+def _open_ring(session_id) -> Optional[_RingReader]:
+    try:
+        d = session_dir(session_id)
+    except ValueError:
+        return None
+    seq_path = d / SEQ_FILENAME
+    if not seq_path.exists():
+        return None
+    try:
+        return _RingReader(d, np.load(seq_path, mmap_mode="r"))
+    except Exception as e:
+        print("[screen_thumbs] 썸네일 링 열기 실패:", e)
+        return None
+
+
+def _read_slot(ring: _RingReader, value) -> Optional[np.ndarray]:
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        return None
+    if n < 0:
+        return None
+    return ring.get(n)
+
+
+def session_thumbs(session_id, filenames: Iterable[str]) -> Dict[str, np.ndarray]:
+    """screen.csv 의 thumb_slot 으로 파일명 → 썸네일 (유효한 것만)."""
+    wanted = set(filenames)
+    rows = read_segment_rows(session_id, "screen")
+    if not wanted or not rows:
+        return {}
+    ring = _open_ring(session_id)
+    if ring is None:
+        return {}
+
+    out = {}
+    for r in rows:
+        name = r.get("filename") or ""
+        if name in wanted:
+            thumb = _read_slot(ring, r.get("thumb_slot"))
+            if thumb is not None:
+                out[name] = thumb
+    return out
+
+
+def _window_labels(session_id: str) -> Tuple[List[str], List[str]]:
+    """세션 window 로그 → (timestamp 목록, 창 제목 라벨 목록) (시간순)."""
+    ts, labels = [], []
+    for r in read_segment_rows(session_id, "window") or []:
+        ts.append(r.get("timestamp") or "")
+        labels.append(label_from_title(r.get("window_title") or ""))
+    return ts, labels
+
+
+def load_thumb_dataset(labels: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    모든 세션의 썸네일을 모아서 (X uint8, y index) 반환. (약한 라벨링)
+    - 라벨은 세션의 task_label (사용자가 고른 작업) — 프레임 하나하나의 정답이 아님
+    - 그래서 캡쳐 시점의 활성 창 제목 라벨(label_from_title)이 task_label 과 같은 프레임만 사용
+      ("study" 세션 중 유튜브/게임 화면, 제목으로 판별 안 되는 "other" 창은 제외)
+    - task_label 이 labels 에 없는 프레임은 제외
+    """
+    label_idx = {l: i for i, l in enumerate(labels)}
+    xs, ys = [], []
+    skipped = 0
+    if not SEGMENTS_DIR.is_dir():
+        return np.zeros((0,) + THUMB_SHAPE, np.uint8), np.zeros((0,), np.int64)
+
+    for entry in sorted(os.scandir(SEGMENTS_DIR), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        ring = _open_ring(entry.name)
+        if ring is None:
+            continue
+        win_ts, win_labels = _window_labels(entry.name)
+        for r in read_segment_rows(entry.name, "screen") or []:
+            task = r.get("task_label") or ""
+            y = label_idx.get(task)
+            if y is None:
+                continue
+            # 캡쳐 시각 직전의 활성 창 라벨
+            i = bisect_right(win_ts, r.get("timestamp") or "") - 1
+            if i < 0 or win_labels[i] != task:
+                skipped += 1
+                continue
+            thumb = _read_slot(ring, r.get("thumb_slot"))
+            if thumb is not None:
+                xs.append(thumb)
+                ys.append(y)
+
+    if skipped:
+        print(f"[screen_thumbs] 창 라벨이 task_label 과 달라 제외한 프레임: {skipped}")
+    if not xs:
+        return np.zeros((0,) + THUMB_SHAPE, np.uint8), np.zeros((0,), np.int64)
+    return np.stack(xs), np.asarray(ys, dtype=np.int64)
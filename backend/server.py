@@ -5,16 +5,21 @@ import smtplib
 import ssl
 import random
 import string
+import time
 from email.message import EmailMessage
 from datetime import datetime, timedelta
 from pathlib import Path
 from auth import create_token
-from flask import Flask, render_template, jsonify, send_from_directory, request
+from flask import Flask, Response, render_template, jsonify, send_from_directory, request, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
 import mysql.connector
 from mysql.connector import pooling
 
 from analyzer import analyze_and_save
+from analysis_jobs import FINISHED as JOB_FINISHED, get_job, submit_job, wait_job
+from session_registry import start_test, stop_test
+from session_catalog import page_limit, query_sessions
+from log_archive import start_background_compactor
 
 app = Flask(__name__)
 
@@ -33,20 +38,13 @@ ANALYZER_SESSION_LOG_DIR = Path(DATA_DIR) / "session_logs"
 ANALYZER_SESSION_LOG_DIR.mkdir(parents=True, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# 전역 로그 CSV 일 단위 rotation + npz 압축 (LOG_ARCHIVE_BACKGROUND=1 일 때만)
+start_background_compactor()
+
 # 퍼지/분석 결과 JSON 저장 경로
-DATA_PATH = os.path.join(DATA_DIR, "result.json")
-
-# 단순 테스트용 세션 상태
-current_test_session = {
-    "is_running": False,
-    "user_id": None,
-    "selected_task": None,
-    "session_id": None,
-    "usage_index": None,
-}
 
-# 유저별 검사 횟수 카운터 (메모리 기반)
-user_run_counts = {}  # { user_id: n_th_test }
+# 검사 세션 상태 / 유저별 검사 횟수 → session_registry (SQLite WAL, worker 간 공유)
+# - 유저마다 진행 중인 검사 1개, 서로 다른 유저는 동시에 검사 가능
 
 # 활동 타입별 분류
 ACTIVE_TASKS = {"game", "sns", "webtoon"}          # 입력이 있어야 하는 쪽
@@ -54,6 +52,9 @@ PASSIVE_TASKS = {"youtube-ent", "youtube-music"}   # 시청/청취 위주
 # 세션 길이 최소 기준 (이보다 짧으면 신뢰도 낮음)
 MIN_SESSION_SEC = 30  # analyzer.py에서 사용하는 기준과 맞추기
 
+# 분석 job SSE 연결 최대 유지 시간(초) — 넘으면 클라이언트가 다시 연결/polling
+SSE_MAX_SEC = int(os.getenv("ANALYSIS_SSE_MAX_SEC", "300"))
+
 # ==============================
 # DB / 이메일 설정
 # ==============================
@@ -299,14 +300,35 @@ def api_ranking_today():
 # 퍼지 결과 API
 # ==============================
 
+def _result_path(session_id):
+    """세션별 결과 파일 session_logs/<sid>_result.json (잘못된 id 면 None)."""
+    sid = str(session_id or "").strip()
+    if not sid or Path(sid).name != sid or sid in (".", ".."):
+        return None
+    return ANALYZER_SESSION_LOG_DIR / f"{sid}_result.json"
+
+
 @app.route("/api/result")
 def get_result():
-    if os.path.exists(DATA_PATH):
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return jsonify(data)
-    else:
-        return jsonify({"error": "No result.json found. Please run a test first."})
+    """
+    퍼지 결과 (세션별).
+    - ?sessionId=<id> : 해당 세션 결과
+    - ?userId=<id>    : 이 유저의 가장 최근 분석 세션 결과 (세션 카탈로그 기준)
+    """
+    session_id = request.args.get("sessionId")
+    user_id = request.args.get("userId")
+    if not session_id and not user_id:
+        return jsonify({"error": "sessionId 또는 userId 가 필요합니다."}), 400
+
+    if not session_id:
+        rows, _ = query_sessions(user_id, limit=1)
+        session_id = rows[0]["session_id"] if rows else None
+
+    path = _result_path(session_id)
+    if path is None or not path.exists():
+        return jsonify({"error": "No result found. Please run a test first."}), 404
+    with path.open("r", encoding="utf-8") as f:
+        return jsonify(json.load(f))
 
 
 # ==============================
@@ -573,10 +595,8 @@ def login():
 def api_test_start():
     """
     검사 시작 신호.
-    - 프론트에서: { userId, task } 전송
+    - 프론트에서: { userId, task } 전송 (+ replace: true 면 이전 검사를 버리고 새로 시작)
     """
-    global current_test_session, user_run_counts
-
     try:
         data = request.get_json() or {}
         user_id = data.get("userId")
@@ -588,25 +608,14 @@ def api_test_start():
         if not selected_task:
             return jsonify({"ok": False, "message": "작업(task)을 선택해주세요."}), 400
 
-        if current_test_session["is_running"]:
-            return jsonify({"ok": False, "message": "이미 검사 중입니다."}), 400
+        # 검사 등록 + n번째 검사 번호 증가 (트랜잭션 하나, 이 유저가 이미 검사 중이면 None)
+        # - replace: true → 종료되지 않은 이전 검사를 버리고 새로 시작 (브라우저를 닫았던 경우)
+        session = start_test(user_id, selected_task, replace=bool(data.get("replace")))
+        if session is None:
+            return jsonify({"ok": False, "running": True, "message": "이미 검사 중입니다."}), 400
 
-        # 사용 횟수 ID (이 유저의 n번째 검사)
-        prev_count = user_run_counts.get(user_id, 0)
-        usage_index = prev_count + 1
-        user_run_counts[user_id] = usage_index
-
-        # session_id 생성 (UTC 시각 + user_id + 랜덤)
-        ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        rand = "".join(random.choices(string.ascii_lowercase + string.digits, k=4))
-        session_id = f"{ts}_{user_id}_{rand}"
-
-        # 세션 상태 저장
-        current_test_session["is_running"] = True
-        current_test_session["user_id"] = user_id
-        current_test_session["selected_task"] = selected_task
-        current_test_session["session_id"] = session_id
-        current_test_session["usage_index"] = usage_index
+        session_id = session["session_id"]
+        usage_index = session["usage_index"]
 
         print("=== [TEST START] ===")
         print("user_id:", user_id)
@@ -622,216 +631,253 @@ def api_test_start():
            # task=selected_task,
        # )
 
-        return jsonify({"ok": True})
+        return jsonify({"ok": True, "sessionId": session_id, "usageIndex": usage_index})
 
     except Exception as e:
+        # start_test 는 트랜잭션이라 실패하면 등록 자체가 rollback 됨
         print("검사 시작 오류:", e)
-        # 혹시 중간까지 세팅되었으면 초기화
-        current_test_session = {
-            "is_running": False,
-            "user_id": None,
-            "selected_task": None,
-            "session_id": None,
-            "usage_index": None,
-        }
-
         return jsonify({"ok": False, "message": "서버 오류가 발생했습니다."}), 500
 
 
+def _run_stop_analysis(session_state: dict) -> dict:
+    """
+    검사 종료 후 분석 job 본체 (analysis_jobs 스레드에서 실행).
+    - analyzer + fuzzy 로직으로 최종 라벨 계산 → DB 저장 → session_logs/<sid>_result.json
+    - 반환: 예전 /api/test/stop 응답과 같은 형태의 dict (job result)
+    """
+    # 3) 분석 실행
+    # ✅ (수정 2) analyzer가 정확한 세션을 찾도록 session_id 등 전달
+    try:
+        analyze_result = analyze_and_save(
+         session_id=session_state["session_id"],
+         user_id=session_state["user_id"],
+         selected_task=session_state["selected_task"],
+         usage_index=session_state["usage_index"],
+        )
+    except Exception as e:
+        print("검사 종료 오류(분석 단계):", e)
+        analyze_result = {}
+
+    try:
+        save_analysis_to_db(analyze_result, session_state)
+    except Exception as e:
+        print("DB 저장 실패:", e)
+
+    # -------------------------
+    # 분석 결과 정리
+    # -------------------------
+
+    # 최종 라벨
+    selected_task = session_state["selected_task"]
+
+    predicted_label = (
+        analyze_result.get("final_label")
+        or analyze_result.get("predicted_label")
+        or selected_task
+    )
+
+    # 활동 분포
+    activity_dist = analyze_result.get("activity_distribution", {}) or {}
+    dist_ratio = activity_dist.get("ratio", {}) or {}
+    dist_percent = activity_dist.get("percent", {}) or {}
+    selected_percent = dist_percent.get(selected_task)
+
+    # 입력/세션 시간 정보
+    window_info = analyze_result.get("window", {}) or {}
+    input_info = analyze_result.get("input", {}) or {}
+    engagement = analyze_result.get("engagement", {}) or {}
+
+    session_dur = float(engagement.get("session_duration_sec") or 0.0)
+    key_count = int(input_info.get("key_count", 0) or 0)
+    mouse_count = int(input_info.get("mouse_count", 0) or 0)
+    total_input = key_count + mouse_count
+
+    input_per_min = (
+        total_input / (session_dur / 60.0)
+        if session_dur > 0 else 0.0
+    )
+
+    # engagement (analyzer 계산값 사용)
+    engagement = analyze_result.get("engagement", {}) or {}
+    idle_percent = engagement.get("idle_percent", 0.0)
+    idle_ratio = engagement.get("idle_ratio", 0.0)
+
+    # -------------------------
+    # 신뢰도 / 경고 계산
+    # -------------------------
+
+    reliability = "high"
+    warnings = []
+
+    # other 비율이 너무 크면 신뢰도↓
+    other_ratio = dist_ratio.get("other", 0.0)
+    if other_ratio > 0.3:
+        reliability = "medium"
+        warnings.append("high_other_ratio")
+
+    # 세션 너무 짧으면↓
+    if session_dur < MIN_SESSION_SEC:
+        reliability = "low"
+        warnings.append("session_too_short")
+
+    is_active_task = selected_task in ACTIVE_TASKS
+    is_passive_task = selected_task in PASSIVE_TASKS
+    is_study = (selected_task == "study")
+
+    # AFK 판단 (idle_ratio 기반)
+    if session_dur >= 60 and selected_percent is not None:
+        if idle_ratio >= 0.5:
+            if selected_percent >= 50.0:
+                if reliability == "high":
+                    reliability = "medium"
+                warnings.append("high_idle_but_high_focus")
+            else:
+                reliability = "low"
+                warnings.append("high_idle_low_focus")
+
+        if is_passive_task:
+            warnings.append("passive_task_focus_uncertain")
+
+    # -------------------------
+    # focus 블록 구성
+    # -------------------------
+    analyze_result["focus"] = {
+        "selected_task": selected_task,
+        "selected_task_percent": selected_percent,
+        "idle_percent_of_session": idle_percent,
+        "reliability": reliability,
+        "warnings": warnings,
+    }
+
+    analyze_result["selected_task"] = selected_task
+    analyze_result["focus_ratio"] = dist_ratio.get(selected_task)
+    analyze_result["focus_percent"] = selected_percent
+
+    # -------------------------
+    # 세션별 result.json 저장 (동시에 여러 유저가 검사해도 서로 덮어쓰지 않음)
+    # -------------------------
+    try:
+        path = _result_path(session_state["session_id"])
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(analyze_result, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except Exception as e:
+        print("[server] result.json 저장 실패:", e)
+
+    return {
+        "ok": True,
+        "predicted": predicted_label,      # 퍼지/분석 최종 라벨
+        "analyzeResult": analyze_result,   # 상세 분석 결과 전체
+        "selectedTask": selected_task,     # 사용자가 고른 라벨
+        "focusPercent": selected_percent,  # 선택 라벨 기준 집중도(%)
+        "idlePercent": idle_percent,       # 전체 시간 중 잠수 비율(%)
+        "inputPerMin": input_per_min,
+        "message": "분석 완료",
+    }
+
+
 @app.route("/api/test/stop", methods=["POST"])
 def api_test_stop():
     """
     검사 종료 신호.
     - 프론트에서: { userId } 전송
-    - 여기서: 로거를 멈추고, analyzer + fuzzy 로직으로 최종 라벨 계산
+    - 여기서: 로거를 멈추고, 분석 job 등록 후 바로 jobId 반환 (202)
+      → 결과는 /api/analysis/<jobId> (polling) 또는 /api/analysis/<jobId>/events (SSE)
     """
-    global current_test_session
-
     try:
         data = request.get_json() or {}
         user_id = data.get("userId")
+        req_session_id = data.get("sessionId")
 
-        if not current_test_session["is_running"]:
-            return jsonify({"ok": False, "message": "진행 중인 검사가 없습니다."}), 400
+        if not user_id and not req_session_id:
+            return jsonify({"ok": False, "message": "로그인 정보가 없습니다."}), 400
 
-        # userId 검증
-        if user_id and current_test_session["user_id"] != user_id:
-            return jsonify({"ok": False, "message": "검사 사용자 정보가 일치하지 않습니다."}), 400
+        # 진행 중 → 종료 로 원자적으로 전환 (두 번 눌러도 한 번만 성공)
+        session_state = stop_test(user_id=user_id or None, session_id=req_session_id)
+        if session_state is None:
+            return jsonify({"ok": False, "message": "진행 중인 검사가 없습니다."}), 400
 
         print("=== [TEST STOP] ===")
-        print("user_id:", current_test_session["user_id"])
-        print("selected_task:", current_test_session["selected_task"])
-        print("session_id:", current_test_session["session_id"])
-        print("usage_index:", current_test_session["usage_index"])
+        print("user_id:", session_state["user_id"])
+        print("selected_task:", session_state["selected_task"])
+        print("session_id:", session_state["session_id"])
+        print("usage_index:", session_state["usage_index"])
 
         # 1) 로거 종료
        # session_meta = stop_session_logging()
       #  print("[server] session_meta from logger:", session_meta)
         session_meta = {} 
 
-        # 2) current_session_id.txt 기록 (analyzer용)
-        session_id = current_test_session["session_id"]
-        current_sid_path = os.path.join(DATA_DIR, "current_session_id.txt")
-        try:
-            with open(current_sid_path, "w", encoding="utf-8") as f:
-                f.write(session_id)
-        except Exception as e:
-            print("[server] current_session_id.txt 기록 실패:", e)
-
-        # 3) 분석 실행
-        # ✅ (수정 2) analyzer가 정확한 세션을 찾도록 session_id 등 전달
-       # 3) 분석 실행
-        try:
-            analyze_result = analyze_and_save(
-             session_id=current_test_session["session_id"],
-             user_id=current_test_session["user_id"],
-             selected_task=current_test_session["selected_task"],
-             usage_index=current_test_session["usage_index"],
-            )
-        except Exception as e:
-            print("검사 종료 오류(분석 단계):", e)
-            analyze_result = {}
-            
-        try:
-            save_analysis_to_db(analyze_result, current_test_session)
-        except Exception as e:
-            print("DB 저장 실패:", e)
-
-        # -------------------------
-        # 분석 결과 정리
-        # -------------------------
-
-        # 최종 라벨
-        selected_task = current_test_session["selected_task"]
-        
-        predicted_label = (
-            analyze_result.get("final_label")
-            or analyze_result.get("predicted_label")
-            or selected_task
-        )
-
-        # 활동 분포
-        activity_dist = analyze_result.get("activity_distribution", {}) or {}
-        dist_ratio = activity_dist.get("ratio", {}) or {}
-        dist_percent = activity_dist.get("percent", {}) or {}
-        selected_percent = dist_percent.get(selected_task)
-
-        # 입력/세션 시간 정보
-        window_info = analyze_result.get("window", {}) or {}
-        input_info = analyze_result.get("input", {}) or {}
-        engagement = analyze_result.get("engagement", {}) or {}
-
-        session_dur = float(engagement.get("session_duration_sec") or 0.0)
-        key_count = int(input_info.get("key_count", 0) or 0)
-        mouse_count = int(input_info.get("mouse_count", 0) or 0)
-        total_input = key_count + mouse_count
-
-        input_per_min = (
-            total_input / (session_dur / 60.0)
-            if session_dur > 0 else 0.0
+        # 2) 분석은 job 으로 (session_id 는 job 에 직접 전달 — 전역 current_session_id.txt 없음)
+        session_id = session_state["session_id"]
+        job_id = submit_job(
+            lambda: _run_stop_analysis(session_state),
+            meta={"session_id": session_id, "user_id": session_state["user_id"]},
         )
 
-        # engagement (analyzer 계산값 사용)
-        engagement = analyze_result.get("engagement", {}) or {}
-        idle_percent = engagement.get("idle_percent", 0.0)
-        idle_ratio = engagement.get("idle_ratio", 0.0)
-
-        # -------------------------
-        # 신뢰도 / 경고 계산
-        # -------------------------
-
-        reliability = "high"
-        warnings = []
-
-        # other 비율이 너무 크면 신뢰도↓
-        other_ratio = dist_ratio.get("other", 0.0)
-        if other_ratio > 0.3:
-            reliability = "medium"
-            warnings.append("high_other_ratio")
-
-        # 세션 너무 짧으면↓
-        if session_dur < MIN_SESSION_SEC:
-            reliability = "low"
-            warnings.append("session_too_short")
-
-        is_active_task = selected_task in ACTIVE_TASKS
-        is_passive_task = selected_task in PASSIVE_TASKS
-        is_study = (selected_task == "study")
-
-        # AFK 판단 (idle_ratio 기반)
-        if session_dur >= 60 and selected_percent is not None:
-            if idle_ratio >= 0.5:
-                if selected_percent >= 50.0:
-                    if reliability == "high":
-                        reliability = "medium"
-                    warnings.append("high_idle_but_high_focus")
-                else:
-                    reliability = "low"
-                    warnings.append("high_idle_low_focus")
-
-            if is_passive_task:
-                warnings.append("passive_task_focus_uncertain")
-
-        # -------------------------
-        # focus 블록 구성
-        # -------------------------
-        analyze_result["focus"] = {
-            "selected_task": selected_task,
-            "selected_task_percent": selected_percent,
-            "idle_percent_of_session": idle_percent,
-            "reliability": reliability,
-            "warnings": warnings,
-        }
-
-        analyze_result["selected_task"] = selected_task
-        analyze_result["focus_ratio"] = dist_ratio.get(selected_task)
-        analyze_result["focus_percent"] = selected_percent
-
-        # -------------------------
-        # result.json 저장
-        # -------------------------
-        try:
-            with open(DATA_PATH, "w", encoding="utf-8") as f:
-                json.dump(analyze_result, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print("[server] result.json 저장 실패:", e)
-
-        # -------------------------
-        # 세션 초기화 + 응답
-        # -------------------------
-        current_test_session = {
-            "is_running": False,
-            "user_id": None,
-            "selected_task": None,
-            "session_id": None,
-            "usage_index": None,
-        }
-
         return jsonify(
             {
                 "ok": True,
-                "predicted": predicted_label,      # 퍼지/분석 최종 라벨
-                "analyzeResult": analyze_result,   # 상세 분석 결과 전체
-                "selectedTask": selected_task,     # 사용자가 고른 라벨
-                "focusPercent": selected_percent,  # 선택 라벨 기준 집중도(%)
-                "idlePercent": idle_percent,       # 전체 시간 중 잠수 비율(%)
-                "inputPerMin": input_per_min,
-                "message": "분석 완료",
+                "jobId": job_id,
+                "status": "queued",
+                "sessionId": session_id,
+                "statusUrl": f"/api/analysis/{job_id}",
+                "eventsUrl": f"/api/analysis/{job_id}/events",
+                "message": "분석 중",
             }
-        )
+        ), 202
 
     except Exception as e:
         print("검사 종료 오류:", e)
+        return jsonify({"ok": False, "message": "서버 오류가 발생했습니다."}), 500
 
-        current_test_session = {
-            "is_running": False,
-            "user_id": None,
-            "selected_task": None,
-            "session_id": None,
-            "usage_index": None,
-        }
 
-        return jsonify({"ok": False, "message": "서버 오류가 발생했습니다."}), 500
+# ==============================
+# 분석 job 상태 API
+# ==============================
+
+@app.route("/api/analysis/<job_id>", methods=["GET"])
+def api_analysis_status(job_id):
+    """분석 job 상태 (queued / running / done / error). done 이면 result 에 예전 stop 응답 형태."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"ok": False, "message": "분석 작업을 찾을 수 없습니다."}), 404
+    return jsonify({"ok": True, **job})
+
+
+@app.route("/api/analysis/<job_id>/events", methods=["GET"])
+def api_analysis_events(job_id):
+    """
+    분석 job 상태 SSE (text/event-stream).
+    - 상태가 바뀔 때마다 event: status, 끝나면 event: done 한 번 보내고 종료
+    - 변화가 없으면 15초마다 keep-alive 주석
+    """
+    if get_job(job_id) is None:
+        return jsonify({"ok": False, "message": "분석 작업을 찾을 수 없습니다."}), 404
+
+    def stream():
+        last_status = None
+        deadline = time.monotonic() + SSE_MAX_SEC
+        while time.monotonic() < deadline:
+            job = wait_job(job_id, last_status, timeout=15.0)
+            if job is None:
+                return
+            if job["status"] == last_status:
+                yield ": keep-alive\n\n"
+                continue
+            last_status = job["status"]
+            event = "done" if job["status"] in JOB_FINISHED else "status"
+            yield f"event: {event}\ndata: {json.dumps(job, ensure_ascii=False, default=str)}\n\n"
+            if event == "done":
+                return
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 def _safe_load_json(p: Path):
     try:
@@ -963,52 +1009,25 @@ def api_mypage_sessions():
         print("[mypage/sessions] DB 조회 실패, 파일 fallback:", e)
 
     # ---------------------------
-    # 2) ✅ 기존 파일 스캔 fallback
+    # 2) ✅ 세션 카탈로그 fallback (분석 파일 전체 스캔 X)
+    #    limit / cursor 를 주면 keyset 페이지네이션 (nextCursor)
     # ---------------------------
+    rows, next_cursor = query_sessions(
+        user_id, date_from=df, date_to=dt,
+        limit=page_limit(request.args.get("limit")),
+        cursor=request.args.get("cursor") or None,
+    )
     sessions = []
-    for p in ANALYZER_SESSION_LOG_DIR.glob("*_analysis.json"):
-        data = _safe_load_json(p)
-        if not data:
-            continue
-
-        if int(data.get("user_id") or -1) != user_id:
-            continue
-
-        sid = data.get("session_id")
-        selected_task = data.get("selected_task")
-        final_label = data.get("final_label") or data.get("predicted")
-        focus_percent = data.get("focus_percent")
-        duration = (data.get("engagement") or {}).get("session_duration_sec")
-
-        session_start = data.get("session_start")
-        ses_date = None
-        if session_start:
-            try:
-                ses_date = datetime.fromisoformat(session_start).date()
-            except Exception:
-                ses_date = None
-        if ses_date is None and isinstance(sid, str) and len(sid) >= 8:
-            try:
-                ses_date = datetime.strptime(sid[:8], "%Y%m%d").date()
-            except Exception:
-                ses_date = None
-
-        if df and ses_date and ses_date < df:
-            continue
-        if dt and ses_date and ses_date > dt:
-            continue
-
+    for r in rows:
         sessions.append({
-            "session_id": sid,
-            "date": ses_date.isoformat() if ses_date else None,
-            "selected_task": selected_task,
-            "final_label": final_label,
-            "focus_percent": focus_percent,
-            "duration_sec": duration,
+            "session_id": r["session_id"],
+            "date": (r["sort_ts"] or "")[:10] or None,
+            "selected_task": r["task"],
+            "final_label": r["label"],
+            "focus_percent": r["focus"],
+            "duration_sec": r["duration_sec"],
         })
-
-    sessions.sort(key=lambda x: x["date"] or "0000-00-00", reverse=True)
-    return jsonify({"ok": True, "sessions": sessions})
+    return jsonify({"ok": True, "sessions": sessions, "nextCursor": next_cursor})
 
 
 @app.route("/api/mypage/session/<session_id>", methods=["GET"])
@@ -1098,38 +1117,23 @@ def api_mypage_study_summary():
     except Exception as e:
         print("[mypage/study-summary] DB 조회 실패, 파일 fallback:", e)
 
-    # 2) 파일 fallback
+    # 2) 세션 카탈로그 fallback (시간순)
     study_sessions = []
     distraction_acc = {}
 
-    for p in ANALYZER_SESSION_LOG_DIR.glob("*_analysis.json"):
-        data = _safe_load_json(p)
-        if not data:
-            continue
-        if int(data.get("user_id") or -1) != user_id:
-            continue
-        if data.get("selected_task") != "study":
-            continue
-
-        sid = data.get("session_id")
-        focus_percent = data.get("focus_percent")
-        session_start = data.get("session_start")
-        sort_key = session_start or sid or ""
-
+    rows, _ = query_sessions(user_id, task="study", order="asc")
+    for r in rows:
         study_sessions.append({
-            "session_id": sid,
-            "session_start": session_start,
-            "focus_percent": focus_percent,
-            "sort_key": sort_key
+            "session_id": r["session_id"],
+            "session_start": r["start"],
+            "focus_percent": r["focus"],
         })
 
-        dist_ratio = ((data.get("activity_distribution") or {}).get("ratio") or {})
-        for label, ratio in dist_ratio.items():
+        # 카탈로그에는 percent 분포 → ratio 로 환산
+        for label, percent in (r["activity"] or {}).items():
             if label in ("study", "other"):
                 continue
-            distraction_acc[label] = distraction_acc.get(label, 0.0) + float(ratio)
-
-    study_sessions.sort(key=lambda x: x["sort_key"])
+            distraction_acc[label] = distraction_acc.get(label, 0.0) + float(percent) / 100.0
 
     focus_trend = [
         {"session_id": s["session_id"], "focus_percent": s["focus_percent"]}
@@ -1162,60 +1166,27 @@ def api_sessions():
         if not user_id:
             return {"ok": False, "message": "user_id가 없습니다."}, 400
 
-        # backend/data/session_logs 안의 *_analysis.json 파일들을 모두 스캔
-        session_dir =  Path(BASE_DIR) / "data" / "session_logs"
-        session_files = list(session_dir.glob("*_analysis.json"))
+        # 세션 카탈로그 (user_id 인덱스, 종료 시각 기준 최신 순)
+        # - limit / cursor 를 주면 keyset 페이지네이션 (nextCursor)
+        rows, next_cursor = query_sessions(
+            user_id,
+            date_from=_parse_date_ymd(from_date) if from_date else None,
+            date_to=_parse_date_ymd(to_date) if to_date else None,
+            limit=page_limit(request.args.get("limit")),
+            cursor=request.args.get("cursor") or None,
+        )
 
         results = []
-
-        for path in session_files:
-            try:
-                with path.open("r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except:
-                continue
-
-            # user_id 매칭
-            if str(data.get("user_id")) != str(user_id):
-                continue
-
-            # 세션 종료 시간
-            session_end = data.get("engagement", {}).get("session_duration_sec")
-            session_id = data.get("session_id")
-
-            # 종료 시간은 logs/session_meta.csv 기반이 아닌 analysis 내부 값 기반으로 계산
-            # analysis.json 안에는 session_start, session_end는 없음 → session_logs/<id>.json 참고
-            raw_path = session_dir / f"{session_id}.json"
-            if raw_path.exists():
-                try:
-                    with raw_path.open("r", encoding="utf-8") as f:
-                        raw_json = json.load(f)
-                    end_ts = raw_json.get("session_end")  # ISO string
-                except:
-                    end_ts = None
-            else:
-                end_ts = None
-
-            # 날짜 필터
-            if from_date and end_ts:
-                if end_ts[:10] < from_date:
-                    continue
-            if to_date and end_ts:
-                if end_ts[:10] > to_date:
-                    continue
-
+        for r in rows:
             results.append({
-                "session_id": session_id,
-                "final_label": data.get("final_label"),
-                "selected_task": data.get("selected_task"),
-                "focus_percent": data.get("focus_percent"),
-                "session_end": end_ts
+                "session_id": r["session_id"],
+                "final_label": r["label"],
+                "selected_task": r["task"],
+                "focus_percent": r["focus"],
+                "session_end": r["end"]
             })
 
-        # 최신 순으로 정렬
-        results.sort(key=lambda x: (x.get("session_end") or ""), reverse=True)
-
-        return {"ok": True, "sessions": results}
+        return {"ok": True, "sessions": results, "nextCursor": next_cursor}
 
     except Exception as e:
         print("[API] /api/sessions 오류:", e)
@@ -1257,7 +1228,7 @@ def _parse_iso_dt(s):
 
 def save_analysis_to_db(analyze_result: dict, session_state: dict):
     """
-    analyze_result(분석 dict) + current_test_session(세션상태 dict) 를
+    analyze_result(분석 dict) + 세션상태 dict(session_registry 행) 를
     sessions 테이블에 그대로 적재.
     실패해도 서버 죽지 않게 예외는 바깥에서 잡는 구조로.
     """
@@ -1353,9 +1324,6 @@ def api_study_summary():
         if not user_id:
             return {"ok": False, "message": "user_id 필요"}, 400
 
-        session_dir = Path(BASE_DIR) / "data" / "session_logs"
-        session_files = list(session_dir.glob("*_analysis.json"))
-
         study_sessions = []
         distract_stats = {
             "game": 0, "sns": 0, "webtoon": 0,
@@ -1365,50 +1333,29 @@ def api_study_summary():
         # 주별 기록
         weekly_focus = {}  # {"2025-W48": [50, 60, 70]}
 
-        for path in session_files:
-            try:
-                with path.open("r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except:
-                continue
-
-            if str(data.get("user_id")) != str(user_id):
-                continue
-
-            if data.get("selected_task") != "study":
-                continue
+        # 세션 카탈로그에서 이 유저의 study 세션만
+        rows, _ = query_sessions(user_id, task="study")
 
-            focus = data.get("focus_percent")
+        for r in rows:
+            focus = r["focus"]
             if focus is None:
                 continue
 
-            session_id = data.get("session_id")
-            raw_path = session_dir / f"{session_id}.json"
-
-            if not raw_path.exists():
-                continue
-
-            try:
-                with raw_path.open("r", encoding="utf-8") as f:
-                    raw_json = json.load(f)
-                end_ts = raw_json.get("session_end")
-            except:
-                continue
-
+            end_ts = r["end"]
             if not end_ts:
                 continue
 
             # ===== Study 세션 저장 =====
             study_sessions.append({
-                "session_id": session_id,
+                "session_id": r["session_id"],
                 "focus_percent": focus,
-                "final_label": data.get("final_label"),
-                "activity": data.get("activity_distribution", {}).get("percent", {}),
+                "final_label": r["label"],
+                "activity": r["activity"],
                 "session_end": end_ts
             })
 
             # ===== 방해 활동 계산(Other 제외 2등 라벨) =====
-            dist = data.get("activity_distribution", {}).get("percent", {})
+            dist = r["activity"] or {}
             dist_sorted = sorted(
                 [(k, v) for k, v in dist.items() if k != "other" and k != "study"],
                 key=lambda x: x[1],
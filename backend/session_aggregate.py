@@ -0,0 +1,193 @@
+# session_aggregate.py
+"""
+검사 진행 중에 로거들이 직접 갱신하는 세션 집계값.
+
+- 키/마우스 카운트, 창 라벨 시퀀스/히스토그램, 최소/최대 timestamp, 프로세스/스크린 수,
+  마우스 이동 합계(mouse_motion 버킷)
+- /api/test/stop 시점에는 raw 로그를 다시 훑지 않고 이 집계값만 읽음
+  → analyzer는 CNN + 퍼지 단계만 수행 (stop 지연이 세션 길이에 비례하지 않음)
+- 세션 종료 시 data/sessions/<sid>/aggregate.json 으로 저장 (다른 프로세스의 analyzer도 사용)
+"""
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from mouse_motion import add_buckets, empty_motion_totals
+from session_segments import session_dir
+from title_labels import label_from_title
+
+AGGREGATE_FILENAME = "aggregate.json"
+
+KEY_EVENTS = ("key_press",)
+MOUSE_EVENTS = ("mouse_down", "mouse_up", "mouse_scroll")
+
+
+def is_ignored_title(title: str) -> bool:
+    """analyzer와 동일한 기준: 빈 제목 / 작업 전환 / 검사 페이지 자체는 제외."""
+    title = (title or "").strip()
+    if title == "":
+        return True
+    tl = title.lower()
+    if "작업 전환" in title or "task switching" in tl:
+        return True
+    if "monitor sketcher" in tl:
+        return True
+    return False
+
+
+class SessionAggregator:
+    """로거 스레드 여러 개가 동시에 호출하므로 내부 lock으로 보호."""
+
+    def __init__(self, session_id: str):
+        self.session_id = str(session_id)
+        self._lock = threading.Lock()
+
+        self.key_count = 0
+        self.mouse_count = 0
+        self.window_titles = []
+        self.window_labels = []
+        self.label_hist: Dict[str, int] = {}
+        self.process_rows = 0
+        self.screen_count = 0
+        self.motion = empty_motion_totals()
+        self.ts_min: Optional[str] = None
+        self.ts_max: Optional[str] = None
+
+    # ISO 문자열(datetime.isoformat) 끼리는 사전순 비교 = 시간순 비교
+    def _touch(self, ts: Optional[str]):
+        if not ts:
+            return
+        if self.ts_min is None or ts < self.ts_min:
+            self.ts_min = ts
+        if self.ts_max is None or ts > self.ts_max:
+            self.ts_max = ts
+
+    def on_input(self, ts: str, event_type: str):
+        with self._lock:
+            et = (event_type or "").lower()
+            if et in KEY_EVENTS:
+                self.key_count += 1
+            elif et in MOUSE_EVENTS:
+                self.mouse_count += 1
+            self._touch(ts)
+
+    def on_input_batch(self, key_count: int, mouse_count: int, ts_first: Optional[str], ts_last: Optional[str]):
+        """input_logger writer 스레드: 배치 단위로 카운트만 더함."""
+        with self._lock:
+            self.key_count += int(key_count)
+            self.mouse_count += int(mouse_count)
+            self._touch(ts_first)
+            self._touch(ts_last)
+
+    def on_motion(self, buckets):
+        """mouse_motion 1초 버킷들 누적 (input_logger writer 스레드)."""
+        with self._lock:
+            add_buckets(self.motion, buckets)
+
+    def on_window(self, ts: str, title: str):
+        with self._lock:
+            self._touch(ts)
+            if is_ignored_title(title):
+                return
+            title = (title or "").strip()
+            label = label_from_title(title)
+            self.window_titles.append(title)
+            self.window_labels.append(label)
+            self.label_hist[label] = self.label_hist.get(label, 0) + 1
+
+    def on_process(self, ts: str, n_rows: int):
+        with self._lock:
+            self.process_rows += int(n_rows or 0)
+            self._touch(ts)
+
+    def on_screen(self, ts: str):
+        with self._lock:
+            self.screen_count += 1
+            self._touch(ts)
+
+    def snapshot(self, finalized: bool = False) -> Dict:
+        with self._lock:
+            return {
+                "session_id": self.session_id,
+                "finalized": finalized,
+                "key_count": self.key_count,
+                "mouse_count": self.mouse_count,
+                "window_titles": list(self.window_titles),
+                "window_labels": list(self.window_labels),
+                "label_hist": dict(self.label_hist),
+                "process_count": self.process_rows,
+                "screen_count": self.screen_count,
+                "motion": dict(self.motion),
+                "session_start": self.ts_min,
+                "session_end": self.ts_max,
+            }
+
+    def save(self, finalized: bool = False):
+        d = session_dir(self.session_id, create=True)
+        path = d / AGGREGATE_FILENAME
+        tmp = d / (AGGREGATE_FILENAME + ".tmp")
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump(self.snapshot(finalized=finalized), f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception as e:
+            print("[session_aggregate] 저장 실패:", e)
+
+
+# =======================================================
+# 세션별 집계기 레지스트리
+# =======================================================
+_registry: Dict[str, SessionAggregator] = {}
+_registry_lock = threading.Lock()
+
+
+def get_aggregator(session_id: str) -> SessionAggregator:
+    """세션 집계기 반환 (없으면 생성). 로거들은 session_id만 알면 됨."""
+    sid = str(session_id)
+    with _registry_lock:
+        agg = _registry.get(sid)
+        if agg is None:
+            agg = SessionAggregator(sid)
+            _registry[sid] = agg
+        return agg
+
+
+def close_aggregator(session_id: str) -> Optional[Dict]:
+    """세션 종료: 최종 집계값을 파일로 저장하고 레지스트리에서 제거."""
+    with _registry_lock:
+        agg = _registry.pop(str(session_id), None)
+    if agg is None:
+        return None
+    agg.save(finalized=True)
+    return agg.snapshot(finalized=True)
+
+
+def drop_aggregator(session_id: str) -> bool:
+    """
+    finalized 저장 없이 레지스트리에서만 제거 (종료 마감을 넘긴 로거가 있던 세션).
+    → 파일은 중간 저장본이므로 analyzer 가 raw 로그로 재구성
+    """
+    with _registry_lock:
+        return _registry.pop(str(session_id), None) is not None
+
+
+def load_aggregate(session_id: str) -> Optional[Dict]:
+    """
+    종료(finalized)된 세션 집계값 로드.
+    - 파일이 없거나 중간 저장본이면 None → analyzer가 raw 로그로 재구성
+    """
+    try:
+        path = session_dir(session_id) / AGGREGATE_FILENAME
+    except ValueError:
+        return None
+    if not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if not data.get("finalized"):
+        return None
+    return data
@@ -0,0 +1,248 @@
+# session_catalog.py
+"""
+세션 분석 결과 카탈로그 (data/session_catalog.sqlite3, local_db WAL)
+
+/api/sessions, /api/study/summary, 마이페이지 fallback 이
+session_logs/*_analysis.json 전부 json.load + 세션마다 <id>.json 을 다시 열던 구조 →
+analyze_and_save 가 분석 끝날 때 한 줄(upsert) 기록, 조회는 user_id 인덱스로.
+
+- 컬럼: user_id, session_id, task, label, focus, start, end (+ duration_sec, activity 분포 JSON)
+- sort_ts = end → start → session_id 앞 14자리(UTC 시각) 순으로 있는 값
+    (user_id, sort_ts, session_id) 인덱스 → 날짜 범위 + keyset 페이지네이션
+- 카탈로그가 비어 있으면 처음 조회할 때 기존 *_analysis.json 으로 한 번 backfill
+"""
+import argparse
+import base64
+import json
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from local_db import execute, get_conn, register_schema
+from session_segments import DATA_DIR
+
+CATALOG_DB = DATA_DIR / "session_catalog.sqlite3"
+SESSION_LOG_DIR = DATA_DIR / "session_logs"
+
+MAX_PAGE_SIZE = 200   # limit 최대값 (페이지 하나)
+
+register_schema(CATALOG_DB, """
+CREATE TABLE IF NOT EXISTS session_catalog (
+    session_id    TEXT PRIMARY KEY,
+    user_id       TEXT NOT NULL,
+    task          TEXT,
+    label         TEXT,
+    focus         REAL,
+    start         TEXT,
+    end           TEXT,
+    sort_ts       TEXT NOT NULL,
+    duration_sec  REAL,
+    activity_json TEXT,
+    updated_at    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_session_catalog_user
+    ON session_catalog(user_id, sort_ts, session_id);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+""")
+
+_backfill_checked = False
+
+
+def _sort_ts(session_id: str, start: Optional[str], end: Optional[str]) -> str:
+    if end or start:
+        return end or start
+    try:
+        return datetime.strptime(str(session_id)[:14], "%Y%m%d%H%M%S").isoformat()
+    except ValueError:
+        return ""
+
+
+def _entry_from_result(result: Dict, session_end: Optional[str] = None) -> Optional[Dict]:
+    sid = result.get("session_id")
+    if not sid or result.get("user_id") is None:
+        return None
+    start = result.get("session_start")
+    end = session_end or result.get("session_end")
+    activity = (result.get("activity_distribution") or {}).get("percent") or {}
+    focus = result.get("focus_percent")
+    return {
+        "session_id": str(sid),
+        "user_id": str(result.get("user_id")).strip(),
+        "task": result.get("selected_task"),
+        "label": result.get("final_label") or result.get("predicted"),
+        "focus": float(focus) if focus is not None else None,
+        "start": start,
+        "end": end,
+        "sort_ts": _sort_ts(sid, start, end),
+        "duration_sec": (result.get("engagement") or {}).get("session_duration_sec"),
+        "activity_json": json.dumps(activity, ensure_ascii=False),
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+_UPSERT = """
+INSERT INTO session_catalog
+    (session_id, user_id, task, label, focus, start, end, sort_ts, duration_sec, activity_json, updated_at)
+VALUES
+    (:session_id, :user_id, :task, :label, :focus, :start, :end, :sort_ts, :duration_sec, :activity_json, :updated_at)
+ON CONFLICT(session_id) DO UPDATE SET
+    user_id = excluded.user_id, task = excluded.task, label = excluded.label, focus = excluded.focus,
+    start = excluded.start, end = excluded.end, sort_ts = excluded.sort_ts,
+    duration_sec = excluded.duration_sec, activity_json = excluded.activity_json, updated_at = excluded.updated_at
+"""
+
+
+def record_session(result: Dict) -> bool:
+    """analyze_and_save 결과 1건 기록 (같은 session_id 면 갱신)."""
+    entry = _entry_from_result(result)
+    if entry is None:
+        return False
+    with get_conn(CATALOG_DB, immediate=True) as conn:
+        conn.execute(_UPSERT, entry)
+    return True
+
+
+# =======================================================
+# backfill (기존 *_analysis.json → 카탈로그)
+# =======================================================
+def _load_json(p: Path) -> Optional[Dict]:
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def backfill(log_dir: Path = SESSION_LOG_DIR) -> int:
+    """session_logs 의 분석 파일 전부 카탈로그에 기록. 반환: 기록한 세션 수."""
+    entries = []
+    for p in sorted(Path(log_dir).glob("*_analysis.json")):
+        data = _load_json(p)
+        if not data:
+            continue
+        raw = _load_json(p.with_name(f"{data.get('session_id')}.json")) or {}
+        entry = _entry_from_result(data, session_end=raw.get("session_end"))
+        if entry is not None:
+            entries.append(entry)
+    with get_conn(CATALOG_DB, immediate=True) as conn:
+        conn.executemany(_UPSERT, entries)
+        conn.execute(
+            "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('backfilled_at', ?)",
+            (datetime.utcnow().isoformat(),),
+        )
+    return len(entries)
+
+
+def _ensure_backfilled():
+    global _backfill_checked
+    if _backfill_checked:
+        return
+    row = execute(CATALOG_DB, "SELECT value FROM catalog_meta WHERE key = 'backfilled_at'", fetchone=True)
+    if row is None:
+        n = backfill()
+        print(f"[session_catalog] 기존 분석 파일 {n}개 backfill")
+    _backfill_checked = True
+
+
+# =======================================================
+# 조회
+# =======================================================
+def encode_cursor(row: Dict) -> str:
+    raw = json.dumps([row["sort_ts"], row["session_id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, str]]:
+    try:
+        sort_ts, sid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(sort_ts), str(sid)
+    except Exception:
+        return None
+
+
+def page_limit(limit) -> Optional[int]:
+    """요청 limit → 1..MAX_PAGE_SIZE. 없거나 0 이하면 None (제한 없음)."""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return None
+    if limit <= 0:
+        return None
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def query_sessions(
+    user_id,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    task: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order: str = "desc",
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    유저 세션 목록 (sort_ts 기준, 기본 최신순).
+    - date_from / date_to: 날짜(포함) 범위
+    - limit + cursor: keyset 페이지네이션 → (rows, next_cursor). 마지막 페이지면 next_cursor=None
+      limit 은 page_limit() 으로 정리 (0 이하 = 제한 없음, 최대 MAX_PAGE_SIZE)
+    - row 의 activity 는 dict (percent 분포)
+    """
+    _ensure_backfilled()
+    limit = page_limit(limit)
+    desc = order != "asc"
+    where, params = ["user_id = ?"], [str(user_id).strip()]
+    if date_from:
+        where.append("sort_ts >= ?")
+        params.append(date_from.isoformat())
+    if date_to:
+        where.append("sort_ts < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+    if task:
+        where.append("task = ?")
+        params.append(task)
+    if cursor:
+        key = decode_cursor(cursor)
+        if key is not None:
+            where.append("(sort_ts, session_id) < (?, ?)" if desc else "(sort_ts, session_id) > (?, ?)")
+            params.extend(key)
+
+    direction = "DESC" if desc else "ASC"
+    sql = (
+        f"SELECT * FROM session_catalog WHERE {' AND '.join(where)} "
+        f"ORDER BY sort_ts {direction}, session_id {direction}"
+    )
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit) + 1)   # 다음 페이지 유무 확인용 1개 더
+
+    rows = execute(CATALOG_DB, sql, params, fetchall=True) or []
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    for r in rows:
+        try:
+            r["activity"] = json.loads(r.pop("activity_json") or "{}")
+        except ValueError:
+            r["activity"] = {}
+    return rows, next_cursor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="세션 분석 카탈로그")
+    parser.add_argument("--backfill", action="store_true", help="session_logs/*_analysis.json 전부 다시 기록")
+    parser.add_argument("--user", help="이 유저의 세션 목록 출력")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.backfill:
+        print(f"[session_catalog] {backfill()}개 기록")
+    if args.user:
+        rows, nxt = query_sessions(args.user, limit=args.limit)
+        for r in rows:
+            print(f"  {r['session_id']} {r['task']} → {r['label']} focus={r['focus']} end={r['end']}")
+        if nxt:
+            print("  next cursor:", nxt)
@@ -1,15 +1,41 @@
+import os
 import threading
-from typing import Optional, Dict
+import time
+from typing import Callable, Optional, Dict
 
 from input_logger import start_input_logging
 from window_logger import start_window_logging
 from process_logger import start_process_logging
 from screen_capture import start_screen_capture
+from session_aggregate import get_aggregator, close_aggregator, drop_aggregator
+from capture_scheduler import get_scheduler, close_scheduler
+from session_writer import get_session_writer, close_session_writer
+from session_stop import SessionStop
+
+# ✅ 종료 마감 시간(초): 이 안에 로거 정리 + 세션 파일 fsync 까지 끝냄
+STOP_TIMEOUT = float(os.getenv("SESSION_STOP_TIMEOUT", "10"))
+# 그중 마지막 group commit + fsync 용으로 남겨두는 시간
+WRITER_RESERVE = float(os.getenv("SESSION_WRITER_RESERVE", "1.0"))
 
 _session_threads = []
-_stop_event: Optional[threading.Event] = None
+_stop_event: Optional[SessionStop] = None
 _session_meta: Optional[Dict] = None
 
+# 스레드 이름 → 종료(return) 시각 (time.monotonic)
+_finished_at: Dict[str, float] = {}
+_last_shutdown: Optional[Dict] = None
+
+
+def _logger_thread(name: str, target: Callable, args: tuple) -> threading.Thread:
+    """로거 스레드 생성. 끝난 시각을 기록해 두었다가 종료 리포트에 drain 시간으로 사용."""
+    def run():
+        try:
+            target(*args)
+        finally:
+            _finished_at[name] = time.monotonic()
+
+    return threading.Thread(target=run, name=name, daemon=True)
+
 
 def start_session_logging(user_id: int, session_id: str, usage_index: int, task: str):
     """
@@ -25,7 +51,8 @@ def start_session_logging(user_id: int, session_id: str, usage_index: int, task:
     if _stop_event is not None:
         stop_session_logging()
 
-    _stop_event = threading.Event()
+    _stop_event = SessionStop()
+    _finished_at.clear()
     _session_meta = {
         "user_id": user_id,
         "session_id": session_id,
@@ -35,30 +62,18 @@ def start_session_logging(user_id: int, session_id: str, usage_index: int, task:
 
     print(f"[SessionLogger] 세션 시작: {_session_meta}")
 
+    # 세션 집계기 (로거들이 실시간으로 카운트/라벨/시간 범위 갱신)
+    get_aggregator(session_id)
+    # 캡쳐 스케줄러 (window/input 로거 신호 → screen_capture 간격 조절)
+    get_scheduler(session_id)
+    # 세션 writer (4개 로거의 기록을 한 파일에 group commit)
+    get_session_writer(session_id)
+
     # 각 로거 스레드 생성
-    t1 = threading.Thread(
-        target=start_input_logging,
-        args=(_session_meta, _stop_event),   # ✅ session_meta dict 넘김
-        daemon=True,
-    )
-
-    t2 = threading.Thread(
-        target=start_window_logging,
-        args=(_session_meta, _stop_event),   # ✅
-        daemon=True,
-    )
-
-    t3 = threading.Thread(
-        target=start_process_logging,
-        args=(session_id, _stop_event),      # ✅ process_logger는 session_id만 필요
-        daemon=True,
-    )
-
-    t4 = threading.Thread(
-        target=start_screen_capture,
-        args=(_session_meta, _stop_event),   # ✅
-        daemon=True,
-    )
+    t1 = _logger_thread("input", start_input_logging, (_session_meta, _stop_event))      # ✅ session_meta dict 넘김
+    t2 = _logger_thread("window", start_window_logging, (_session_meta, _stop_event))    # ✅
+    t3 = _logger_thread("process", start_process_logging, (session_id, _stop_event))     # ✅ process_logger는 session_id만 필요
+    t4 = _logger_thread("screen", start_screen_capture, (_session_meta, _stop_event))    # ✅
 
     _session_threads = [t1, t2, t3, t4]
 
@@ -68,25 +83,80 @@ def start_session_logging(user_id: int, session_id: str, usage_index: int, task:
     print(f"[SessionLogger] 스레드 {len(_session_threads)}개 시작 완료.")
 
 
-def stop_session_logging():
-    """세션 종료"""
-    global _stop_event, _session_threads, _session_meta
+def last_shutdown_report() -> Optional[Dict]:
+    """마지막 stop_session_logging() 의 종료 리포트."""
+    return _last_shutdown
+
+
+def _reap_aggregator(session_id: str, threads):
+    def reap():
+        for t in threads:
+            t.join()
+        drop_aggregator(session_id)
+        print(f"[SessionLogger] 늦게 끝난 스레드 정리 완료: {session_id}")
+
+    threading.Thread(target=reap, name=f"session-reaper-{session_id}", daemon=True).start()
+
+
+def stop_session_logging(timeout: Optional[float] = None):
+    """
+    세션 종료 (마감 시간 timeout 초, 기본 SESSION_STOP_TIMEOUT).
+    1) 로거 중지 신호 + 마감 시각 → 각 로거는 남은 시간 안에 큐 비우기 (입력 큐, 인코딩 큐)
+    2) 마감 시각까지만 스레드 join (넘기면 daemon 스레드로 남기고 리포트에 timeout 표시)
+    3) 세션 writer: 남은 레코드 기록 + fsync 후 닫기
+    4) 스레드별 drain 시간 리포트
+    """
+    global _stop_event, _session_threads, _session_meta, _last_shutdown
 
     if _stop_event is None:
         print("[SessionLogger] 종료 요청 무시: 시작된 세션 없음")
         return None
 
-    print("[SessionLogger] 세션 종료 중…")
-    _stop_event.set()
+    timeout = STOP_TIMEOUT if timeout is None else timeout
+    reserve = min(WRITER_RESERVE, timeout / 2)
+    t0 = time.monotonic()
+    deadline = t0 + timeout
 
+    print(f"[SessionLogger] 세션 종료 중… (마감 {timeout:.1f}s)")
+    _stop_event.request_stop(timeout - reserve)
+    if _session_meta:
+        close_scheduler(_session_meta["session_id"])   # 다음 캡쳐를 기다리는 screen_capture 깨움
+
+    threads = {}
     for t in _session_threads:
+        t.join(max(_stop_event.deadline - time.monotonic(), 0.0))
         if t.is_alive():
-            t.join()
-
-    print("[SessionLogger] 스레드 종료 완료.")
+            threads[t.name] = {"drain_ms": None, "timed_out": True}
+        else:
+            done = _finished_at.get(t.name, time.monotonic())
+            threads[t.name] = {"drain_ms": round(max(done - t0, 0.0) * 1000.0, 1), "timed_out": False}
 
     ended_meta = dict(_session_meta) if _session_meta else None
 
+    late_threads = [t for t in _session_threads if t.is_alive()]
+
+    writer_stats = None
+    if ended_meta:
+        # 남은 레코드 기록 + fsync 후 세션 파일 닫기
+        writer_stats = close_session_writer(ended_meta["session_id"], timeout=max(deadline - time.monotonic(), 0.0))
+        if not late_threads:
+            # 최종 집계값 저장 → analyzer는 stop 시점에 raw 로그 재집계 없이 사용
+            close_aggregator(ended_meta["session_id"])
+        else:
+            # 아직 집계기에 쓰고 있는 스레드가 있음 → finalized 저장 X (analyzer 는 raw 로그로 재구성)
+            #   스레드가 끝나면 레지스트리에서만 제거
+            _reap_aggregator(ended_meta["session_id"], late_threads)
+
+    _last_shutdown = {
+        "total_ms": round((time.monotonic() - t0) * 1000.0, 1),
+        "threads": threads,
+        "writer": writer_stats,
+    }
+    late = [name for name, r in threads.items() if r["timed_out"]]
+    if late:
+        print(f"[SessionLogger] ⚠️ 마감 시간 초과 스레드: {late}")
+    print("[SessionLogger] 종료 리포트:", _last_shutdown)
+
     _stop_event = None
     _session_threads = []
     _session_meta = None
@@ -0,0 +1,171 @@
+# session_registry.py
+"""
+검사 세션 레지스트리 (server.py 의 전역 current_test_session / user_run_counts 대체).
+
+- data/server_state.sqlite3 (local_db, WAL) → gunicorn worker 여러 개가 같은 상태를 공유
+- 유저별로 진행 중인 검사 1개 (UNIQUE 부분 인덱스) → 서로 다른 유저는 동시에 몇백 개든 가능
+- start / stop 은 BEGIN IMMEDIATE 트랜잭션 하나 → 같은 유저가 동시에 눌러도 한 번만 성공
+- user_run_counts 도 같은 DB 에 저장 (서버 재시작해도 n번째 검사 번호 유지)
+- 브라우저 종료 / 서버 재시작으로 stop 이 안 온 running 행은 영구히 남지 않음:
+    TEST_MAX_SEC 보다 오래된 running 행, 또는 replace=True 로 다시 시작하면
+    같은 트랜잭션 안에서 abandoned 로 닫고 새 검사 등록
+"""
+import os
+import random
+import string
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from local_db import execute, get_conn, register_schema
+from session_segments import DATA_DIR
+
+REGISTRY_DB = DATA_DIR / "server_state.sqlite3"
+
+STATUS_RUNNING = "running"
+STATUS_STOPPED = "stopped"
+STATUS_ABANDONED = "abandoned"   # stop 없이 버려진 검사 (시간 초과 / 같은 유저가 새로 시작)
+
+# 검사 최대 길이(초) — 이보다 오래된 running 행은 다음 start 때 자동으로 닫음
+TEST_MAX_SEC = float(os.getenv("TEST_MAX_DURATION_SEC", str(2 * 60 * 60)))
+
+register_schema(REGISTRY_DB, """
+CREATE TABLE IF NOT EXISTS test_sessions (
+    session_id    TEXT PRIMARY KEY,
+    user_id       TEXT NOT NULL,
+    selected_task TEXT NOT NULL,
+    usage_index   INTEGER NOT NULL,
+    status        TEXT NOT NULL,
+    started_at    TEXT NOT NULL,
+    stopped_at    TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_test_sessions_running
+    ON test_sessions(user_id) WHERE status = 'running';
+CREATE TABLE IF NOT EXISTS user_run_counts (
+    user_id TEXT PRIMARY KEY,
+    count   INTEGER NOT NULL
+);
+""")
+
+
+def _user_key(user_id) -> str:
+    return str(user_id).strip()
+
+
+def _new_session_id(user_id) -> str:
+    """session_id 생성 (UTC 시각 + user_id + 랜덤)"""
+    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    rand = "".join(random.choices(string.ascii_lowercase + string.digits, k=4))
+    return f"{ts}_{user_id}_{rand}"
+
+
+def start_test(user_id, selected_task: str, replace: bool = False) -> Optional[Dict]:
+    """
+    검사 시작. 이 유저가 이미 검사 중이면 None.
+    - 진행 중인 검사가 TEST_MAX_SEC 보다 오래됐거나 replace=True 면 그 검사를 abandoned 로 닫고 새로 시작
+    반환: {session_id, user_id, selected_task, usage_index, status, started_at, stopped_at}
+    """
+    user = _user_key(user_id)
+    now = datetime.utcnow()
+    with get_conn(REGISTRY_DB, immediate=True) as conn:
+        running = conn.execute(
+            "SELECT session_id, started_at FROM test_sessions WHERE user_id = ? AND status = ?",
+            (user, STATUS_RUNNING),
+        ).fetchone()
+        if running is not None:
+            try:
+                stale = now - datetime.fromisoformat(running["started_at"]) > timedelta(seconds=TEST_MAX_SEC)
+            except (TypeError, ValueError):
+                stale = True
+            if not (stale or replace):
+                return None
+            conn.execute(
+                "UPDATE test_sessions SET status = ?, stopped_at = ? WHERE session_id = ?",
+                (STATUS_ABANDONED, now.isoformat(), running["session_id"]),
+            )
+            print(f"[session_registry] {running['session_id']} abandoned ({'timeout' if stale else 'replaced'})")
+
+        # 사용 횟수 ID (이 유저의 n번째 검사)
+        row = conn.execute(
+            """
+            INSERT INTO user_run_counts (user_id, count) VALUES (?, 1)
+            ON CONFLICT(user_id) DO UPDATE SET count = count + 1
+            RETURNING count
+            """,
+            (user,),
+        ).fetchone()
+
+        session = {
+            "session_id": _new_session_id(user),
+            "user_id": user,
+            "selected_task": selected_task,
+            "usage_index": int(row["count"]),
+            "status": STATUS_RUNNING,
+            "started_at": now.isoformat(),
+            "stopped_at": None,
+        }
+        conn.execute(
+            """
+            INSERT INTO test_sessions (session_id, user_id, selected_task, usage_index, status, started_at)
+            VALUES (:session_id, :user_id, :selected_task, :usage_index, :status, :started_at)
+            """,
+            session,
+        )
+    return session
+
+
+def stop_test(user_id=None, session_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    진행 중인 검사 종료 (user_id 또는 session_id 로 지정, 둘 다 주면 둘 다 맞아야 함).
+    진행 중인 검사가 없으면 None.
+    """
+    if user_id is None and not session_id:
+        return None
+    where, params = ["status = ?"], [STATUS_RUNNING]
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(_user_key(user_id))
+    if session_id:
+        where.append("session_id = ?")
+        params.append(str(session_id))
+
+    with get_conn(REGISTRY_DB, immediate=True) as conn:
+        session = conn.execute(
+            f"SELECT * FROM test_sessions WHERE {' AND '.join(where)} LIMIT 1", params
+        ).fetchone()
+        if session is None:
+            return None
+        session["status"] = STATUS_STOPPED
+        session["stopped_at"] = datetime.utcnow().isoformat()
+        conn.execute(
+            "UPDATE test_sessions SET status = ?, stopped_at = ? WHERE session_id = ?",
+            (STATUS_STOPPED, session["stopped_at"], session["session_id"]),
+        )
+    return session
+
+
+def get_running(user_id) -> Optional[Dict]:
+    return execute(
+        REGISTRY_DB,
+        "SELECT * FROM test_sessions WHERE user_id = ? AND status = ?",
+        (_user_key(user_id), STATUS_RUNNING),
+        fetchone=True,
+    )
+
+
+def list_running(limit: int = 1000) -> List[Dict]:
+    return execute(
+        REGISTRY_DB,
+        "SELECT * FROM test_sessions WHERE status = ? ORDER BY started_at LIMIT ?",
+        (STATUS_RUNNING, limit),
+        fetchall=True,
+    )
+
+
+def user_run_count(user_id) -> int:
+    row = execute(
+        REGISTRY_DB,
+        "SELECT count FROM user_run_counts WHERE user_id = ?",
+        (_user_key(user_id),),
+        fetchone=True,
+    )
+    return int(row["count"]) if row else 0
@@ -0,0 +1,87 @@
+# session_segments.py
+import csv
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ✅ backend/data/sessions/<session_id>/<kind>.csv
+# - 전역 *_log.csv 에 계속 append 하던 구조 대신, 세션별 세그먼트 파일에 기록
+# - analyzer는 해당 세션 폴더의 파일만 열면 됨 (전체 히스토리 스캔 X)
+DATA_DIR = (BASE_DIR / "data").resolve()
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+SEGMENTS_DIR = DATA_DIR / "sessions"
+SEGMENTS_DIR.mkdir(parents=True, exist_ok=True)
+
+SEGMENT_KINDS = ("window", "input", "process", "screen")
+
+# ✅ 세션 writer(session_writer) 가 모든 종류를 한 파일에 프레임 단위로 기록
+MUX_FILENAME = "session.seg"
+
+
+def _check_session_id(session_id) -> str:
+    """세션 id를 폴더명으로 쓰기 전에 경로 탈출(../, /)을 막는다."""
+    sid = str(session_id or "").strip()
+    if not sid or sid in (".", "..") or "/" in sid or "\\" in sid:
+        raise ValueError(f"[session_segments] 잘못된 session_id: {session_id!r}")
+    return sid
+
+
+def session_dir(session_id, create: bool = False) -> Path:
+    d = SEGMENTS_DIR / _check_session_id(session_id)
+    if create:
+        d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def segment_path(session_id, kind: str) -> Path:
+    return session_dir(session_id) / f"{kind}.csv"
+
+
+def mux_path(session_id) -> Path:
+    return session_dir(session_id) / MUX_FILENAME
+
+
+def has_segments(session_id) -> bool:
+    try:
+        d = session_dir(session_id)
+    except ValueError:
+        return False
+    return (d / MUX_FILENAME).exists() or any((d / f"{k}.csv").exists() for k in SEGMENT_KINDS)
+
+
+def open_segment(session_id, kind: str, header: List[str]) -> Tuple[object, "csv._writer"]:
+    """
+    세션 세그먼트 파일을 append 모드로 연다.
+    - 파일이 없거나 비어있으면 헤더부터 기록
+    - 반환: (file, csv.writer)  ※ 호출한 쪽에서 close 책임
+    """
+    session_dir(session_id, create=True)
+    path = segment_path(session_id, kind)
+
+    f = path.open("a", newline="", encoding="utf-8")
+    writer = csv.writer(f)
+    if f.tell() == 0:
+        writer.writerow(header)
+        f.flush()
+    return f, writer
+
+
+def read_segment_rows(session_id, kind: str) -> Optional[List[Dict[str, str]]]:
+    """
+    세그먼트 파일을 읽어서 list[dict] 반환.
+    - <kind>.csv 가 없으면 session.seg (session_writer) 에서 읽음 → 이 세션의 그 kind 행 (없으면 [])
+    - 세그먼트가 아예 없으면 None (→ analyzer가 전역 CSV fallback 하도록)
+    """
+    try:
+        path = segment_path(session_id, kind)
+    except ValueError:
+        return None
+    if not path.exists():
+        from session_writer import read_session_file   # 순환 import 방지
+
+        sf = read_session_file(session_id)
+        return sf.rows(kind) if sf is not None else None
+    with path.open("r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
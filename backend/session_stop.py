@@ -0,0 +1,34 @@
+# session_stop.py
+"""
+세션 종료 신호 + 마감 시각(deadline).
+
+- session_logger 가 stop_event 로 넘기는 threading.Event 확장
+- request_stop(timeout): 마감 시각을 정하고 set() → 각 로거는 stop_remaining() 만큼만 정리(drain)에 씀
+- 일반 threading.Event 를 받아도 동작 (stop_remaining() 이 default 반환)
+"""
+import threading
+import time
+from typing import Optional
+
+
+class SessionStop(threading.Event):
+    def __init__(self):
+        super().__init__()
+        self.deadline: Optional[float] = None   # time.monotonic() 기준
+
+    def request_stop(self, timeout: Optional[float] = None):
+        if timeout is not None:
+            self.deadline = time.monotonic() + max(timeout, 0.0)
+        self.set()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+
+def stop_remaining(stop_event, default: Optional[float] = None) -> Optional[float]:
+    """stop_event 의 남은 정리 시간(초). 마감 시각이 없으면 default."""
+    remaining = getattr(stop_event, "remaining", None)
+    left = remaining() if callable(remaining) else None
+    return default if left is None else left
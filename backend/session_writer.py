@@ -0,0 +1,404 @@
+# session_writer.py
+"""
+세션당 writer 스레드 1개 + 프레임 단위 세그먼트 파일 1개 (data/sessions/<sid>/session.seg)
+
+input / window / process / screen 로거가 각자 CSV 를 열고 flush 하던 구조 →
+로거는 open_stream() 으로 받은 stream 에 기록만 하고 (큐에 넣기),
+writer 스레드가 모아서 한 번에 write + flush + fsync (group commit).
+
+파일 구조:
+    MAGIC(4) | version uint16
+    프레임 * N:  kind uint8 | type uint8 | length uint32 | crc32 uint32 | payload
+        type 0 (schema) : 해당 kind 의 헤더 JSON (CSV 컬럼 목록 / input.bin 헤더)
+        type 1 (data)   : CSV 행들(utf-8) 또는 바이너리 레코드 (input)
+- group 마다 kind 별로 payload 를 이어붙여 프레임 1개 → 프레임 수 최소화
+- 읽기: read_session_file() 순차 읽기 1번 → kind 별 행 / 바이트
+    마지막 프레임이 덜 써졌거나 crc 가 안 맞으면 그 프레임부터 무시
+- write / fsync 실패: 덜 써진 부분을 잘라내고 그 group 을 큐 앞에 되돌려 다음 commit 에서 재시도 (errors)
+- session_segments.read_segment_rows / input_binlog.read_input_events 가 자동으로 이 파일을 읽음
+"""
+import csv
+import io
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from session_segments import mux_path, session_dir
+
+MAGIC = b"MSSG"
+VERSION = 1
+
+_FILE_HEADER = struct.Struct("<4sH")
+_FRAME = struct.Struct("<BBII")
+
+FRAME_SCHEMA = 0
+FRAME_DATA = 1
+
+# 순서 바꾸지 말 것 (코드 = index + 1)
+STREAM_KINDS = ["window", "input", "process_delta", "screen", "motion"]
+_KIND_CODES = {k: i + 1 for i, k in enumerate(STREAM_KINDS)}
+_KIND_NAMES = {v: k for k, v in _KIND_CODES.items()}
+
+COMMIT_INTERVAL = float(os.getenv("SESSION_COMMIT_INTERVAL", "0.2"))       # group commit 최대 지연(초)
+COMMIT_BYTES = int(os.getenv("SESSION_COMMIT_BYTES", str(256 * 1024)))      # 이만큼 쌓이면 바로 commit
+SESSION_FSYNC = os.getenv("SESSION_FSYNC", "1") == "1"
+FINAL_COMMIT_RETRIES = 3   # 종료 시 마지막 commit 재시도 횟수
+
+
+class SessionWriter:
+    """세션 세그먼트 파일 writer 스레드."""
+
+    def __init__(self, session_id: str,
+                 commit_interval: float = COMMIT_INTERVAL,
+                 commit_bytes: int = COMMIT_BYTES,
+                 fsync: bool = SESSION_FSYNC):
+        self.session_id = session_id
+        self._commit_interval = commit_interval
+        self._commit_bytes = commit_bytes
+        self._fsync = fsync
+
+        session_dir(session_id, create=True)
+        self.path = mux_path(session_id)
+        self._open_append()   # self._f, self._good_offset (여기까지는 온전한 프레임 → commit 실패 시 되돌릴 위치)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._committed = threading.Condition(self._lock)
+        self._pending: List[Tuple[int, int, bytes]] = []
+        self._pending_bytes = 0
+        self._seq = 0          # put 된 레코드 번호
+        self._done_seq = 0     # 디스크까지 기록된 레코드 번호
+        self._stopping = False
+
+        self.records = 0
+        self.groups = 0
+        self.frames = 0
+        self.bytes = 0
+        self.fsyncs = 0
+        self.max_group = 0
+        self.late = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"session-writer-{session_id}", daemon=True)
+        self._thread.start()
+
+    # ---------------------------------------------------
+    # producer 쪽
+    # ---------------------------------------------------
+    def put(self, kind: str, payload: bytes, frame_type: int = FRAME_DATA) -> bool:
+        if not payload:
+            return True
+        with self._lock:
+            if self._stopping:
+                # 종료 마감 후 늦게 도착한 레코드 (session_logger 종료 리포트의 late)
+                self.late += 1
+                return False
+            self._pending.append((_KIND_CODES[kind], frame_type, payload))
+            self._pending_bytes += len(payload)
+            self._seq += 1
+            full = self._pending_bytes >= self._commit_bytes
+        if full:
+            self._wake.set()
+        return True
+
+    def sync(self, timeout: Optional[float] = None) -> bool:
+        """지금까지 put 한 레코드가 디스크에 기록될 때까지 대기."""
+        self._wake.set()
+        with self._committed:
+            target = self._seq
+            return self._committed.wait_for(lambda: self._done_seq >= target, timeout)
+
+    # ---------------------------------------------------
+    # writer 스레드
+    # ---------------------------------------------------
+    def _commit(self, fsync: bool = False):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._pending_bytes = 0
+            seq = self._seq
+        if pending:
+            # kind / type 별로 payload 이어붙이기 (schema 는 data 보다 먼저)
+            groups: Dict[Tuple[int, int], List[bytes]] = {}
+            for code, ftype, payload in pending:
+                groups.setdefault((ftype, code), []).append(payload)
+            buf = io.BytesIO()
+            frames = 0
+            for (ftype, code), parts in sorted(groups.items()):
+                if ftype == FRAME_SCHEMA:
+                    payloads = parts            # 헤더는 각각 프레임 1개
+                else:
+                    payloads = [b"".join(parts)]
+                for payload in payloads:
+                    buf.write(_FRAME.pack(code, ftype, len(payload), zlib.crc32(payload)))
+                    buf.write(payload)
+                    frames += 1
+            data = buf.getvalue()
+            try:
+                self._f.write(data)
+                self._f.flush()
+                if self._fsync or fsync:
+                    os.fsync(self._f.fileno())
+                    self.fsyncs += 1
+            except Exception:
+                # 실패한 group 은 큐 앞에 되돌리고(순서 유지), 덜 써진 프레임은 잘라냄
+                #   → 다음 commit 에서 다시 기록, 읽기(_parse)가 중간 손상 프레임에서 멈추지 않음
+                self.errors += 1
+                with self._lock:
+                    self._pending[:0] = pending
+                    self._pending_bytes += sum(len(p) for _, _, p in pending)
+                self._rollback()
+                raise
+            self._good_offset += len(data)
+            self.frames += frames
+            self.records += len(pending)
+            self.groups += 1
+            self.bytes += len(data)
+            self.max_group = max(self.max_group, len(pending))
+        with self._committed:
+            self._done_seq = max(self._done_seq, seq)
+            self._committed.notify_all()
+
+    def _open_append(self):
+        """
+        이어쓰기용으로 열기. 파일 끝이 덜 써진/손상된 프레임이면 마지막 온전한 프레임까지 잘라냄
+        (그 뒤에 붙이면 _parse 가 손상 프레임에서 멈춰서 새 프레임이 전부 안 읽힘)
+        """
+        end = valid_end(self.path)
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if end < size:
+            print(f"[session_writer] 손상된 끝부분 잘라냄: {self.path.name} {size} → {end} bytes")
+            os.truncate(self.path, end)
+        self._f = self.path.open("ab")
+        if self._f.tell() == 0:
+            self._f.write(_FILE_HEADER.pack(MAGIC, VERSION))
+            self._f.flush()
+        self._good_offset = self._f.tell()
+
+    def _rollback(self):
+        """마지막으로 온전히 기록된 위치까지 파일을 되돌림 (버퍼에 남은 찌꺼기도 버리도록 다시 열기)."""
+        try:
+            self._f.close()
+        except Exception:
+            pass
+        try:
+            os.truncate(self.path, self._good_offset)
+        except Exception as e:
+            print("[session_writer] truncate 실패:", e)
+        # truncate 가 실패했어도 다시 열 때 프레임을 검사해서 온전한 끝까지 잘라냄
+        self._open_append()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self._commit_interval)
+            self._wake.clear()
+            try:
+                self._commit()
+            except Exception as e:
+                print("[session_writer] commit error (다음 commit 에서 재시도):", e)
+        # 종료 시 남은 레코드까지 기록 (SESSION_FSYNC=0 이어도 마지막은 fsync)
+        for _ in range(FINAL_COMMIT_RETRIES):
+            try:
+                self._commit(fsync=True)
+                return
+            except Exception as e:
+                print("[session_writer] final commit error:", e)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """남은 레코드 기록 후 파일 닫기. timeout 안에 못 끝내거나 기록 못 한 레코드가 남으면 False."""
+        with self._lock:
+            self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return False
+        self._f.close()
+        with self._lock:
+            return not self._pending
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued = len(self._pending)
+        return {
+            "records": self.records,
+            "queued": queued,
+            "groups": self.groups,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "fsyncs": self.fsyncs,
+            "max_group": self.max_group,
+            "late": self.late,
+            "errors": self.errors,
+        }
+
+
+class SegmentStream:
+    """
+    open_segment() 의 (file, csv.writer) 자리에 그대로 쓰는 stream.
+    - writerow / writerows: CSV 한 줄로 인코딩해서 SessionWriter 큐에
+    - write: 바이너리 payload (input 레코드)
+    - flush / close: 실제 기록은 writer 스레드가 하므로 아무것도 안 함
+    """
+
+    def __init__(self, writer: SessionWriter, kind: str):
+        self._writer = writer
+        self.kind = kind
+
+    def writerow(self, row):
+        self.writerows([row])
+
+    def writerows(self, rows):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        self._writer.put(self.kind, buf.getvalue().encode("utf-8"))
+
+    def write(self, payload: bytes):
+        self._writer.put(self.kind, bytes(payload))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# =======================================================
+# 세션별 writer 레지스트리 (session_logger 가 시작/종료)
+# =======================================================
+_writers: Dict[str, SessionWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_session_writer(session_id: str) -> SessionWriter:
+    with _writers_lock:
+        w = _writers.get(session_id)
+        if w is None:
+            w = SessionWriter(session_id)
+            _writers[session_id] = w
+        return w
+
+
+def close_session_writer(session_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+    with _writers_lock:
+        w = _writers.pop(session_id, None)
+    if w is None:
+        return None
+    closed = w.close(timeout)
+    return dict(w.stats(), closed=closed)
+
+
+def open_stream(session_id: str, kind: str, header) -> Tuple[SegmentStream, SegmentStream]:
+    """
+    open_segment() 대신 쓰는 진입점. 반환: (stream, stream) — f, writer = ... 형태 그대로.
+    - header: CSV 컬럼 목록 또는 (input 처럼) 헤더 dict → schema 프레임으로 기록
+    """
+    w = get_session_writer(session_id)
+    w.put(kind, json.dumps(header, ensure_ascii=False).encode("utf-8"), FRAME_SCHEMA)
+    stream = SegmentStream(w, kind)
+    return stream, stream
+
+
+# =======================================================
+# 읽기 (세션당 순차 읽기 1번)
+# =======================================================
+class SessionFile:
+    """session.seg 파싱 결과. kind 별 schema / payload, CSV 행은 처음 요청할 때 변환."""
+
+    def __init__(self, schemas: Dict[str, object], chunks: Dict[str, List[bytes]]):
+        self.schemas = schemas
+        self._chunks = chunks
+        self._rows: Dict[str, List[Dict[str, str]]] = {}
+
+    def kinds(self) -> List[str]:
+        return list(self.schemas)
+
+    def raw(self, kind: str) -> bytes:
+        return b"".join(self._chunks.get(kind, []))
+
+    def rows(self, kind: str) -> List[Dict[str, str]]:
+        if kind not in self._rows:
+            header = self.schemas.get(kind)
+            if not isinstance(header, list):
+                self._rows[kind] = []
+            else:
+                text = self.raw(kind).decode("utf-8")
+                self._rows[kind] = [dict(zip(header, r)) for r in csv.reader(io.StringIO(text))]
+        return self._rows[kind]
+
+
+def _frames(data: bytes):
+    """
+    (code, type, payload, 프레임 끝 offset) 순회. 덜 써졌거나 crc 가 안 맞는 프레임에서 멈춤.
+    파일 헤더가 아예 없으면(너무 짧음) 아무것도 없음, 다른 파일이면 ValueError.
+    """
+    if len(data) < _FILE_HEADER.size:
+        return
+    magic, version = _FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("[session_writer] 지원하지 않는 세션 파일")
+
+    pos = _FILE_HEADER.size
+    view = memoryview(data)
+    while pos + _FRAME.size <= len(data):
+        code, ftype, length, crc = _FRAME.unpack_from(data, pos)
+        start = pos + _FRAME.size
+        payload = view[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            print("[session_writer] 손상된 마지막 프레임 무시:", pos)
+            return
+        pos = start + length
+        yield code, ftype, payload, pos
+
+
+def valid_end(path) -> int:
+    """session.seg 에서 마지막 온전한 프레임이 끝나는 offset (파일 헤더가 없으면 0)."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return 0
+    end = _FILE_HEADER.size if len(data) >= _FILE_HEADER.size else 0
+    for _, _, _, end in _frames(data):
+        pass
+    return end
+
+
+def _parse(data: bytes) -> SessionFile:
+    schemas: Dict[str, object] = {}
+    chunks: Dict[str, List[bytes]] = {}
+    for code, ftype, payload, _ in _frames(data):
+        kind = _KIND_NAMES.get(code)
+        if kind is not None:
+            if ftype == FRAME_SCHEMA:
+                schemas.setdefault(kind, json.loads(bytes(payload).decode("utf-8")))
+            else:
+                chunks.setdefault(kind, []).append(bytes(payload))
+    return SessionFile(schemas, chunks)
+
+
+# (path, size, mtime_ns) 가 같으면 다시 읽지 않음 — analyzer 가 kind 별로 여러 번 요청해도 읽기 1번
+_cache: Dict[str, Tuple[Tuple[int, int], SessionFile]] = {}
+_CACHE_MAX = 8
+
+
+def read_session_file(session_id) -> Optional[SessionFile]:
+    """세션 session.seg → SessionFile. 파일이 없으면 None."""
+    try:
+        path = mux_path(session_id)
+        st = path.stat()
+    except (ValueError, FileNotFoundError):
+        return None
+    key = str(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    parsed = _parse(path.read_bytes())
+    if len(_cache) >= _CACHE_MAX:
+        _cache.pop(next(iter(_cache)))
+    _cache[key] = (stamp, parsed)
+    return parsed
@@ -0,0 +1,109 @@
+# title_labels.py
+"""
+창 제목 → 라벨 키워드 판별.
+- analyzer(텐서플로 로드)와 로거 프로세스(세션 집계) 양쪽에서 가볍게 import 할 수 있도록 분리
+- 키워드 목록은 keyword_matcher 로 한 번만 컴파일 (라벨 우선순위는 dict 순서 그대로)
+- label_from_title 은 원본 제목 기준 LRU 캐시 (같은 창 제목이 수백 번 반복되므로)
+  TITLE_KEYWORDS 내용이 바뀌면(version 증가) 매처 재컴파일 + 캐시 비움
+"""
+from functools import lru_cache
+from typing import Dict
+
+from keyword_matcher import KeywordMatcher, KeywordTable
+
+# 창 제목 → 라벨 캐시 최대 크기
+TITLE_LABEL_CACHE_SIZE = 4096
+
+# -------------------------------------------------------
+# 🔥 1. TITLE KEYWORDS (모든 라벨 키워드) — 절대 삭제/수정 안 함
+# -------------------------------------------------------
+TITLE_KEYWORDS = KeywordTable({
+    "game": ["game", "steam", "league of legends", "lol", "valorant", "overwatch", "maplestory", "lostark", "테트리스", "게임", "칼"],
+    "study": ["ppt", "pdf", "study", "homework", "report", "notion", "stackoverflow", "postech", "lecture", "visual studio code", "vscode", "code.exe",
+        "pycharm", "intellij", "android studio",
+        "jupyter", "colab", "terminal", "cmd", "powershell","inflearn", "인프런", "강의", "학습 페이지", "lecture video", "중부대학교", "lms", "강좌"],
+    "webtoon": ["webtoon", "naver webtoon", "kakao webtoon", "toon","만화", "웹툰", "뉴토끼"],
+    "sns": ["instagram", "insta", "facebook", "twitter", "tiktok", "reels", "shorts", "인스타", "카카오톡"],
+    "youtube-ent": ["youtube", "yt", "tv", "netflix", "tving", "watching", "drama"],
+    "youtube-music": ["music", "song", "lyrics", "audio", "mv", "playlist", "melody", "뮤직", "가사"]
+})
+
+# -------------------------------------------------------
+# 🔥 2. MUSIC KEYWORDS — 절대 줄이지 않음
+# -------------------------------------------------------
+MUSIC_KEYWORDS = [
+    "music", "song", "lyrics", "lyric", "audio", "mv", "playlist", "melody",
+    "가사", "노래", "뮤직", "audio only", "official audio"
+]
+
+_MUSIC_MATCHER = KeywordMatcher([("music", MUSIC_KEYWORDS)])
+
+# -------------------------------------------------------
+# 🔥 TITLE_KEYWORDS 컴파일 결과 + 라벨 캐시 (키워드 변경 시 자동 무효화)
+# -------------------------------------------------------
+_title_matcher = None
+_title_matcher_table = None
+_title_matcher_version = -1
+_cache_invalidations = 0
+
+
+def _get_title_matcher() -> KeywordMatcher:
+    global TITLE_KEYWORDS, _title_matcher, _title_matcher_table, _title_matcher_version, _cache_invalidations
+
+    table = TITLE_KEYWORDS
+    if not isinstance(table, KeywordTable):
+        # 누군가 title_labels.TITLE_KEYWORDS 를 일반 dict로 교체한 경우 → 변경 추적 가능한 형태로 감쌈
+        table = TITLE_KEYWORDS = KeywordTable(table)
+
+    if table is not _title_matcher_table or table.version != _title_matcher_version:
+        _title_matcher = KeywordMatcher(table.items())
+        _title_matcher_table = table
+        _title_matcher_version = table.version
+        if _label_from_title_cached.cache_info().currsize:
+            _cache_invalidations += 1
+        _label_from_title_cached.cache_clear()
+    return _title_matcher
+
+
+@lru_cache(maxsize=TITLE_LABEL_CACHE_SIZE)
+def _label_from_title_cached(title: str) -> str:
+    return _title_matcher.match(title) or "other"
+
+
+def title_label_cache_info() -> Dict[str, int]:
+    """label_from_title 캐시 통계 (hits / misses / currsize / maxsize / invalidations)."""
+    info = _label_from_title_cached.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "currsize": info.currsize,
+        "maxsize": info.maxsize,
+        "invalidations": _cache_invalidations,
+    }
+
+# -------------------------------------------------------
+# 🔥 음악 제목 판별 함수
+# -------------------------------------------------------
+def is_music_title(title: str) -> bool:
+    return _MUSIC_MATCHER.contains_any(title)
+
+# -------------------------------------------------------
+# 🔥 TITLE 기반 라벨
+# -------------------------------------------------------
+def apply_keyword_priority(window_titles: list) -> str | None:
+    if not window_titles:
+        return None
+
+    title_str = " ".join(t.lower() for t in window_titles if isinstance(t, str))
+
+    return _get_title_matcher().match_lower(title_str)
+
+
+# -------------------------------------------------------
+# 🔥 단일 제목 -> 키워드 라벨 추정 (fallback용)
+# -------------------------------------------------------
+def label_from_title(title: str) -> str:
+    if not title:
+        return "other"
+    _get_title_matcher()
+    return _label_from_title_cached(title)
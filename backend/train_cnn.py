@@ -1,5 +1,10 @@
 # train_cnn.py (backend 폴더에 두고 실행)
+#   python train_cnn.py                # ../data/dataset/<label>/*.png
+#   python train_cnn.py --from-thumbs  # 캡쳐 시점 썸네일(data/sessions/<sid>/thumbs_*.npy) + task_label
+#                                      (약한 라벨: 활성 창 제목 라벨이 task_label 과 같은 프레임만 사용)
 import os
+import sys
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras import layers, models
@@ -12,29 +17,56 @@ LABELS = ["game", "other", "sns", "study", "webtoon", "youtube-ent", "youtube-mu
 
 img_size = (128, 128)
 batch_size = 8
+SPLIT_SEED = 42
 
-datagen = ImageDataGenerator(
-    rescale=1./255,
-    validation_split=0.2
-)
+FROM_THUMBS = "--from-thumbs" in sys.argv
 
-train_gen = datagen.flow_from_directory(
-    DATASET_DIR,
-    target_size=img_size,
-    batch_size=batch_size,
-    classes=LABELS,          # 라벨 순서 고정!
-    class_mode="categorical",
-    subset="training"
-)
+if FROM_THUMBS:
+    # ✅ PNG 디코딩 없이 세션 썸네일 링(uint8 128x128x3)을 그대로 사용
+    from screen_thumbs import load_thumb_dataset
 
-val_gen = datagen.flow_from_directory(
-    DATASET_DIR,
-    target_size=img_size,
-    batch_size=batch_size,
-    classes=LABELS,
-    class_mode="categorical",
-    subset="validation"
-)
+    X, y_idx = load_thumb_dataset(LABELS)
+    if len(X) == 0:
+        sys.exit("[train_cnn] 사용할 썸네일이 없습니다.")
+    print(f"[train_cnn] thumbs: {len(X)}")
+    X = X.astype(np.float32) / 255.0
+    y = tf.keras.utils.to_categorical(y_idx, num_classes=len(LABELS))
+
+    # ✅ 라벨별로 20% 씩 validation (flow_from_directory 의 validation_split 과 같은 기준)
+    #    load_thumb_dataset 은 세션 순서라 Keras validation_split(뒤쪽 20%)을 쓰면 마지막 세션만 검증됨
+    rng = np.random.default_rng(SPLIT_SEED)
+    train_idx, val_idx = [], []
+    for c in range(len(LABELS)):
+        idx = rng.permutation(np.flatnonzero(y_idx == c))
+        n_val = int(len(idx) * 0.2)
+        val_idx.extend(idx[:n_val])
+        train_idx.extend(idx[n_val:])
+    train_idx = rng.permutation(np.asarray(train_idx, dtype=np.int64))
+    val_idx = np.asarray(val_idx, dtype=np.int64)
+    print(f"[train_cnn] train: {len(train_idx)}, val: {len(val_idx)}")
+else:
+    datagen = ImageDataGenerator(
+        rescale=1./255,
+        validation_split=0.2
+    )
+
+    train_gen = datagen.flow_from_directory(
+        DATASET_DIR,
+        target_size=img_size,
+        batch_size=batch_size,
+        classes=LABELS,          # 라벨 순서 고정!
+        class_mode="categorical",
+        subset="training"
+    )
+
+    val_gen = datagen.flow_from_directory(
+        DATASET_DIR,
+        target_size=img_size,
+        batch_size=batch_size,
+        classes=LABELS,
+        class_mode="categorical",
+        subset="validation"
+    )
 
 model = models.Sequential([
     layers.Input(shape=(*img_size, 3)),
@@ -55,11 +87,20 @@ model.compile(
     metrics=["accuracy"]
 )
 
-model.fit(
-    train_gen,
-    validation_data=val_gen,
-    epochs=20
-)
+if FROM_THUMBS:
+    model.fit(
+        X[train_idx], y[train_idx],
+        batch_size=batch_size,
+        validation_data=(X[val_idx], y[val_idx]) if len(val_idx) else None,
+        shuffle=True,
+        epochs=20
+    )
+else:
+    model.fit(
+        train_gen,
+        validation_data=val_gen,
+        epochs=20
+    )
 
 model.save(MODEL_PATH)
 print("saved:", MODEL_PATH)
@@ -1,21 +1,24 @@
 # window_logger.py
-import csv
-import time
+import argparse
+import os
+from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
-import win32gui
-import win32process
-import psutil
 import threading
 
+from session_writer import open_stream
+from session_aggregate import get_aggregator
+from capture_scheduler import get_scheduler
+
 BASE_DIR = Path(__file__).resolve().parent
 
 # ✅ (중요) backend/data 로 통일
 DATA_DIR = (BASE_DIR / "data").resolve()
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# 전역 로그(마이그레이션 전 히스토리). 새 세션은 data/sessions/<sid>/window.csv 에 기록
 WINDOW_CSV = DATA_DIR / "window_log.csv"
 
 CSV_HEADER = [
@@ -29,59 +32,194 @@ CSV_HEADER = [
     "exe_path",
 ]
 
+# pid → 프로세스 메타 캐시 최대 개수
+PROC_CACHE_MAX = int(os.getenv("WINDOW_PROC_CACHE_MAX", "256"))
 
-def _ensure_header(path: Path):
-    if not path.exists() or path.stat().st_size == 0:
-        with path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(CSV_HEADER)
 
+# =======================================================
+# 플랫폼 호출 (provider) — 리눅스에서는 가짜 provider 로 캐시 동작 확인 가능
+# =======================================================
+class WindowProvider(ABC):
+    """포그라운드 창 / 프로세스 정보를 얻는 플랫폼 인터페이스."""
 
-def _get_active_window_info():
-    try:
-        hwnd = win32gui.GetForegroundWindow()
+    @abstractmethod
+    def foreground(self) -> Tuple[int, int]:
+        """(hwnd, pid). 창이 없으면 (0, 0)."""
+
+    @abstractmethod
+    def title(self, hwnd: int) -> str:
+        ...
+
+    @abstractmethod
+    def create_time(self, pid: int) -> float:
+        """pid 재사용 확인용 (프로세스가 없으면 예외)."""
+
+    @abstractmethod
+    def process_meta(self, pid: int) -> Tuple[str, str, float]:
+        """(process_name, exe_path, create_time)"""
+
+
+class FakeProvider(WindowProvider):
+    """
+    메모리 안의 가짜 provider (리눅스에서 캐시 확인용).
+    - windows: hwnd → (pid, title), procs: pid → (name, exe, create_time)
+    - focus(hwnd) 로 포그라운드 창 변경, spawn(pid, ...) 으로 프로세스 생성/ pid 재사용
+    """
+
+    def __init__(self):
+        self.windows: Dict[int, Tuple[int, str]] = {}
+        self.procs: Dict[int, Tuple[str, str, float]] = {}
+        self.active = 0
+        self.meta_calls = 0
+
+    def spawn(self, pid: int, name: str, exe: str, create_time: float):
+        self.procs[pid] = (name, exe, create_time)
+
+    def open_window(self, hwnd: int, pid: int, title: str):
+        self.windows[hwnd] = (pid, title)
+
+    def focus(self, hwnd: int):
+        self.active = hwnd
+
+    def foreground(self) -> Tuple[int, int]:
+        if self.active not in self.windows:
+            return 0, 0
+        return self.active, self.windows[self.active][0]
+
+    def title(self, hwnd: int) -> str:
+        return self.windows[hwnd][1]
+
+    def create_time(self, pid: int) -> float:
+        return self.procs[pid][2]
+
+    def process_meta(self, pid: int) -> Tuple[str, str, float]:
+        self.meta_calls += 1
+        return self.procs[pid]
+
+
+class Win32Provider(WindowProvider):
+    """win32gui / win32process / psutil (import 는 처음 생성할 때)."""
+
+    def __init__(self):
+        import win32gui
+        import win32process
+        import psutil
+
+        self._gui = win32gui
+        self._proc = win32process
+        self._psutil = psutil
+
+    def foreground(self) -> Tuple[int, int]:
+        hwnd = self._gui.GetForegroundWindow()
         if not hwnd:
-            return None
+            return 0, 0
+        _, pid = self._proc.GetWindowThreadProcessId(hwnd)
+        return hwnd, pid
+
+    def title(self, hwnd: int) -> str:
+        return self._gui.GetWindowText(hwnd)
 
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+    def create_time(self, pid: int) -> float:
+        return self._psutil.Process(pid).create_time()
 
+    def process_meta(self, pid: int) -> Tuple[str, str, float]:
+        proc = self._psutil.Process(pid)
+        with proc.oneshot():
+            return proc.name(), proc.exe(), proc.create_time()
+
+
+class ActiveWindowReader:
+    """
+    활성 창 정보 + pid → (name, exe, create_time) 캐시.
+    - hwnd, pid 가 직전과 같으면 제목만 다시 읽음 (psutil 호출 X)
+    - 다른 pid 로 바뀌면 create_time 만 확인해서 캐시 재사용 (pid 재사용이면 다시 조회)
+    """
+
+    def __init__(self, provider: Optional[WindowProvider] = None, max_pids: int = PROC_CACHE_MAX):
+        self._provider = provider
+        self._max_pids = max_pids
+        self._cache: Dict[int, Tuple[str, str, float]] = {}
+        self._last_key: Optional[Tuple[int, int]] = None
+        self._last_meta: Optional[Tuple[str, str, float]] = None
+
+        self.meta_lookups = 0   # process_meta (name/exe) 호출 수
+        self.fast_hits = 0      # hwnd/pid 그대로라 psutil 을 건너뛴 횟수
+
+    @property
+    def provider(self) -> WindowProvider:
+        if self._provider is None:
+            self._provider = Win32Provider()
+        return self._provider
+
+    def _meta(self, pid: int) -> Tuple[str, str, float]:
+        cached = self._cache.get(pid)
+        if cached is not None and self.provider.create_time(pid) == cached[2]:
+            return cached
+        meta = self.provider.process_meta(pid)
+        self.meta_lookups += 1
+        self._cache.pop(pid, None)
+        if len(self._cache) >= self._max_pids:
+            self._cache.pop(next(iter(self._cache)))   # 가장 오래된 항목
+        self._cache[pid] = meta
+        return meta
+
+    def reset(self):
+        """다음 read() 에서 fast path 를 쓰지 않음 (조회 실패 후)."""
+        self._last_key = None
+        self._last_meta = None
+
+    def read(self) -> Optional[Dict]:
+        hwnd, pid = self.provider.foreground()
         # ✅ pid 방어 (0/음수면 무시)
-        if not pid or pid <= 0:
+        if not hwnd or not pid or pid <= 0:
             return None
 
-        proc = psutil.Process(pid)
-        title = win32gui.GetWindowText(hwnd)
+        key = (hwnd, pid)
+        if key == self._last_key and self._last_meta is not None:
+            meta = self._last_meta
+            self.fast_hits += 1
+        else:
+            meta = self._meta(pid)
+            self._last_key, self._last_meta = key, meta
 
         return {
-            "process_name": proc.name(),
-            "window_title": title,
-            "exe_path": proc.exe(),
+            "process_name": meta[0],
+            "window_title": self.provider.title(hwnd),
+            "exe_path": meta[1],
         }
+
+
+def _get_active_window_info(reader: ActiveWindowReader):
+    try:
+        return reader.read()
     except Exception as e:
+        # 프로세스 종료 등으로 실패하면 다음에 처음부터 다시 조회
+        reader.reset()
         print("[window_logger] get_active_window_info error:", e)
         return None
 
 
-def start_window_logging(session_meta: Dict, stop_event: threading.Event, interval: float = 0.5):
+def start_window_logging(session_meta: Dict, stop_event: threading.Event, interval: float = 0.5,
+                         provider: Optional[WindowProvider] = None):
     """
     현재 활성 창(포그라운드 윈도우)의 정보를 주기적으로 기록.
     """
-    _ensure_header(WINDOW_CSV)
-
     user_id = session_meta.get("user_id")
     session_id = session_meta.get("session_id")
     usage_index = session_meta.get("usage_index", 0)
     task_label = session_meta.get("task", "")
 
-    f = WINDOW_CSV.open("a", newline="", encoding="utf-8")
-    writer = csv.writer(f)
+    f, writer = open_stream(session_id, "window", CSV_HEADER)
+    agg = get_aggregator(session_id)
+    sched = get_scheduler(session_id)
+    reader = ActiveWindowReader(provider)
 
     last_info = None
 
     print("[window_logger] start:", session_meta)
 
     while not stop_event.is_set():
-        info = _get_active_window_info()
+        info = _get_active_window_info(reader)
         if info and info != last_info:
             ts = datetime.utcnow().isoformat()
             writer.writerow(
@@ -97,9 +235,65 @@ def start_window_logging(session_meta: Dict, stop_event: threading.Event, interv
                 ]
             )
             f.flush()
+            agg.on_window(ts, info["window_title"])
+            if last_info is None or info["window_title"] != last_info["window_title"]:
+                sched.on_window_change()   # 창 전환 → 스크린샷 바로 한 장
             last_info = info
 
-        time.sleep(interval)
+        stop_event.wait(interval)
 
     f.close()
-    print("[window_logger] stop")
+    print(f"[window_logger] stop (meta lookups={reader.meta_lookups}, fast path={reader.fast_hits})")
+
+
+def self_check():
+    """FakeProvider 로 캐시 동작 확인 (fast path / pid 캐시 / pid 재사용)."""
+    fake = FakeProvider()
+    fake.spawn(100, "code.exe", r"C:\code.exe", 1.0)
+    fake.spawn(200, "chrome.exe", r"C:\chrome.exe", 2.0)
+    fake.open_window(1, 100, "main.py")
+    fake.open_window(2, 200, "YouTube")
+    reader = ActiveWindowReader(fake)
+
+    # 1) 같은 hwnd/pid → process_meta 한 번만, 제목 변경은 바로 반영
+    fake.focus(1)
+    assert reader.read()["process_name"] == "code.exe"
+    fake.open_window(1, 100, "server.py")
+    assert reader.read()["window_title"] == "server.py"
+    assert fake.meta_calls == 1 and reader.fast_hits == 1
+
+    # 2) 다른 창으로 갔다가 돌아옴 → pid 캐시 (create_time 확인만)
+    fake.focus(2)
+    assert reader.read()["process_name"] == "chrome.exe"
+    fake.focus(1)
+    assert reader.read()["process_name"] == "code.exe"
+    assert fake.meta_calls == 2
+
+    # 3) pid 재사용 (create_time 변경) → 다시 조회
+    fake.focus(2)
+    reader.read()
+    fake.spawn(100, "game.exe", r"C:\game.exe", 3.0)
+    fake.open_window(3, 100, "Game")
+    fake.focus(3)
+    assert reader.read()["process_name"] == "game.exe"
+    assert fake.meta_calls == 3 and reader.meta_lookups == 3
+
+    # 4) 프로세스 종료 → 오류 후 reset, 창이 없으면 None
+    del fake.procs[200]
+    fake.focus(2)
+    assert _get_active_window_info(reader) is None
+    fake.focus(0)
+    assert reader.read() is None
+
+    print(f"[window_logger] self-check ok (meta lookups={reader.meta_lookups}, fast path={reader.fast_hits})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="활성 창 로거")
+    parser.add_argument("--self-check", action="store_true", help="가짜 provider 로 pid 캐시 동작 확인")
+    args = parser.parse_args()
+
+    if args.self_check:
+        self_check()
+    else:
+        parser.print_help()